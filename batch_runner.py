@@ -0,0 +1,148 @@
+"""
+batch_runner.py - runs the main.py processes (initialize driver board -> TEC stability -> configure
+laser) for a list of units without the menu and data entry prompts. The operator is only asked to
+do the physical steps (power cycle, connect the carrier board / DAQ). A result summary is written for
+every unit.
+
+The manifest is JSON or CSV. Laser entries use the LaserConfig field names plus opm_channel:
+
+JSON:
+    {"search_mode":"bisect",
+     "units":[{"unit_sn":"SN1","num_tec":1,"workflows":["init","tec","laser"],
+               "lasers":[{"laser_sn":"L1","laser_wvl":1550,"laser_op_current":50,"laser_max_current":100,
+                          "laser_power_mw":2.0,"laser_channel":1,"laser_type":1,"opm_channel":1}]}]}
+CSV (one row per laser, rows with the same unit_sn make up one unit):
+    unit_sn,num_tec,workflows,laser_sn,laser_wvl,laser_op_current,laser_max_current,laser_power_mw,laser_channel,laser_type,opm_channel
+
+usage: python batch_runner.py manifest.json --results "C:\\Santec Data\\SLS-200\\Batch Results"
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import time
+from dataclasses import fields
+from datetime import datetime
+from laser_config.laser_data import LaserConfig
+from station.station_session import StationSession
+from station.orchestrator import StationJob, run_station_job
+from hp_laser_decorator import warm_up_instruments, WARMUP_TIMEOUT
+from data_report import TraceRecorder, export_trace_csv
+from hp_laser_metrics import metrics, enable_metrics
+from results_store import get_results_store
+from main import setup_logging
+
+PHYSICAL_PROMPTS = {
+    "init":"Please connect the debug cable to the driver board and power it on (press ENTER when done): ",
+    "tec":"Please power off the board, connect the DAQ-TEC connectors and the laser carrier board, then power on and confirm the TEC light is green (press ENTER when done): ",
+    "laser":"Please make sure the laser carrier board is connected, the fibers are on the OPM and the board is powered on (press ENTER when done): "
+}
+_LASER_FIELDS = [f.name for f in fields(LaserConfig)]
+_LASER_TYPES = {f.name:f.type for f in fields(LaserConfig)}
+
+def _build_laser(entry:dict):
+    #builds a LaserConfig (and opm channel) from a manifest laser entry
+    values = {}
+    for name in _LASER_FIELDS:
+        if name == "laser_power_db" and name not in entry:
+            continue
+        if name not in entry or entry[name] in ("",None):
+            raise ValueError(f"Laser entry {entry} is missing {name}")
+        values[name] = _LASER_TYPES[name](entry[name])
+    values.setdefault("laser_power_db",10*math.log10(values["laser_power_mw"]))
+    return LaserConfig(**values),int(entry["opm_channel"])
+
+def _build_unit(unit:dict,lasers:list,search_mode:str,warm_start=True,tec_monitor=False):
+    workflows = unit.get("workflows") or ["init","tec","laser"]
+    if isinstance(workflows,str):
+        workflows = [w.strip() for w in workflows.replace(";",",").split(",") if w.strip()]
+    job = StationJob(
+        workflows=workflows,
+        num_tec=int(unit.get("num_tec") or 1),
+        lasers=[_build_laser(laser) for laser in lasers],
+        search_mode=unit.get("search_mode") or search_mode,
+        warm_start=warm_start,
+        tec_monitor=tec_monitor,
+        prompts=dict(PHYSICAL_PROMPTS)
+    )
+    return str(unit["unit_sn"]),job
+
+def load_manifest(path:str,search_mode="linear",warm_start=True,tec_monitor=False):
+    #returns a list of (unit sn, StationJob)
+    if path.lower().endswith(".csv"):
+        units = {}
+        with open(path,newline="",encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                units.setdefault(row["unit_sn"],(row,[]))[1].append(row)
+        return [_build_unit(unit,lasers,search_mode,warm_start,tec_monitor) for unit,lasers in units.values()]
+    with open(path,"r",encoding="utf-8") as f:
+        manifest = json.load(f)
+    search_mode = manifest.get("search_mode",search_mode) if isinstance(manifest,dict) else search_mode
+    units = manifest["units"] if isinstance(manifest,dict) else manifest
+    return [_build_unit(unit,unit.get("lasers",[]),search_mode,warm_start,tec_monitor) for unit in units]
+
+def run_batch(manifest_path:str,results_dir:str,search_mode="linear",record_metrics=False,warm_start=True,results_db=None,tec_monitor=False):
+    jobs = load_manifest(manifest_path,search_mode,warm_start,tec_monitor)
+    os.makedirs(results_dir,exist_ok=True)
+    results_store = get_results_store(results_db)
+    if record_metrics:
+        enable_metrics()
+    #the instruments are connected once and shared by all of the units in the batch
+    warmup = warm_up_instruments()
+    warmup_errors = warmup.wait(timeout=WARMUP_TIMEOUT)
+    summary = []
+    for unit_sn,job in jobs:
+        logger,unit_sn = setup_logging(unit_sn)
+        for name,error in warmup_errors.items():
+            logger.warning(f"Could not connect to {name} during start up: {error}")
+        session = StationSession("batch",unit_sn)
+        session.logger = logger
+        recorder = TraceRecorder(os.path.join(results_dir,f"{unit_sn} - trace.trc"))
+        metrics.reset()
+        unit_record = {}
+        start = time.perf_counter()
+        try:
+            results = run_station_job(session,job,recorder=recorder,unit_record=unit_record,results_store=results_store)
+        except Exception as e:
+            logger.exception(f"Unit {unit_sn} aborted: {e}")
+            results = {"error":str(e)}
+        finally:
+            recorder.close()
+        record = {
+            "unit_sn":unit_sn,
+            "timestamp":datetime.now().isoformat(),
+            "duration_s":round(time.perf_counter() - start,1),
+            "workflows":job.workflows,
+            "trace":export_trace_csv(recorder.filepath) if recorder.samples else None,
+            "metrics":metrics.export_json(os.path.join(results_dir,f"{unit_sn} - metrics.json")) if metrics.enabled else None,
+            "results":results,
+            **unit_record,
+            "passed":"error" not in results and all(results.get(w) for w in job.workflows)
+        }
+        logger.info(f"Unit {unit_sn} {'PASS' if record['passed'] else 'FAIL'}: {results}")
+        if metrics.enabled:
+            logger.info(f"Instrument metrics:\n{metrics.summary_table()}")
+        with open(os.path.join(results_dir,f"{unit_sn} - result.json"),"w",encoding="utf-8") as f:
+            json.dump(record,f,indent=2)
+        summary.append(record)
+    results_store.flush()
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="HP laser config batch runner")
+    parser.add_argument("manifest",help="JSON or CSV manifest of the units to run")
+    parser.add_argument("--results",default=r"C:\Santec Data\SLS-200\Batch Results",help="folder for the per unit result files")
+    parser.add_argument("--search-mode",default="linear",help="PLR search mode (linear, bisect, secant)")
+    parser.add_argument("--metrics",action="store_true",help="record per command instrument latency metrics")
+    parser.add_argument("--no-warm-start",action="store_true",help="do not start the PLR search at the PLR model prediction")
+    parser.add_argument("--results-db",default=None,help="results database (default HP_LASER_RESULTS_DB or the Laser Config Data folder)")
+    parser.add_argument("--tec-monitor",action="store_true",help="watch the TEC temperature during the laser ramp and abort it on an overtemp")
+    args = parser.parse_args()
+    summary = run_batch(args.manifest,args.results,args.search_mode,args.metrics,not args.no_warm_start,args.results_db,args.tec_monitor)
+    for record in summary:
+        print(f"{record['unit_sn']:<16} {'PASS' if record['passed'] else 'FAIL'} {record['duration_s']}s {record['results']}")
+
+if __name__ == "__main__":
+    main()
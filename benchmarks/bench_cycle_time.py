@@ -0,0 +1,106 @@
+import argparse
+import json
+import logging
+import math
+import platform
+from dataclasses import asdict
+from datetime import datetime
+from benchmarks.bench_harness import ScriptedInput, build_instruments, run_workflow
+from laser_config.config_driver_board import initialize_driver_board
+from laser_config.config_apc_laser import APCLaserConfig
+from laser_config.laser_data import LaserConfig
+from tec_config.config_tec import run_tec_stability
+from tec_config.tec_stability import run_tec_stability_stream
+from main import PRODUCT_VERSION
+
+"""
+bench_cycle_time.py - end to end cycle time benchmark of the three station workflows
+(initialize_driver_board, run_tec_stability (fixed and streaming) and APCLaserConfig.configure_apc_laser) run against the
+simulated instruments. Both lasers of a board are also configured one after the other and with
+configure_dual_apc_laser to compare the two. Operator prompts are answered by a script. Results are written as JSON so runs
+can be compared between versions.
+
+usage: python -m benchmarks.bench_cycle_time --output bench_results.json
+"""
+
+def bench_init(sleep_scale):
+    instruments = build_instruments()
+    #the operator power cycles the board when asked to
+    scripted = ScriptedInput([("power cycle",lambda prompt: instruments["debug_cable"].power_cycle(down_time=0.0) or "")])
+    return run_workflow("initialize_driver_board",initialize_driver_board,instruments,scripted,sleep_scale)
+
+def bench_tec(sleep_scale,num_ch=2):
+    instruments = build_instruments()
+    return run_workflow("run_tec_stability",lambda: run_tec_stability(num_ch),instruments,None,sleep_scale)
+
+def bench_tec_stream(sleep_scale,num_ch=2):
+    instruments = build_instruments()
+    return run_workflow("run_tec_stability_stream",lambda: run_tec_stability_stream(num_ch),instruments,None,sleep_scale)
+
+def bench_laser(sleep_scale,search_mode="linear",power_mw=2.0):
+    instruments = build_instruments(seed=1)
+    laser_setup = LaserConfig("BENCH",1550.0,50.0,100.0,power_mw,10*math.log10(power_mw),1,1)
+    scripted = ScriptedInput([("OPM Channel","1")])
+    workflow = lambda: APCLaserConfig(search_mode=search_mode).configure_apc_laser(laser_setup)
+    return run_workflow(f"configure_apc_laser[{search_mode}]",workflow,instruments,scripted,sleep_scale)
+
+def _dual_setups(power_mw):
+    return [LaserConfig(f"BENCH{ch}",1550.0,50.0,100.0,power_mw,10*math.log10(power_mw),ch,1) for ch in (1,2)]
+
+def bench_laser_sequential(sleep_scale,search_mode="linear",power_mw=2.0):
+    #both lasers configured one after the other, the baseline for bench_dual_laser
+    instruments = build_instruments(seed=1)
+    def workflow():
+        apc = APCLaserConfig(search_mode=search_mode)
+        return [apc.configure_apc_laser(setup,opm_channel=setup.laser_channel) for setup in _dual_setups(power_mw)]
+    return run_workflow(f"configure_apc_laser x2[{search_mode}]",workflow,instruments,None,sleep_scale)
+
+def bench_dual_laser(sleep_scale,search_mode="linear",power_mw=2.0):
+    instruments = build_instruments(seed=1)
+    workflow = lambda: APCLaserConfig(search_mode=search_mode).configure_dual_apc_laser(_dual_setups(power_mw),[1,2])
+    return run_workflow(f"configure_dual_apc_laser[{search_mode}]",workflow,instruments,None,sleep_scale)
+
+def main():
+    parser = argparse.ArgumentParser(description="HP laser config cycle time benchmark")
+    parser.add_argument("--output",default=None,help="JSON file to write the results to")
+    parser.add_argument("--sleep-scale",type=float,default=1.0,help="scale real sleeps (requested sleep time is still recorded)")
+    parser.add_argument("--search-modes",default="linear,bisect",help="comma separated PLR search modes to benchmark")
+    parser.add_argument("--skip",default="",help="comma separated workflows to skip (init,tec,laser,dual)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    skip = args.skip.split(",")
+
+    results = []
+    if "init" not in skip:
+        results.append(bench_init(args.sleep_scale))
+    if "tec" not in skip:
+        results.append(bench_tec(args.sleep_scale))
+        #the streaming test measures its window and slope on the real clock, scaled sleeps would
+        #shrink the window and inflate the slope so it only runs unscaled
+        if args.sleep_scale == 1.0:
+            results.append(bench_tec_stream(args.sleep_scale))
+        else:
+            logging.warning(f"run_tec_stability_stream skipped, it can not run with --sleep-scale {args.sleep_scale}")
+    if "laser" not in skip:
+        for mode in args.search_modes.split(","):
+            results.append(bench_laser(args.sleep_scale,search_mode=mode))
+    if "dual" not in skip:
+        for mode in args.search_modes.split(","):
+            results.append(bench_laser_sequential(args.sleep_scale,search_mode=mode))
+            results.append(bench_dual_laser(args.sleep_scale,search_mode=mode))
+
+    for r in results:
+        print(f"{r.workflow:<32} result={r.result!s:<6} wall={r.wall_time:8.2f}s sleep={r.sleep_requested:8.2f}s io={r.io_time:7.2f}s calls={sum(sum(c.values()) for c in r.calls.values())}")
+    if args.output:
+        report = {
+            "product_version":PRODUCT_VERSION,
+            "timestamp":datetime.now().isoformat(),
+            "python":platform.python_version(),
+            "sleep_scale":args.sleep_scale,
+            "results":[asdict(r) for r in results]
+        }
+        with open(args.output,"w",encoding="utf-8") as f:
+            json.dump(report,f,indent=2,default=str)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import time
+from benchmarks.bench_harness import build_instruments
+from sim_instruments.sim_setup import install_sim_instruments, remove_sim_instruments
+from laser_config.laser_driver_api import Laser_Driver_API
+from laser_config.config_apc_laser import APCLaserConfig
+from tec_config.daq_api import DAQ_api
+
+"""
+bench_driver_overhead.py - per call overhead of the instrument API classes. Each call is timed
+against zero latency simulated instruments and compared with calling the instrument directly, so
+the difference is the time spent in the API layer (hardware checks, register encoding, caching).
+
+usage: python -m benchmarks.bench_driver_overhead --calls 20000
+"""
+
+def per_call(fn,calls,repeat):
+    #best of repeat runs, in us per call
+    fn() #first call connects / binds the instrument
+    best = float("inf")
+    for r in range(repeat):
+        start = time.perf_counter()
+        for i in range(calls):
+            fn()
+        best = min(best,time.perf_counter() - start)
+    return best / calls * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="instrument API per call overhead")
+    parser.add_argument("--calls",type=int,default=20000)
+    parser.add_argument("--repeat",type=int,default=5)
+    args = parser.parse_args()
+
+    instruments = build_instruments(latency={"debug_cable":0.0,"opm":0.0,"daq":0.0})
+    instruments["opm"].settle_time = 0.0
+    install_sim_instruments(instruments)
+    try:
+        cable,opm,daq = instruments["debug_cable"],instruments["opm"],instruments["daq"]
+        laser_driver = Laser_Driver_API()
+        apc_config = APCLaserConfig()
+        daq_api = DAQ_api()
+        daq_api.config_daq(ch=[1,2],fcn=[0,0])
+
+        state = [0]
+        def toggle_laser_state():
+            #alternate the value so the write is not skipped by the register cache
+            state[0] ^= 1
+            laser_driver.set_laser_state(1,state[0])
+
+        def read_register_miss():
+            laser_driver.invalidate_cache("LASER1_PLR")
+            laser_driver.read_register("LASER1_PLR")
+
+        #(API call, the API call, the raw instrument calls it makes)
+        rows = [
+            ("Laser_Driver_API.set_laser_state",toggle_laser_state,lambda: cable.write_reg("src.state[0]","0x00000")),
+            ("Laser_Driver_API.read_register",read_register_miss,lambda: cable.read_reg("src.hp.plr")),
+            ("DAQ_api.get_data",daq_api.get_data,daq.read_data),
+            ("APCLaserConfig.setup_opm",lambda: apc_config.setup_opm(1550.0,1),lambda: (opm.set_opm_channel(1),opm.set_wavelength(1550.0))),
+        ]
+        print(f"{'call':<36}{'raw us':>10}{'API us':>10}{'overhead us':>14}")
+        for name,api_fn,raw_fn in rows:
+            raw,api = per_call(raw_fn,args.calls,args.repeat),per_call(api_fn,args.calls,args.repeat)
+            print(f"{name:<36}{raw:>10.2f}{api:>10.2f}{api-raw:>14.2f}")
+    finally:
+        remove_sim_instruments()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import builtins
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from sim_instruments.sim_base import LatencyModel
+from sim_instruments.sim_setup import create_sim_instruments, install_sim_instruments, remove_sim_instruments
+
+"""
+bench_harness.py - shared pieces for the benchmarks. Runs a workflow against the simulated
+instruments with scripted operator input in place of input(), and records wall time, time spent
+sleeping, time spent in (simulated) instrument I/O and the instrument call counts.
+"""
+
+#default per call latency of each simulated instrument (seconds)
+DEFAULT_LATENCY = {"debug_cable":0.005,"opm":0.02,"daq":0.05}
+
+class ScriptedInput:
+    #replaces input(). Each rule is (prompt substring, response). The response can be a string or a
+    #callable which is passed the prompt (ie. to power cycle the simulated board). Prompts that do not
+    #match a rule get the default response
+    def __init__(self,rules=None,default=""):
+        self.rules = rules or []
+        self.default = default
+        self.prompts = []
+
+    def __call__(self,prompt=""):
+        self.prompts.append(prompt)
+        for match,response in self.rules:
+            if match.lower() in prompt.lower():
+                return response(prompt) if callable(response) else response
+        return self.default
+
+@dataclass
+class BenchResult:
+    workflow: str
+    result: object = None
+    wall_time: float = 0.0
+    sleep_requested: float = 0.0
+    sleep_actual: float = 0.0
+    io_time: float = 0.0
+    sleep_calls: int = 0
+    calls: dict = field(default_factory=dict)
+
+def build_instruments(latency=None,**kwargs):
+    latency = latency or DEFAULT_LATENCY
+    models = {name:LatencyModel(base=delay) for name,delay in latency.items()}
+    return create_sim_instruments(latency=models,**kwargs)
+
+@contextmanager
+def patched_sleep(record:BenchResult,sleep_scale=1.0):
+    #counts every time.sleep call. sleep_scale < 1 shortens the real sleep while still recording the requested time
+    real_sleep = time.sleep
+    def bench_sleep(seconds):
+        record.sleep_calls += 1
+        record.sleep_requested += seconds
+        start = time.perf_counter()
+        real_sleep(seconds * sleep_scale)
+        record.sleep_actual += time.perf_counter() - start
+    time.sleep = bench_sleep
+    try:
+        yield
+    finally:
+        time.sleep = real_sleep
+
+@contextmanager
+def patched_input(scripted:ScriptedInput):
+    real_input = builtins.input
+    builtins.input = scripted
+    try:
+        yield
+    finally:
+        builtins.input = real_input
+
+def run_workflow(name,workflow,instruments,scripted=None,sleep_scale=1.0):
+    #runs workflow() with the instruments installed, returns a BenchResult
+    record = BenchResult(workflow=name)
+    install_sim_instruments(instruments)
+    for instrument in instruments.values():
+        instrument.reset_stats()
+    try:
+        with patched_input(scripted or ScriptedInput()), patched_sleep(record,sleep_scale):
+            start = time.perf_counter()
+            record.result = workflow()
+            record.wall_time = time.perf_counter() - start
+    finally:
+        remove_sim_instruments()
+    for inst_name,instrument in instruments.items():
+        record.io_time += instrument.io_time
+        record.calls[inst_name] = dict(instrument.call_counts)
+    return record
@@ -0,0 +1,133 @@
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from benchmarks.bench_harness import build_instruments
+from sim_instruments.sim_setup import install_sim_instruments, remove_sim_instruments
+from laser_config.laser_driver_api import Laser_Driver_API
+from laser_config.config_apc_laser import APCLaserConfig, APCLaserContext
+from hp_laser_logging import LOG_FORMAT, REGISTER_LOGGER, start_logging, stop_logging
+
+"""
+bench_logging.py - time spent logging in the PLR ramp loop. Runs APCLaserConfig._probe_plr (set PLR,
+enable the laser, read power, check the board status) against zero latency simulated instruments so
+the loop time is the python + logging overhead, with:
+
+    none    - logging disabled (baseline)
+    sync    - the old setup_logging: root at DEBUG, FileHandler + StreamHandler written in the loop
+    queue   - hp_laser_logging with the register messages turned on (same records as sync)
+    default - hp_laser_logging with the default per module levels
+
+The console handler writes to os.devnull unless --console is given. --sink-delay adds a delay to every
+console write to stand in for a slow console / network share (a Windows console write is typically
+0.1-1ms), the file and console writes are where the queue moves time out of the loop.
+
+usage: python -m benchmarks.bench_logging --probes 2000
+"""
+
+class SlowStream:
+    def __init__(self,stream,delay):
+        self.stream = stream
+        self.delay = delay
+
+    def write(self,text):
+        time.sleep(self.delay)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+def make_config():
+    apc_config = APCLaserConfig(logger=logging.getLogger("laser_config.config_apc_laser"))
+    apc_config.ctx = APCLaserContext(
+        logger=apc_config.logger,
+        laser_driver=Laser_Driver_API(logger=apc_config.logger),
+        laser_channel=1,
+        adaptive_settle=False,
+        settle_delay=0.0
+    )
+    apc_config._check_hardware(opm=None)
+    return apc_config
+
+def sync_logging(log_path,console):
+    for handler in logging.root.handlers[:]:
+        logging.root.removeHandler(handler)
+    logging.basicConfig(
+        level=logging.DEBUG,
+        format=LOG_FORMAT,
+        handlers=[
+            logging.FileHandler(log_path,mode='a',encoding='utf-8'),
+            logging.StreamHandler(console)
+        ]
+    )
+    logging.getLogger(REGISTER_LOGGER).setLevel(logging.DEBUG)
+
+def queue_logging(log_path,console,levels=None):
+    for handler in logging.root.handlers[:]:
+        logging.root.removeHandler(handler)
+    listener = start_logging(log_path,levels=levels,compress=False)
+    #point the listener's console handler at the selected stream
+    for handler in listener.handlers:
+        if type(handler) is logging.StreamHandler:
+            handler.setStream(console)
+
+def run_probes(probes):
+    apc_config = make_config()
+    apc_config._probe_plr(0) #connect / warm up outside of the timed loop
+    start = time.perf_counter()
+    for i in range(probes):
+        apc_config._probe_plr(i % 256)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="logging overhead in the PLR ramp loop")
+    parser.add_argument("--probes",type=int,default=2000)
+    parser.add_argument("--console",action="store_true",help="write the console handler to the real console")
+    parser.add_argument("--sink-delay",type=float,default=0.0,help="seconds added to every console write")
+    args = parser.parse_args()
+
+    instruments = build_instruments(latency={"debug_cable":0.0,"opm":0.0,"daq":0.0})
+    instruments["opm"].settle_time = 0.0
+    install_sim_instruments(instruments)
+    devnull = None if args.console else open(os.devnull,"w")
+    console = devnull or sys.stderr
+    if args.sink_delay > 0:
+        console = SlowStream(console,args.sink_delay)
+    results = {}
+    with tempfile.TemporaryDirectory() as log_dir:
+        try:
+            logging.disable(logging.CRITICAL)
+            results["none"] = run_probes(args.probes)
+            logging.disable(logging.NOTSET)
+
+            sync_logging(os.path.join(log_dir,"sync.txt"),console)
+            results["sync"] = run_probes(args.probes)
+
+            queue_logging(os.path.join(log_dir,"queue.txt"),console,levels={REGISTER_LOGGER:logging.DEBUG})
+            results["queue"] = run_probes(args.probes)
+            stop_logging()
+
+            queue_logging(os.path.join(log_dir,"default.txt"),console)
+            results["default"] = run_probes(args.probes)
+            stop_logging()
+        finally:
+            for handler in logging.root.handlers[:]:
+                logging.root.removeHandler(handler)
+                handler.close()
+            remove_sim_instruments()
+            if devnull is not None:
+                devnull.close()
+
+    baseline = results["none"]
+    print(f"{'mode':<10}{'us/probe':>12}{'logging us/probe':>20}")
+    for mode,elapsed in results.items():
+        print(f"{mode:<10}{elapsed/args.probes*1e6:12.1f}{(elapsed-baseline)/args.probes*1e6:20.1f}")
+    sync_cost = results["sync"] - baseline
+    if sync_cost > 0:
+        print(f"\nlogging time removed from the ramp loop: queue {1-(results['queue']-baseline)/sync_cost:.0%}, "
+              f"default levels {1-(results['default']-baseline)/sync_cost:.0%}")
+
+if __name__ == "__main__":
+    main()
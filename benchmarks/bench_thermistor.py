@@ -0,0 +1,62 @@
+import argparse
+import math
+import random
+import time
+from array import array
+from tec_config.tec_data import TecData
+
+"""
+bench_thermistor.py - throughput (samples/s) of the thermistor conversion paths: the scalar
+TecData.calc_temp loop used by calc_temp_readings, the batch ThermistorConverter and the batch
+converter with its interpolation table. Also reports the largest table error against the scalar path.
+
+usage: python -m benchmarks.bench_thermistor --samples 200000
+"""
+
+def make_readings(frames:int,num_ch:int,seed=1):
+    #interleaved [i1,v1,i2,v2...] frames for temperatures between 15 and 60C
+    rng = random.Random(seed)
+    readings = array('d')
+    for f in range(frames):
+        for ch in range(num_ch):
+            temp_k = rng.uniform(15.0,60.0) + 273.15
+            r_therm = 10000 * math.exp(3900 * (1 / 297.75 - 1 / temp_k))
+            readings.append(1.0)
+            readings.append(1.0 / 10000 * r_therm)
+    return readings
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result,time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="thermistor conversion throughput")
+    parser.add_argument("--samples",type=int,default=200000,help="samples per channel")
+    parser.add_argument("--channels",type=int,default=2)
+    args = parser.parse_args()
+    num_ch = args.channels
+    readings = make_readings(args.samples,num_ch)
+    tec = TecData()
+    total = args.samples * num_ch
+
+    def scalar():
+        out = []
+        for f in range(0,len(readings),2*num_ch):
+            for ch in range(num_ch):
+                out.append(tec.calc_temp(ch=ch+1,v_therm=readings[f+2*ch+1],i_therm=readings[f+2*ch]))
+        return out
+    scalar_temps,scalar_time = timed(scalar)
+    batch = tec.converter(num_ch)
+    batch_temps,batch_time = timed(lambda: batch.convert(readings))
+    table = tec.converter(num_ch,use_table=True)
+    table_temps,table_time = timed(lambda: table.convert(readings))
+
+    max_err = max(abs(table_temps[ch][i] - scalar_temps[i*num_ch+ch]) for ch in range(num_ch) for i in range(args.samples))
+    max_batch_err = max(abs(batch_temps[ch][i] - scalar_temps[i*num_ch+ch]) for ch in range(num_ch) for i in range(args.samples))
+    print(f"scalar calc_temp : {total/scalar_time:12,.0f} samples/s")
+    print(f"batch converter  : {total/batch_time:12,.0f} samples/s (x{scalar_time/batch_time:.1f}, max err {max_batch_err:.2e}C)")
+    print(f"batch + table    : {total/table_time:12,.0f} samples/s (x{scalar_time/table_time:.1f}, max err {max_err:.2e}C)")
+
+if __name__ == "__main__":
+    main()
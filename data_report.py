@@ -1,5 +1,14 @@
 import csv
+import json
+import logging
+import math
 import os
+import queue
+import struct
+import sys
+import threading
+import time
+from array import array
 
 class DataWriter():
     def __init__(self,directory=r"C:\Santec Data",file_name="default.csv"):
@@ -41,6 +50,153 @@ class DataWriter():
         #writes text to a file (typically a .txt file).
         if not self.file_flag:
             self._initialize_file()
-        self._writer.write
+        self._file.write(txt)
 
+#TraceRecorder - records the PLR / power / board status / TEC temperature trace of a config session.
+#Samples are appended to an in memory columnar buffer (one array('d') per column) which is handed off
+#to a background thread every chunk_rows samples (or flush_interval seconds) and appended to a binary
+#trace file, so recording never waits on the disk. Missing values are stored as NaN.
+#
+#Trace file layout (append only):
+#    b"HPTRACE1" + uint32 header length + json header {"columns":[...]}
+#    chunks of b"CHNK" + uint32 row count + each column as row count little endian doubles
+TRACE_MAGIC = b"HPTRACE1"
+CHUNK_MAGIC = b"CHNK"
+TRACE_COLUMNS = ("timestamp","source","channel","plr","power_level","power","board_status","tec1","tec2")
+TRACE_SOURCES = {"power_ramp":1,"plr_ramp":2,"tec":3}
 
+class TraceRecorder:
+    def __init__(self,filepath:str,chunk_rows=256,flush_interval=2.0,logger=None):
+        self.filepath = filepath
+        self.chunk_rows = chunk_rows
+        self.flush_interval = flush_interval
+        self.logger = logger or logging.getLogger(__name__)
+        self.samples = 0
+        self.dropped_chunks = 0 #chunks that could not be written, their samples are lost
+        self.dropped_samples = 0
+        self._lock = threading.Lock()
+        self._buffer = self._new_buffer()
+        self._chunks = queue.Queue()
+        self._closed = False
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory,exist_ok=True)
+        if not os.path.exists(filepath) or os.path.getsize(filepath) == 0:
+            header = json.dumps({"columns":list(TRACE_COLUMNS)}).encode("utf-8")
+            with open(filepath,"wb") as f:
+                f.write(TRACE_MAGIC + struct.pack("<I",len(header)) + header)
+        self._thread = threading.Thread(target=self._flush_loop,name="trace-recorder",daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def _new_buffer():
+        return {name:array('d') for name in TRACE_COLUMNS}
+
+    def record(self,source:str,channel=None,plr=None,power_level=None,power=None,board_status=None,tec_temps=()):
+        #adds a sample to the buffer. tec_temps is a list of TEC temperatures (CH1, CH2)
+        if self._closed:
+            return
+        temps = list(tec_temps)[:2] + [None] * (2 - len(tec_temps[:2]))
+        row = (time.time(),TRACE_SOURCES[source],channel,plr,power_level,power,board_status,*temps)
+        with self._lock:
+            for column,value in zip(self._buffer.values(),row):
+                column.append(math.nan if value is None else value)
+            self.samples += 1
+            if len(self._buffer["timestamp"]) >= self.chunk_rows:
+                self._hand_off()
+
+    def _hand_off(self):
+        #must be called with the lock held
+        if len(self._buffer["timestamp"]):
+            self._chunks.put(self._buffer)
+            self._buffer = self._new_buffer()
+
+    def _write_chunk(self,chunk):
+        rows = len(chunk["timestamp"])
+        with open(self.filepath,"ab") as f:
+            f.write(CHUNK_MAGIC + struct.pack("<I",rows))
+            for column in chunk.values():
+                if sys.byteorder == "big":
+                    column = array('d',column)
+                    column.byteswap()
+                f.write(column.tobytes())
+
+    def _flush_loop(self):
+        while True:
+            try:
+                chunk = self._chunks.get(timeout=self.flush_interval)
+            except queue.Empty:
+                with self._lock:
+                    self._hand_off()
+                continue
+            try:
+                if chunk is None:
+                    return
+                self._write_chunk(chunk)
+            except Exception as e:
+                #keep the writer alive so flush / close don't wait forever, the chunk is dropped
+                self.dropped_chunks += 1
+                self.dropped_samples += len(chunk["timestamp"])
+                self.logger.info(f"WARNING: could not write {len(chunk['timestamp'])} trace samples to {self.filepath}: {e}")
+            finally:
+                self._chunks.task_done()
+
+    def flush(self):
+        #hands the buffered samples to the writer thread and waits for them to be on disk
+        with self._lock:
+            self._hand_off()
+        self._chunks.join()
+
+    def close(self):
+        if self._closed:
+            return
+        with self._lock:
+            self._closed = True
+            self._hand_off()
+        self._chunks.put(None)
+        self._thread.join()
+
+def read_trace(filepath:str):
+    #reads a trace file back into a dict of column name : array('d')
+    with open(filepath,"rb") as f:
+        if f.read(len(TRACE_MAGIC)) != TRACE_MAGIC:
+            raise ValueError(f"{filepath} is not a trace file")
+        header_len, = struct.unpack("<I",f.read(4))
+        columns = json.loads(f.read(header_len).decode("utf-8"))["columns"]
+        data = {name:array('d') for name in columns}
+        while True:
+            chunk_header = f.read(len(CHUNK_MAGIC) + 4)
+            if len(chunk_header) < len(CHUNK_MAGIC) + 4 or chunk_header[:4] != CHUNK_MAGIC:
+                break #end of file (or a chunk cut short by a crash)
+            rows, = struct.unpack("<I",chunk_header[4:])
+            chunk = {}
+            for name in columns:
+                values = array('d')
+                raw = f.read(rows * values.itemsize)
+                if len(raw) < rows * values.itemsize:
+                    return data
+                values.frombytes(raw)
+                if sys.byteorder == "big":
+                    values.byteswap()
+                chunk[name] = values
+            for name in columns:
+                data[name].extend(chunk[name])
+    return data
+
+def export_trace_csv(filepath:str,csv_path=None):
+    #exports a trace file to csv, returns the csv path
+    csv_path = csv_path or os.path.splitext(filepath)[0] + ".csv"
+    data = read_trace(filepath)
+    sources = {code:name for name,code in TRACE_SOURCES.items()}
+    columns = list(data)
+    with open(csv_path,"w",newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for row in zip(*data.values()):
+            values = dict(zip(columns,row))
+            values["source"] = sources.get(int(values["source"]),values["source"])
+            for name in ("channel","plr","power_level","board_status"):
+                if not math.isnan(values[name]):
+                    values[name] = int(values[name])
+            writer.writerow("" if isinstance(v,float) and math.isnan(v) else v for v in values.values())
+    return csv_path
@@ -0,0 +1,35 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from hp_laser_decorator import get_instrument_cache, bind_instrument_cache
+
+"""
+hp_laser_async.py - asyncio wrapper for the blocking instrument APIs (Laser_Driver_API, DAQ_api and
+the OPM plugin). Every wrapped object gets its own single thread executor, so calls to the same
+instrument run one at a time in order while calls to different instruments overlap. The instrument
+cache of the creating thread (ie. a station session) is bound to the executor thread so
+auto_connect_instruments finds the same instruments.
+
+    driver = AsyncInstrument(Laser_Driver_API(),"debug_cable")
+    await driver.set_plr(1,100)
+"""
+
+class AsyncInstrument:
+    def __init__(self,target,name="instrument"):
+        self.target = target
+        self.name = name
+        self._cache = get_instrument_cache()
+        self._executor = ThreadPoolExecutor(max_workers=1,thread_name_prefix=f"async-{name}",initializer=bind_instrument_cache,initargs=(self._cache,))
+
+    async def call(self,method:str,*args,**kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor,functools.partial(getattr(self.target,method),*args,**kwargs))
+
+    def __getattr__(self,method:str):
+        #any other attribute is treated as a blocking method of the wrapped object
+        if method.startswith("_"):
+            raise AttributeError(method)
+        return functools.partial(self.call,method)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
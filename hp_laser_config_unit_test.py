@@ -1,4 +1,5 @@
 from laser_config.laser_driver_api import Laser_Driver_API
+from laser_config.reboot_watcher import RebootWatcher
 import logging
 from datetime import datetime
 import os
@@ -58,12 +59,12 @@ def main():
     logger.info(f"Resetting board to default...")
     laser_driver.reset_board_to_default()
 
-    input(f"Power cycle the driver board. Press ENTER when the board has reinitialized: ")
-    logger.info(f"User has confirmed a power cycle...")
+    reboot = RebootWatcher(logger=logger).watch(laser_driver,f"Power cycle the driver board, waiting for the board to reinitialize...",
+                                                f"Power cycle the driver board. Press ENTER when the board has reinitialized: ")
+    logger.info(f"Power cycle detected, board back after {reboot.elapsed:.1f}s" if reboot.ready else f"User has confirmed a power cycle...")
     logger.info(f"Reading back register values:")
 
-    for i in reg_list:
-        resp = laser_driver.read_register(i)
+    for i,resp in laser_driver.read_registers(reg_list).items():
         logger.info(f"Register: {i} Value: {resp}")
 
     logger.info(f"**********************************************")
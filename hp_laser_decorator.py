@@ -1,27 +1,147 @@
 from plugin_system.plugin_loader import autodetect_devices
+from dataclasses import dataclass
 from functools import wraps
+import importlib
+import json
 import logging
+import os
+import threading
+import time
+from hp_laser_metrics import instrument as wrap_instrument
 
 _instrument_cache = {}
+#station sessions bind their own instrument cache to the thread running the station
+_session = threading.local()
 logger = logging.getLogger(__name__)
 
+#the address and identity of the last instrument found for each type are saved here so the next
+#start can try that address before doing a full autodetect scan
+DISCOVERY_CACHE_PATH = os.path.join(os.path.expanduser("~"),".hp_laser_config","instrument_discovery.json")
+_discovery_lock = threading.Lock()
+_connect_locks = {}
+#plugin package of each instrument, a discovery cache entry is only imported from its instrument's package
+_PLUGIN_PACKAGES = {"debug_cable":"debug_cable_plugins","opm":"opm_plugins","daq":"daq_plugins"}
+_PLUGIN_TYPES = {"debug_cable":"CLI_Cable","opm":"opm","daq":"daq"}
+
+#Quick connect contract. autodetect_devices is the only entry point of the plugin loader, so a plugin
+#instrument class which can be reopened without a scan provides:
+#    address - the address it was opened at
+#    identify() - the identity string of the instrument (ie. *IDN?)
+#    open(address) - classmethod which opens the instrument at an address
+#Instruments without all three are reconnected / found again with a full autodetect scan.
+
+def get_instrument_cache():
+    #returns the instrument cache bound to this thread, or the process wide cache if none is bound
+    cache = getattr(_session,"cache",None)
+    return _instrument_cache if cache is None else cache
+
+def bind_instrument_cache(cache:dict):
+    _session.cache = cache
+
+def unbind_instrument_cache():
+    _session.cache = None
+
+def _supports_quick_connect(instrument):
+    return getattr(instrument,"address",None) is not None and callable(getattr(instrument,"identify",None)) \
+        and callable(getattr(type(instrument),"open",None))
+
+def _load_discovery_cache():
+    try:
+        with open(DISCOVERY_CACHE_PATH,"r",encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError,ValueError):
+        return {}
+
+def _save_discovery_entry(name:str,instrument):
+    cls = type(instrument)
+    if not _supports_quick_connect(instrument):
+        logger.info(f"{name} plugin {cls.__qualname__} has no address / identify() / open(), it can't be cached and is found with a full scan")
+        return
+    try:
+        address,identity = str(instrument.address),str(instrument.identify())
+    except Exception as e:
+        logger.info(f"Could not identify {name} at {instrument.address}, it can't be cached: {e}")
+        return
+    with _discovery_lock:
+        entries = _load_discovery_cache()
+        entries[name] = {"module":cls.__module__,"class":cls.__qualname__,"address":address,"identity":identity}
+        try:
+            os.makedirs(os.path.dirname(DISCOVERY_CACHE_PATH),exist_ok=True)
+            with open(DISCOVERY_CACHE_PATH,"w",encoding="utf-8") as f:
+                json.dump(entries,f,indent=2)
+        except OSError as e:
+            logger.debug(f"Could not save instrument discovery cache: {e}")
+
+def _close_quietly(instrument):
+    close = getattr(instrument,"close",None)
+    if callable(close):
+        try:
+            close()
+        except Exception:
+            pass
+
+def _connect_cached(name:str):
+    #reopens the instrument at the cached address and checks it is the same instrument. Returns None if
+    #there is no cache entry or anything about the quick connect fails.
+    entry = _load_discovery_cache().get(name)
+    if entry is None:
+        return None
+    package = _PLUGIN_PACKAGES.get(name)
+    module = str(entry.get("module",""))
+    if package is None or not (module == package or module.startswith(f"{package}.")):
+        logger.debug(f"Cached {name} module {module} is not in the {package} plugins, ignoring the entry")
+        return None
+    try:
+        cls = getattr(importlib.import_module(module),entry["class"])
+        instrument = cls.open(entry["address"])
+        identity = str(instrument.identify())
+    except Exception as e:
+        logger.info(f"Cached {name} at {entry.get('address')} could not be opened, doing a full scan: {e}")
+        return None
+    if identity != entry["identity"]:
+        logger.info(f"Cached {name} at {entry['address']} is {identity}, not {entry['identity']}, doing a full scan")
+        #a different instrument answered at the address, release it for the full scan
+        _close_quietly(instrument)
+        return None
+    return instrument
+
+def _discover(name:str,package:str,type:str):
+    start = time.perf_counter()
+    instrument = _connect_cached(name)
+    method = "cached address"
+    if instrument is None:
+        method = "full scan"
+        instrument = autodetect_devices(package=package,type=type)
+        if instrument is not None:
+            _save_discovery_entry(name,instrument)
+    logger.info(f"{name} discovery ({method}) took {time.perf_counter() - start:.2f}s")
+    return instrument
+
+def _connect_lock(cache:dict,name:str):
+    #one lock per instrument of each instrument cache, shared by connects and reconnects
+    with _discovery_lock:
+        return _connect_locks.setdefault((id(cache),name),threading.Lock())
+
+def _connect(name:str,package:str,type:str,message:str):
+    #connects the instrument once per instrument cache. The lock stops a warm up thread and a
+    #workflow from both scanning for the same instrument.
+    cache = get_instrument_cache()
+    if name not in cache:
+        with _connect_lock(cache,name):
+            if name not in cache:
+                logger.info(message)
+                #wrapped in an InstrumentProxy if the instrument metrics are enabled
+                cache[name] = wrap_instrument(name,_discover(name,package=package,type=type))
+    return cache[name]
+
 def connect_debug_cable():
-    if "debug_cable" not in _instrument_cache:
-        logger.info(f"Connecting to debug cable...")
-        _instrument_cache["debug_cable"] = autodetect_devices(package="debug_cable_plugins",type="CLI_Cable")
-    return _instrument_cache["debug_cable"]
+    return _connect("debug_cable",_PLUGIN_PACKAGES["debug_cable"],_PLUGIN_TYPES["debug_cable"],f"Connecting to debug cable...")
 
 def connect_opm():
-    if "opm" not in _instrument_cache:
-        logger.info("Connecting to OPM...")
-        _instrument_cache["opm"] = autodetect_devices(package="opm_plugins",type="opm")
-    return _instrument_cache["opm"]
+    return _connect("opm",_PLUGIN_PACKAGES["opm"],_PLUGIN_TYPES["opm"],"Connecting to OPM...")
 
 def connect_daq():
-    if "daq" not in _instrument_cache:
-        logger.info("Connecting to DAQ...")
-        _instrument_cache["daq"] = autodetect_devices(package="daq_plugins",type="daq")
-    return _instrument_cache["daq"]
+    return _connect("daq",_PLUGIN_PACKAGES["daq"],_PLUGIN_TYPES["daq"],"Connecting to DAQ...")
     
 #Define a list of connection functions for the decorator
 connect_funcs = {
@@ -46,4 +166,158 @@ def auto_connect_instruments(required=[]):
             result = func(*args,**new_kwargs)
             return result
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
+
+#exceptions which mean the instrument connection dropped (pyvisa errors if pyvisa is installed)
+CONNECTION_ERRORS = (OSError,ConnectionError,TimeoutError)
+try:
+    from pyvisa.errors import VisaIOError
+    CONNECTION_ERRORS += (VisaIOError,)
+except ImportError:
+    pass
+
+@dataclass
+class ReconnectPolicy:
+    attempts: int = 3 #reconnect attempts before giving up
+    delay: float = 1.0 #seconds between attempts
+    errors: tuple = CONNECTION_ERRORS
+
+def _reopen(name:str,dropped):
+    #opens the instrument again at the address of the dropped instrument through the plugin's open()
+    #(see the quick connect contract). Plugins without it go through the loader again (cached address,
+    #then an autodetect scan), but only for the process wide instrument cache: a station session's
+    #instruments are not in the discovery cache and a scan could pick up another station's instrument
+    raw = getattr(dropped,"_target",dropped) #unwrap the metrics InstrumentProxy
+    if raw is not None and _supports_quick_connect(raw):
+        return type(raw).open(raw.address)
+    if get_instrument_cache() is _instrument_cache:
+        instrument = _discover(name,package=_PLUGIN_PACKAGES[name],type=_PLUGIN_TYPES[name])
+        if instrument is not None:
+            return instrument
+    raise RuntimeError(f"No address to reconnect {name} to")
+
+def reconnect_instrument(name:str,dropped=None):
+    #closes the dropped instrument (the one in the instrument cache if not given) and opens it again
+    #at the same address, the new instrument replaces it in the instrument cache. Reconnects of the same
+    #instrument are serialised, if another client already replaced it the new instrument is returned.
+    cache = get_instrument_cache()
+    with _connect_lock(cache,name):
+        current = cache.get(name)
+        if dropped is None:
+            dropped = current
+        elif current is not None and current is not dropped:
+            logger.info(f"{name} was already reconnected")
+            return current
+        _close_quietly(dropped)
+        cache[name] = wrap_instrument(name,_reopen(name,dropped))
+        return cache[name]
+
+class InstrumentClient:
+    #base class of the instrument API classes (Laser_Driver_API, DAQ_api, APCLaserConfig). The instrument
+    #is bound to self.hw once (bind(), or on first use through _check_hardware) so the calls on the hot path
+    #only check that self.hw is set. Calls made through _hw_call reconnect and retry the call once if the
+    #connection dropped, following reconnect_policy.
+    instrument_name = None
+    reconnect_policy = ReconnectPolicy()
+
+    def bind(self,instrument=None):
+        #binds instrument (or the one in the instrument cache, connecting it if needed) to this object
+        if instrument is None:
+            instrument = connect_funcs[self.instrument_name]()
+            if instrument is None:
+                raise RuntimeError(f"Instrument {self.instrument_name} could not be found...")
+        self.hw = instrument
+        return self
+
+    def unbind(self):
+        self.hw = None
+
+    def health_check(self):
+        #returns True if the instrument (bound first if needed) answers (see _health_probe)
+        try:
+            if self.hw is None:
+                self.bind()
+            return self._health_probe() is not False
+        except Exception as e:
+            self.logger.debug(f"{self.instrument_name} health check failed: {e}")
+            return False
+
+    def _health_probe(self):
+        #overridden by the API classes with a cheap read of the instrument
+        return True
+
+    def _on_reconnect(self):
+        #called after the instrument was reconnected, ie. to drop state cached from the old connection
+        pass
+
+    def reconnect(self):
+        policy = self.reconnect_policy
+        last_error = None
+        dropped = self.hw
+        for attempt in range(1,policy.attempts + 1):
+            self.logger.info(f"Reconnecting to {self.instrument_name} (attempt {attempt}/{policy.attempts})...")
+            try:
+                self.hw = reconnect_instrument(self.instrument_name,self.hw if self.hw is not None else dropped)
+                if self.hw is not None and self.health_check():
+                    self._on_reconnect()
+                    return self.hw
+            except Exception as e:
+                last_error = e
+            time.sleep(policy.delay)
+        self.hw = None
+        raise RuntimeError(f"Could not reconnect to {self.instrument_name}: {last_error}")
+
+    def _hw_call(self,method:str,*args):
+        #calls method on the bound instrument, reconnecting and retrying once if the connection dropped
+        if self.hw is None:
+            self.bind()
+        try:
+            return getattr(self.hw,method)(*args)
+        except self.reconnect_policy.errors as e:
+            self.logger.info(f"WARNING! {self.instrument_name} {method} failed ({e}), connection dropped?")
+            self.reconnect()
+            return getattr(self.hw,method)(*args)
+
+class InstrumentWarmup:
+    #connects instruments on background threads (see warm_up_instruments)
+    def __init__(self,required):
+        self.required = list(required)
+        self.errors = {}
+        self._cache = get_instrument_cache()
+        self._threads = [threading.Thread(target=self._connect,args=(name,),name=f"warmup-{name}",daemon=True) for name in self.required]
+        self.start_time = time.perf_counter()
+        self.elapsed = 0.0
+        for thread in self._threads:
+            thread.start()
+
+    def _connect(self,name:str):
+        bind_instrument_cache(self._cache)
+        try:
+            if connect_funcs[name]() is None:
+                #don't leave a failed connection in the cache, the workflow will try again when it needs it
+                self._cache.pop(name,None)
+                self.errors[name] = f"Instrument {name} could not be found..."
+        except Exception as e:
+            self._cache.pop(name,None)
+            self.errors[name] = str(e)
+
+    def wait(self,timeout=None):
+        #waits for every connection attempt, returns dict of instrument name : error for the failed ones
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(deadline - time.perf_counter(),0))
+        self.elapsed = time.perf_counter() - self.start_time
+        pending = [thread.name for thread in self._threads if thread.is_alive()]
+        errors = dict(self.errors)
+        for name in pending:
+            errors[name.replace("warmup-","")] = "still connecting"
+        return errors
+
+#longest the start up waits for the warm up connections. An instrument still connecting after that is
+#picked up by the first workflow that needs it (auto_connect_instruments / bind wait for the same attempt)
+WARMUP_TIMEOUT = 30.0
+
+def warm_up_instruments(required=("debug_cable","opm","daq")):
+    #starts connecting all of the required instruments in parallel and returns straight away. Filling the
+    #instrument cache early means the first auto_connect_instruments call of a workflow does not wait
+    return InstrumentWarmup(required)
@@ -0,0 +1,117 @@
+import atexit
+import copy
+import gzip
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import threading
+
+"""
+hp_laser_logging.py - queue based logging for the config scripts. Loggers only put records on a
+queue, a QueueListener thread does the formatting and the file / console writes so the instrument
+loops do not wait on the disk or the console.
+
+Levels are set per logger name (DEFAULT_LEVELS, overridden by the levels argument or the
+HP_LASER_LOG_LEVELS environment variable, ie. "laser_config.laser_driver_api.registers=DEBUG,pyvisa=INFO").
+The per register write messages of Laser_Driver_API are DEBUG records on REGISTER_LOGGER so they are
+dropped before they are formatted unless that logger is turned up.
+
+Log files rotate at max_bytes and the rotated files (and the logs of earlier sessions of the same SN)
+are gzip compressed.
+"""
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+REGISTER_LOGGER = "laser_config.laser_driver_api.registers"
+DEFAULT_LEVELS = {
+    "":logging.DEBUG,
+    REGISTER_LOGGER:logging.INFO,
+    "pyvisa":logging.WARNING
+}
+LEVELS_ENV = "HP_LASER_LOG_LEVELS"
+
+_listener = None
+
+def parse_levels(spec:str):
+    #"name=LEVEL,name=LEVEL" -> {name:level}, "root" or an empty name is the root logger
+    levels = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        name,level = (part.strip() for part in item.split("=",1))
+        levels["" if name == "root" else name] = int(level) if level.isdigit() else logging.getLevelName(level.upper())
+    return levels
+
+def apply_levels(levels=None):
+    #applies DEFAULT_LEVELS, then levels, then the environment overrides. Returns the applied levels
+    applied = dict(DEFAULT_LEVELS)
+    applied.update(levels or {})
+    applied.update(parse_levels(os.environ.get(LEVELS_ENV,"")))
+    for name,level in applied.items():
+        logging.getLogger(name or None).setLevel(level)
+    return applied
+
+class _DeferredFormatQueueHandler(logging.handlers.QueueHandler):
+    #QueueHandler.prepare formats the whole record in the logging thread. Only the message arguments
+    #are merged here (they may change after the call), the listener's handlers do the formatting
+    def prepare(self,record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+def _gzip_namer(name):
+    return name + ".gz"
+
+def _gzip_rotator(source,dest):
+    with open(source,"rb") as f_in, gzip.open(dest,"wb") as f_out:
+        shutil.copyfileobj(f_in,f_out)
+    os.remove(source)
+
+def compress_old_logs(directory:str,current_log:str):
+    #gzips the log files of earlier sessions in directory (the current log file is left alone)
+    for file_name in os.listdir(directory):
+        path = os.path.join(directory,file_name)
+        if "LogFile" in file_name and file_name.endswith(".txt") and os.path.abspath(path) != os.path.abspath(current_log):
+            try:
+                _gzip_rotator(path,path + ".gz")
+            except OSError:
+                pass #file is in use by another session
+
+def stop_logging():
+    #flushes the queue and stops the listener thread
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+def start_logging(log_path:str,levels=None,max_bytes=5_000_000,backup_count=20,console=True,compress=True):
+    #replaces the root handlers with a QueueHandler feeding a rotating file handler (and the console)
+    global _listener
+    stop_logging()
+    for handler in logging.root.handlers[:]:
+        logging.root.removeHandler(handler)
+    formatter = logging.Formatter(LOG_FORMAT)
+    file_handler = logging.handlers.RotatingFileHandler(log_path,mode='a',maxBytes=max_bytes,backupCount=backup_count,encoding='utf-8')
+    if compress:
+        file_handler.namer = _gzip_namer
+        file_handler.rotator = _gzip_rotator
+    handlers = [file_handler]
+    if console:
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    logging.root.addHandler(_DeferredFormatQueueHandler(log_queue))
+    _listener = logging.handlers.QueueListener(log_queue,*handlers,respect_handler_level=True)
+    _listener.start()
+    apply_levels(levels)
+    if compress:
+        threading.Thread(target=compress_old_logs,args=(os.path.dirname(log_path) or ".",log_path),daemon=True).start()
+    return _listener
+
+atexit.register(stop_logging)
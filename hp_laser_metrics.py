@@ -0,0 +1,186 @@
+import bisect
+import json
+import os
+import threading
+import time
+
+"""
+hp_laser_metrics.py - per command instrument latency metrics. When metrics are enabled the instruments
+handed out by the hp_laser_decorator connect functions are wrapped in an InstrumentProxy which times
+every method call. Calls are grouped by instrument, command and (for the debug cable read_reg /
+write_reg commands) register, each with a count, total / min / max time, a latency histogram and an
+error count. Read retries (the debug cable answering "Error reading register") are counted per register.
+
+Metrics are off unless enable_metrics() is called or HP_LASER_METRICS=1 is set, when off the raw
+instruments are used and the only cost is a flag check on a register read retry.
+
+    enable_metrics()
+    ... run workflows ...
+    logger.info(metrics.summary_table())
+    metrics.export_json(path)
+"""
+
+METRICS_ENV = "HP_LASER_METRICS"
+#histogram bucket upper bounds (seconds), the last bucket holds everything slower
+HISTOGRAM_BOUNDS = (0.0005,0.001,0.002,0.005,0.01,0.02,0.05,0.1,0.2,0.5,1.0,2.0,5.0)
+#commands whose first argument is a register, these are recorded per register
+REGISTER_COMMANDS = ("read_reg","write_reg")
+
+class CommandStats:
+    __slots__ = ("count","errors","total","min","max","histogram")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.histogram = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+
+    def add(self,elapsed:float,error=False):
+        self.count += 1
+        self.errors += error
+        self.total += elapsed
+        self.min = min(self.min,elapsed)
+        self.max = max(self.max,elapsed)
+        self.histogram[bisect.bisect_left(HISTOGRAM_BOUNDS,elapsed)] += 1
+
+    def percentile(self,pct:float):
+        #upper bound of the histogram bucket holding the pct percentile (approximate)
+        target = self.count * pct / 100.0
+        seen = 0
+        for i,count in enumerate(self.histogram):
+            seen += count
+            if count and seen >= target:
+                return min(HISTOGRAM_BOUNDS[i],self.max) if i < len(HISTOGRAM_BOUNDS) else self.max
+        return 0.0
+
+    def to_dict(self):
+        return {
+            "count":self.count,
+            "errors":self.errors,
+            "total_s":self.total,
+            "mean_s":self.total / self.count if self.count else 0.0,
+            "min_s":self.min if self.count else 0.0,
+            "max_s":self.max,
+            "p50_s":self.percentile(50),
+            "p95_s":self.percentile(95),
+            "histogram":dict(zip([f"<={bound}" for bound in HISTOGRAM_BOUNDS] + [f">{HISTOGRAM_BOUNDS[-1]}"],self.histogram))
+        }
+
+class InstrumentMetrics:
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.commands = {} #(instrument, command, register) : CommandStats
+            self.retries = {} #(instrument, register) : retry count
+            self.start_time = time.time()
+
+    def record(self,instrument:str,command:str,register,elapsed:float,error=False):
+        key = (instrument,command,register)
+        with self._lock:
+            stats = self.commands.get(key)
+            if stats is None:
+                stats = self.commands[key] = CommandStats()
+            stats.add(elapsed,error)
+
+    def record_retry(self,instrument:str,register:str):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.retries[(instrument,register)] = self.retries.get((instrument,register),0) + 1
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "start_time":self.start_time,
+                "end_time":time.time(),
+                "commands":[{"instrument":instrument,"command":command,"register":register,**stats.to_dict()}
+                            for (instrument,command,register),stats in self.commands.items()],
+                "retries":[{"instrument":instrument,"register":register,"retries":count}
+                           for (instrument,register),count in self.retries.items()]
+            }
+
+    def export_json(self,filepath:str):
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory,exist_ok=True)
+        with open(filepath,"w",encoding="utf-8") as f:
+            json.dump(self.to_dict(),f,indent=2)
+        return filepath
+
+    def summary_table(self):
+        #text table of the commands sorted by total time
+        data = self.to_dict()
+        rows = sorted(data["commands"],key=lambda row: row["total_s"],reverse=True)
+        lines = [f"{'instrument':<12}{'command':<18}{'register':<18}{'count':>7}{'total s':>10}{'mean ms':>10}{'p95 ms':>10}{'max ms':>10}{'errors':>8}"]
+        for row in rows:
+            lines.append(f"{row['instrument']:<12}{row['command']:<18}{str(row['register'] or ''):<18}{row['count']:>7}"
+                         f"{row['total_s']:>10.3f}{row['mean_s']*1e3:>10.2f}{row['p95_s']*1e3:>10.2f}{row['max_s']*1e3:>10.2f}{row['errors']:>8}")
+        for row in data["retries"]:
+            lines.append(f"{row['instrument']} {row['register']}: {row['retries']} read retries")
+        return "\n".join(lines)
+
+metrics = InstrumentMetrics()
+
+class InstrumentProxy:
+    #times every method call made on the wrapped instrument, other attributes are passed through
+    def __init__(self,target,name:str,recorder:InstrumentMetrics=None):
+        object.__setattr__(self,"_target",target)
+        object.__setattr__(self,"_name",name)
+        object.__setattr__(self,"_metrics",recorder or metrics)
+
+    def __getattr__(self,attr):
+        value = getattr(self._target,attr)
+        if not callable(value) or attr.startswith("_"):
+            return value
+        name,recorder = self._name,self._metrics
+        per_register = attr in REGISTER_COMMANDS
+        def timed(*args,**kwargs):
+            start = time.perf_counter()
+            try:
+                result = value(*args,**kwargs)
+            except Exception:
+                recorder.record(name,attr,args[0] if per_register and args else None,time.perf_counter() - start,error=True)
+                raise
+            recorder.record(name,attr,args[0] if per_register and args else None,time.perf_counter() - start)
+            return result
+        return timed
+
+    def __setattr__(self,attr,value):
+        setattr(self._target,attr,value)
+
+    def __repr__(self):
+        return f"InstrumentProxy({self._target!r})"
+
+def instrument(name:str,target):
+    #wraps target in a proxy if metrics are enabled (and it is not wrapped already)
+    if not metrics.enabled or target is None or isinstance(target,InstrumentProxy):
+        return target
+    return InstrumentProxy(target,name)
+
+def enable_metrics(cache=None):
+    #turns metrics on. Instruments already in the instrument cache are wrapped as well
+    metrics.enabled = True
+    if cache is None:
+        from hp_laser_decorator import get_instrument_cache
+        cache = get_instrument_cache()
+    for name in list(cache):
+        cache[name] = instrument(name,cache[name])
+
+def disable_metrics(cache=None):
+    #turns metrics off and puts the raw instruments back in the instrument cache
+    metrics.enabled = False
+    if cache is None:
+        from hp_laser_decorator import get_instrument_cache
+        cache = get_instrument_cache()
+    for name,target in list(cache.items()):
+        if isinstance(target,InstrumentProxy):
+            cache[name] = target._target
+
+if os.environ.get(METRICS_ENV,"") not in ("","0"):
+    metrics.enabled = True
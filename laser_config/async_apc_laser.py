@@ -0,0 +1,169 @@
+from laser_config.laser_driver_api import Laser_Driver_API
+from laser_config.laser_data import LaserConfig
+from laser_config.config_apc_laser import APCLaserConfig, APCLaserContext
+from logic.validation import check_overcurrent
+from logic.plr_search import build_plr_search, async_run_plr_search
+from logic.settle import async_wait_for_settle
+from hp_laser_async import AsyncInstrument
+from hp_laser_decorator import connect_opm
+from tec_config.async_tec_monitor import monitor_tec
+import asyncio
+import logging
+import time
+
+"""
+async_apc_laser.py - asyncio version of APCLaserConfig.configure_apc_laser. The debug cable and OPM
+calls run on their own executor threads (see hp_laser_async.py) so the TEC temperature can be
+monitored while the laser is ramped. The PLR search uses the logic/plr_search.py strategies through
+async_run_plr_search. configure_apc_laser_with_tec_monitor cancels the ramp, turns the laser off and
+rolls back the staged registers as soon as the monitor reports an overtemp.
+"""
+
+class AsyncAPCLaserConfig:
+    def __init__(self,opm=None,logger=None,search_mode="linear",recorder=None):
+        self.opm = opm
+        self.ctx = None
+        self.search_mode = search_mode
+        self.logger = logger or logging.getLogger(__name__)
+        self.recorder = recorder #optional data_report.TraceRecorder
+        self._board_status = None
+
+    #the trace and unit record are kept the same way as the sync configuration
+    _record = APCLaserConfig._record
+    _save_laser_record = APCLaserConfig._save_laser_record
+
+    async def _check_overcurrent_status(self,retry_count=2):
+        #same as APCLaserConfig._check_overcurrent_status, True if an overcurrent is still reported after retry_count reads
+        for i in range(retry_count):
+            self._board_status = await self.driver.get_board_status()
+            if not check_overcurrent(self._board_status,self.ctx.laser_channel):
+                return False
+        return True
+
+    async def _read_settled_power(self):
+        if not self.ctx.adaptive_settle:
+            await asyncio.sleep(self.ctx.settle_delay)
+            return await self.opm.read_power()
+        result = await async_wait_for_settle(
+            self.opm.read_power,
+            poll_interval=self.ctx.settle_poll,
+            tolerance=self.ctx.settle_tolerance,
+            window=self.ctx.settle_window,
+            timeout=self.ctx.settle_timeout
+        )
+        if not result.settled:
+            self.ctx.logger.info(f"WARNING: OPM reading did not settle within {self.ctx.settle_timeout}s, using last reading {result.value}")
+        return result.value
+
+    async def ramp_laser_power(self):
+        for i in self.ctx.power_levels:
+            await self.driver.set_laser_power(self.ctx.laser_channel,i)
+            await self.driver.set_laser_state(self.ctx.laser_channel,1)
+            self.ctx.logger.info(f"Setting laser power to {i} and enabling laser")
+            current_power = await self._read_settled_power()
+            overcurrent = await self._check_overcurrent_status(retry_count=2)
+            self._record("power_ramp",power_level=i,power=current_power)
+            if overcurrent:
+                self.ctx.logger.info(f"Overcurrent detected on Channel:{self.ctx.laser_channel}, please contact engineering")
+                return -1
+            self.ctx.logger.info(f"Output power is {current_power}")
+        return 1
+
+    async def _probe_plr(self,plr):
+        await self.driver.set_plr(self.ctx.laser_channel,plr)
+        await self.driver.set_laser_state(self.ctx.laser_channel,1)
+        current_power = await self._read_settled_power()
+        overcurrent = await self._check_overcurrent_status(retry_count=2)
+        self._record("plr_ramp",plr=plr,power=current_power)
+        if overcurrent:
+            self.ctx.logger.info(f"Overcurrent detected on Channel:{self.ctx.laser_channel} at PLR {plr}, please contact engineering")
+            return None
+        self.ctx.logger.info(f"PLR = {plr}, Output Power = {current_power}")
+        return current_power
+
+    async def ramp_plr(self,target_power):
+        #async driver for the logic/plr_search.py search generators
+        start_plr = await self.driver.read_register(f"LASER{self.ctx.laser_channel}_PLR")
+        search = build_plr_search(self.ctx.search_mode,start_plr,target_power,self.ctx.max_plr,self.ctx.coarse_step)
+        result = await async_run_plr_search(search,self._probe_plr)
+        self.ctx.plr_probes,self.ctx.plr_ramp_time = result.probes,result.elapsed
+        self.ctx.logger.info(f"PLR search ({self.ctx.search_mode}) finished in {result.probes} probes, {result.elapsed:.1f}s")
+        if result.status < 0:
+            self.ctx.logger.info(f"PLR search failed, {result.reason}. LASER OUTPUT POWER NOT AT {target_power}, PLEASE CONTACT ENGINEERING")
+            return -1
+        await self.driver.set_plr(self.ctx.laser_channel,result.plr)
+        self.ctx.plr,self.ctx.power = result.plr,result.power
+        self.ctx.logger.info(f"Nominal output power reached! PLR: {result.plr} Output Power: {result.power}")
+        await self.driver.set_laser_state(self.ctx.laser_channel,0)
+        await self.driver.save_values(self.ctx.laser_channel)
+        return 1
+
+    async def configure_apc_laser(self,laser_setup:LaserConfig,opm_channel:int,unit_record=None):
+        #same flow as APCLaserConfig.configure_apc_laser. If the task is cancelled the laser is turned
+        #off and the staged registers are rolled back. The executors created here are shut down on the
+        #way out. unit_record - optional dict, the outcome is stored in unit_record["lasers"][laser_sn]
+        start = time.perf_counter()
+        laser_driver = Laser_Driver_API(logger=self.logger)
+        self.driver = AsyncInstrument(laser_driver,"debug_cable")
+        own_opm = not isinstance(self.opm,AsyncInstrument)
+        if own_opm:
+            self.opm = AsyncInstrument(self.opm or connect_opm(),"opm")
+        try:
+            self.ctx = APCLaserContext(
+                logger=self.logger,
+                laser_driver=laser_driver,
+                laser_channel=laser_setup.laser_channel,
+                power_margin=0.5,
+                laser_max_current=laser_setup.laser_max_current,
+                max_plr=255,
+                power_levels=[1,100,255],
+                search_mode=self.search_mode
+            )
+            self.ctx.target_power = laser_setup.laser_power_db + self.ctx.power_margin
+            await self.opm.set_opm_channel(opm_channel)
+            await self.opm.set_wavelength(laser_setup.laser_wvl)
+
+            ch = self.ctx.laser_channel
+            await self.driver.begin_staged(ch)
+            try:
+                await self.driver.set_current_limit(ch,self.ctx.laser_max_current)
+                status = await self.ramp_laser_power()
+                if status > 0:
+                    status = await self.ramp_plr(self.ctx.target_power)
+            except BaseException:
+                #cancelled (ie. overtemp) or failed, rolling back turns the laser off
+                self.ctx.logger.info(f"Laser configuration aborted, turning laser {ch} off and rolling back")
+                await self.driver.rollback_staged(ch)
+                self._save_laser_record(unit_record,laser_setup,False,start)
+                raise
+            if status > 0:
+                await self.driver.commit_staged(ch)
+            else:
+                await self.driver.rollback_staged(ch)
+            self._save_laser_record(unit_record,laser_setup,status > 0,start)
+            return status > 0
+        finally:
+            self.driver.close()
+            if own_opm:
+                self.opm.close()
+                self.opm = self.opm.target
+
+async def configure_apc_laser_with_tec_monitor(laser_setup:LaserConfig,opm_channel:int,num_tec:int,search_mode="linear",
+                                               monitor_period=1.0,max_temp=70.0,logger=None,recorder=None,unit_record=None):
+    #runs the laser configuration and the TEC monitor together. Returns False if the monitor
+    #reports an overtemp before the configuration finishes.
+    logger = logger or logging.getLogger(__name__)
+    apc_config = AsyncAPCLaserConfig(logger=logger,search_mode=search_mode,recorder=recorder)
+    ramp = asyncio.create_task(apc_config.configure_apc_laser(laser_setup,opm_channel,unit_record=unit_record))
+    monitor = asyncio.create_task(monitor_tec(num_tec,period=monitor_period,max_temp=max_temp,logger=logger))
+    done,pending = await asyncio.wait({ramp,monitor},return_when=asyncio.FIRST_COMPLETED)
+    if ramp in done:
+        monitor.cancel()
+        await asyncio.gather(monitor,return_exceptions=True)
+        return ramp.result()
+    #the monitor only returns on an overtemp (or raises), stop the ramp
+    ramp.cancel()
+    await asyncio.gather(ramp,return_exceptions=True)
+    monitor.result()
+    logger.info(f"Laser configuration cancelled by the TEC monitor")
+    return False
@@ -1,7 +1,10 @@
 from laser_config.laser_driver_api import Laser_Driver_API
 from laser_config.laser_data import LaserConfig
 from logic.validation import check_overcurrent
-from hp_laser_decorator import auto_connect_instruments
+from logic.plr_search import build_plr_search, run_plr_search, warm_start_search, PLRSearchResult
+from laser_config.plr_model_store import model_key
+from logic.settle import wait_for_settle, wait_for_settle_all
+from hp_laser_decorator import InstrumentClient
 import logging
 import time
 from dataclasses import dataclass, field
@@ -20,35 +23,81 @@ class APCLaserContext:
     power_margin: float = 0.5
     max_plr: int = 255
     power_levels: list = field(default_factory=list)
+    search_mode: str = "linear" #linear, bisect or secant (see logic/plr_search.py)
+    coarse_step: int = 16
+    plr_probes: int = 0
+    plr_ramp_time: float = 0.0
+    adaptive_settle: bool = True #False = wait settle_delay seconds before every power reading
+    settle_delay: float = 2.0
+    settle_poll: float = 0.1
+    settle_tolerance: float = 0.05 #dB peak to peak
+    settle_window: int = 3
+    settle_timeout: float = 5.0
+    opm_channel: int = None #used by the dual laser mode to switch the OPM between lasers
+    laser_wvl: float = 1550.00
+    predicted_plr: int = None #PLR predicted by the laser's PLR model, the PLR search starts here
+    warm_start: str = "" #hit / miss when the search was started at predicted_plr
+    plr_samples: list = field(default_factory=list) #(plr, power) pairs measured during the PLR ramp
+    target_power: float = None
+    plr: int = None #PLR and output power the laser was configured at
+    power: float = None
 
-class APCLaserConfig:
-    def __init__(self,opm=None,logger=None):
+class APCLaserConfig(InstrumentClient):
+    instrument_name = "opm"
+
+    def __init__(self,opm=None,logger=None,search_mode="linear",recorder=None,plr_models=None):
         self.hw=opm
         self.ctx = None
+        self.search_mode = search_mode
         self.logger = logger or logging.getLogger(__name__)
+        self.recorder = recorder #optional data_report.TraceRecorder
+        self._opm_setup = None #(channel, wavelength) last selected on the OPM, re-applied after a reconnect
+        self.plr_models = plr_models #optional plr_model_store.PLRModelStore, enables the warm start
+        self._board_status = None
+
+    #yields each power level for the dual laser power ramp, the measured power is only logged
+    @staticmethod
+    def _power_level_steps(power_levels):
+        for level in power_levels:
+            yield level
+        return 1
 
     def _ensure_ctx(self):
         if not self.ctx or not self.ctx.laser_driver:
             raise RuntimeError("APC Laser context is not initialized. Please contact engineering!")
 
-    @auto_connect_instruments(required=["opm"])
     def _check_hardware(self,opm=None):
-        if opm is not None and self.hw is None:
-            self.hw = opm #attach the debug_cable from the decorator
+        #the opm is bound on first use, after that this is only an attribute check
         if self.hw is None:
-            raise RuntimeError("No debug cable available for writing")
+            self.bind(opm)
+
+    def _health_probe(self):
+        self.hw.read_power()
+
+    def _read_power(self):
+        return self._hw_call("read_power")
+
+    def _on_reconnect(self):
+        #the reconnected OPM is back on its default channel / wavelength
+        if self._opm_setup is not None:
+            channel,wvl = self._opm_setup
+            self.hw.set_opm_channel(channel)
+            self.hw.set_wavelength(wvl)
+
+    def _select_opm(self,channel,wvl):
+        self._opm_setup = (channel,wvl)
+        self._hw_call("set_opm_channel",channel)
+        self._hw_call("set_wavelength",wvl)
         
-    #Sets the channel and wavelength of the OPM
-    def setup_opm(self,wvl=1550.00):
+    #Sets the channel and wavelength of the OPM, prompts for the channel if one is not given
+    def setup_opm(self,wvl=1550.00,channel=None):
         self._check_hardware(opm=None)
-        while True:
+        while channel is None:
             try:
                 channel = int(input(f"Please enter the OPM Channel: "))
-                self.hw.set_opm_channel(channel)
-                break
             except ValueError:
                 print(f"Error! Invalid input, please enter a valid OPM channel...")
-        self.hw.set_wavelength(wvl)
+        self._select_opm(channel,wvl)
 
     #checks the board status to see if the laser at channel has an overcurrent detected
     def _check_overcurrent_status(self,retry_count=2):
@@ -56,11 +105,71 @@ class APCLaserConfig:
         #The module board has a tendency to report an overcurrent if there is a current spike when the laser
         #is enabled. Typically reading board status again will clear the error. 
         while i < retry_count:
-            if not check_overcurrent(self.ctx.laser_driver.get_board_status(),self.ctx.laser_channel):
+            self._board_status = self.ctx.laser_driver.get_board_status()
+            if not check_overcurrent(self._board_status,self.ctx.laser_channel):
                 return False
             i+=1
         return True 
 
+    #Adds a sample to the trace recorder (if there is one) with the last board status read, PLR ramp
+    #samples without an overcurrent are kept for the laser's PLR model
+    def _record(self,source,plr=None,power_level=None,power=None):
+        if plr is not None and power is not None and not (self._board_status and check_overcurrent(self._board_status,self.ctx.laser_channel)):
+            self.ctx.plr_samples.append((plr,power))
+        if self.recorder is None:
+            return
+        board_status = None
+        if self._board_status is not None:
+            flags = self.ctx.laser_driver.codec.status_flags
+            board_status = sum(self._board_status[name] << offset for name,offset in flags.items())
+        self.recorder.record(source,channel=self.ctx.laser_channel,plr=plr,power_level=power_level,power=power,board_status=board_status)
+
+    #Waits for the OPM reading to settle after a laser change and returns the settled power
+    def _read_settled_power(self):
+        if not self.ctx.adaptive_settle:
+            time.sleep(self.ctx.settle_delay)
+            return self._read_power()
+        result = wait_for_settle(
+            self._read_power,
+            poll_interval=self.ctx.settle_poll,
+            tolerance=self.ctx.settle_tolerance,
+            window=self.ctx.settle_window,
+            timeout=self.ctx.settle_timeout
+        )
+        if result.settled:
+            self.ctx.logger.debug(f"OPM settled in {result.elapsed:.2f}s ({result.samples} readings)")
+        else:
+            self.ctx.logger.info(f"WARNING: OPM reading did not settle within {self.ctx.settle_timeout}s, using last reading {result.value}")
+        return result.value
+
+    #Waits for the OPM readings of several lasers that were stepped together. The lasers are settled one
+    #after the other on their own OPM channel, starting with the channel the OPM is already on, so the
+    #OPM is switched at most once per laser while the other lasers settle in the meantime.
+    #Returns channel : settled power
+    def _read_settled_powers(self,ctxs,channels):
+        def opm_reader(ch):
+            setup = (ctxs[ch].opm_channel,ctxs[ch].laser_wvl)
+            def read():
+                if self._opm_setup != setup:
+                    self._select_opm(*setup)
+                return self._read_power()
+            return read
+        channels = sorted(channels,key=lambda ch: (ctxs[ch].opm_channel,ctxs[ch].laser_wvl) != self._opm_setup)
+        ctx = ctxs[channels[0]]
+        results = wait_for_settle_all(
+            {ch:opm_reader(ch) for ch in channels},
+            poll_interval=ctx.settle_poll,
+            tolerance=ctx.settle_tolerance,
+            window=ctx.settle_window,
+            timeout=ctx.settle_timeout
+        )
+        for ch,result in results.items():
+            if result.settled:
+                ctxs[ch].logger.debug(f"OPM settled in {result.elapsed:.2f}s ({result.samples} readings)")
+            else:
+                ctxs[ch].logger.info(f"WARNING: OPM reading did not settle within {ctx.settle_timeout}s, using last reading {result.value}")
+        return {ch:result.value for ch,result in results.items()}
+
     #Perform power ramp on laser (increment in steps to ensure safety)
     def ramp_laser_power(self):
         #Make sure there's an OPM to measure with and that laser parameters have been properly set
@@ -71,40 +180,115 @@ class APCLaserConfig:
             #make sure laser is enabled after setting power
             self.ctx.laser_driver.set_laser_state(self.ctx.laser_channel,1)
             self.ctx.logger.info(f"Setting laser power to {i} and enabling laser")
-            time.sleep(2)
+            current_power = self._read_settled_power()
             self.ctx.logger.info(f"Checking board status....")
             if self._check_overcurrent_status(retry_count=2):
+                self._record("power_ramp",power_level=i,power=current_power)
                 self.ctx.logger.info(f"Overcurrent detected on Channel:{self.ctx.laser_channel}, please contact engineering")
                 return -1
-            current_power = self.hw.read_power()
+            self._record("power_ramp",power_level=i,power=current_power)
             self.ctx.logger.info(f"Output power is {current_power}")
         return 1
 
+    #Sets the PLR, enables the laser and measures the output power. Returns None if an overcurrent is detected
+    def _probe_plr(self,plr):
+        self.ctx.logger.info(f"Setting PLR to {plr}")
+        self.ctx.laser_driver.set_plr(self.ctx.laser_channel,plr)
+        self.ctx.laser_driver.set_laser_state(self.ctx.laser_channel,1)
+        current_power = self._read_settled_power()
+        overcurrent = self._check_overcurrent_status(retry_count=2)
+        self._record("plr_ramp",plr=plr,power=current_power)
+        if overcurrent:
+            self.ctx.logger.info(f"Overcurrent detected on Channel:{self.ctx.laser_channel} at PLR {plr}, please contact engineering")
+            return None
+        self.ctx.logger.info(f"PLR = {plr}, Output Power = {current_power}")
+        return current_power
+
+    #Starts the PLR search at the PLR predicted by the laser's model. Returns None if there is no prediction,
+    #otherwise the PLRSearchResult. If the search missed (the target was not near the prediction or an
+    #overcurrent tripped) the PLR is put back to start_plr for the full search.
+    def _warm_start_plr(self,target_power,start_plr):
+        if self.ctx.predicted_plr is None:
+            return None
+        self.ctx.logger.info(f"Starting PLR search at the predicted PLR {self.ctx.predicted_plr}")
+        refine = "bisect" if self.ctx.search_mode == "bisect" else "secant"
+        result = run_plr_search(warm_start_search(self.ctx.predicted_plr,target_power,self.ctx.max_plr,refine=refine),self._probe_plr)
+        if result.status > 0:
+            self.ctx.warm_start = "hit"
+            return result
+        self.ctx.warm_start = "miss"
+        reason = result.reason if result.reason.startswith("probe aborted") else f"target not found near the predicted PLR"
+        self.ctx.logger.info(f"Warm start missed after {result.probes} probes ({reason}), falling back to a full PLR ramp from {start_plr}")
+        self.ctx.laser_driver.set_plr(self.ctx.laser_channel,start_plr)
+        #the last status read belongs to the aborted probe, not to the PLRs of the full ramp
+        self._board_status = None
+        return result
+
+    #Bracket the target power with coarse PLR steps then narrow in on it (bisect or secant)
+    #warm - result of _warm_start_plr, the full search only runs if there was no warm start or it missed
+    def _search_plr(self,target_power,start_plr,warm=None):
+        result = warm
+        if warm is None or warm.status < 0:
+            search = build_plr_search(self.ctx.search_mode,start_plr,target_power,self.ctx.max_plr,self.ctx.coarse_step)
+            result = run_plr_search(search,self._probe_plr)
+            if warm is not None:
+                result.probes += warm.probes
+                result.elapsed += warm.elapsed
+        self.ctx.plr_probes,self.ctx.plr_ramp_time = result.probes,result.elapsed
+        mode = "warm start" if self.ctx.warm_start == "hit" else self.ctx.search_mode
+        self.ctx.logger.info(f"PLR search ({mode}) finished in {result.probes} probes, {result.elapsed:.1f}s")
+        if result.status < 0:
+            self.ctx.logger.info(f"PLR search failed, {result.reason}. LASER OUTPUT POWER NOT AT {target_power}, PLEASE CONTACT ENGINEERING")
+            return -1
+        #the last probe is not always the result of the search, make sure the result is what is left in the register
+        self.ctx.laser_driver.set_plr(self.ctx.laser_channel,result.plr)
+        self.ctx.plr,self.ctx.power = result.plr,result.power
+        self.ctx.logger.info(f"Nominal output power reached! PLR: {result.plr} Output Power: {result.power}")
+        self.ctx.logger.info(f"Setting laser state to OFF...")
+        self.ctx.laser_driver.set_laser_state(self.ctx.laser_channel,0)
+        self.ctx.laser_driver.save_values(self.ctx.laser_channel)
+        return 1
+
     #Ramp the driver board's PLR value to achieve nominal laser power
     def ramp_plr(self,target_power=-80.0):
         #Make sure there's an OPM to measure with and that laser parameters have been properly set
         self._check_hardware(opm=None)
         self._ensure_ctx()
-        #Get the current OPM power
-        current_power = self.hw.read_power()
-        retry = 2
 
         #Get the current PLR from the driver board
         current_plr = self.ctx.laser_driver.read_register(reg="LASER1_PLR") if self.ctx.laser_channel == 1 else self.ctx.laser_driver.read_register(reg="LASER2_PLR")
+        warm = self._warm_start_plr(target_power,current_plr)
+        if self.ctx.search_mode != "linear" or self.ctx.warm_start == "hit":
+            return self._search_plr(target_power,current_plr,warm)
+
+        #Get the current OPM power (the PLR was just put back if the warm start missed) and the board
+        #status, so the first sample is not recorded with the status left over from the power ramp
+        current_power = self._read_power() if warm is None else self._read_settled_power()
+        overcurrent = self._check_overcurrent_status(retry_count=2)
+        self._record("plr_ramp",plr=current_plr,power=current_power)
+        if overcurrent:
+            self.ctx.logger.info(f"Overcurrent detected on Channel:{self.ctx.laser_channel} at PLR {current_plr}, please contact engineering")
+            current_power = None
+        start_time = time.perf_counter() - (warm.elapsed if warm else 0.0)
+        self.ctx.plr_probes = 1 + (warm.probes if warm else 0)
 
-        while current_power < (target_power):
+        while current_power is not None and current_power < (target_power):
             current_plr += 1
-            if current_power > self.ctx.max_plr:
+            if current_plr > self.ctx.max_plr:
                 self.ctx.logger.info(f"MAX PLR VALUE REACHED, LASER OUTPUT POWER NOT AT {target_power}, PLEASE CONTACT ENGINEERING")
+                self.ctx.plr_ramp_time = time.perf_counter() - start_time
                 return -1
-            self.ctx.logger.info(f"Setting PLR to {current_plr}")
-            self.ctx.laser_driver.set_plr(self.ctx.laser_channel,current_plr)
-            self.ctx.laser_driver.set_laser_state(self.ctx.laser_channel,1)
-            self.ctx.laser_driver.save_values(self.ctx.laser_channel)
-            time.sleep(2)
-            current_power = self.hw.read_power()
-            self.ctx.logger.info(f"PLR = {current_plr}, Output Power = {current_power}")
+            #checks the overcurrent status on every step like the bisect / secant searches
+            current_power = self._probe_plr(current_plr)
+            self.ctx.plr_probes += 1
 
+        if current_power is None:
+            self.ctx.logger.info(f"PLR search (linear) failed. LASER OUTPUT POWER NOT AT {target_power}, PLEASE CONTACT ENGINEERING")
+            self.ctx.plr_ramp_time = time.perf_counter() - start_time
+            return -1
+        self.ctx.plr_ramp_time = time.perf_counter() - start_time
+        self.ctx.logger.info(f"PLR search (linear) finished in {self.ctx.plr_probes} probes, {self.ctx.plr_ramp_time:.1f}s")
+        self.ctx.plr,self.ctx.power = current_plr,current_power
         self.ctx.logger.info(f"Nominal output power reached! PLR: {current_plr} Output Power: {current_power}")
         self.ctx.logger.info(f"Setting laser state to OFF...")
         self.ctx.laser_driver.set_laser_state(self.ctx.laser_channel,0)
@@ -113,8 +297,9 @@ class APCLaserConfig:
     
     #configure_apc_laser - sets the current limit on the driver board, does an inital power ramp (at plr=0) to ensure laser safety, then 
     #ramps the plr up until laser power reaches nominal power.
-    def configure_apc_laser(self,laser_setup:LaserConfig):
-        
+    #unit_record - optional dict, the outcome is stored in unit_record["lasers"][laser_sn]
+    def configure_apc_laser(self,laser_setup:LaserConfig,opm_channel=None,unit_record=None):
+        start = time.perf_counter()
         #Setup the config script context
         self.ctx = APCLaserContext(
             logger=self.logger,
@@ -123,25 +308,246 @@ class APCLaserConfig:
             power_margin=0.5,
             laser_max_current=laser_setup.laser_max_current,
             max_plr=255,
-            power_levels=[1,100,255]
+            power_levels=[1,100,255],
+            search_mode=self.search_mode
         )
+        self.ctx.target_power = laser_setup.laser_power_db + self.ctx.power_margin
 
         #Configure the opm
-        self.setup_opm(laser_setup.laser_wvl)
-    
-        #Set the current limit on the driver board
-        self.ctx.laser_driver.set_current_limit(self.ctx.laser_channel,self.ctx.laser_max_current)
+        self.setup_opm(laser_setup.laser_wvl,opm_channel)
+
+        #Stage the register writes so the values are only saved once the ramp has converged
+        self.ctx.laser_driver.begin_staged(self.ctx.laser_channel)
+        try:
+            #Set the current limit on the driver board
+            self.ctx.laser_driver.set_current_limit(self.ctx.laser_channel,self.ctx.laser_max_current)
+
+            #Turn on the laser, step up the laser power 
+            if self.ramp_laser_power() < 0:
+                self.ctx.laser_driver.rollback_staged(self.ctx.laser_channel)
+                self._save_laser_record(unit_record,laser_setup,False,start)
+                return False
 
-        #Turn on the laser, step up the laser power 
-        self.ramp_laser_power()
+            #Ramp the plr from 0 to max, checking if power level has reached nominal power
+            #use the opm reading from the previous for loop.
+            target_power = self.ctx.target_power
+            if self.plr_models is not None:
+                self.ctx.predicted_plr = self.plr_models.predict_plr(laser_setup,target_power,self.ctx.max_plr)
+            plr_ramp_status = self.ramp_plr(target_power)
+        except Exception:
+            self.ctx.laser_driver.rollback_staged(self.ctx.laser_channel)
+            raise
 
-        #Ramp the plr from 0 to max, checking if power level has reached nominal power
-        #use the opm reading from the previous for loop.
-        target_power = laser_setup.laser_power_db + self.ctx.power_margin
-        plr_ramp_status = self.ramp_plr(target_power)
+        if plr_ramp_status > 0:
+            self.ctx.laser_driver.commit_staged(self.ctx.laser_channel)
+            self._update_plr_model(laser_setup)
+        else:
+            self.ctx.laser_driver.rollback_staged(self.ctx.laser_channel)
+        self.ctx.logger.info(f"Register cache: {self.ctx.laser_driver.get_cache_stats()}")
+        self._save_laser_record(unit_record,laser_setup,plr_ramp_status > 0,start)
         return plr_ramp_status > 0
 
-   
+    #Stores the outcome of a laser configuration in unit_record["lasers"][laser_sn] (if there is a unit_record)
+    def _save_laser_record(self,unit_record,laser_setup:LaserConfig,passed:bool,start:float):
+        if unit_record is None:
+            return
+        unit_record.setdefault("lasers",{})[laser_setup.laser_sn] = {
+            "passed":passed,
+            "channel":self.ctx.laser_channel,
+            "wavelength":laser_setup.laser_wvl,
+            "target_power":self.ctx.target_power,
+            "plr":self.ctx.plr,
+            "power":self.ctx.power,
+            "search_mode":self.ctx.search_mode,
+            "predicted_plr":self.ctx.predicted_plr,
+            "warm_start":self.ctx.warm_start,
+            "probes":self.ctx.plr_probes,
+            "ramp_time_s":round(self.ctx.plr_ramp_time,2),
+            "duration_s":round(time.perf_counter() - start,2)
+        }
 
-        
-        
+    #Folds the PLR ramp pairs of a configured laser into its PLR model. A model that can not be saved
+    #only costs the warm start of the next laser so the error is logged and the laser still passes
+    def _update_plr_model(self,laser_setup:LaserConfig):
+        if self.plr_models is None:
+            return
+        try:
+            used = self.plr_models.update(laser_setup,self.ctx.plr_samples)
+            self.ctx.logger.info(f"Added {used} PLR/power pairs to the {model_key(laser_setup)} PLR model")
+        except OSError as e:
+            self.ctx.logger.info(f"WARNING: could not save the PLR model to {self.plr_models.filepath}: {e}")
+
+    #Interleaves the steps of both lasers. Each round every channel's step is written first, then the
+    #channels are measured on their own OPM channels while they settle together.
+    #steppers - channel : generator which yields the value to apply and is sent the measured power
+    #apply - apply(ch,value) writes a step to the board
+    #drop - drop(ch) is called as soon as a channel stops without reaching its target (overcurrent or
+    #failed search) so its laser is not left on while the other channel carries on. Returns channel : PLRSearchResult
+    def _interleave_steps(self,ctxs,steppers,apply,drop,trace_source="plr_ramp"):
+        results = {ch:PLRSearchResult() for ch in steppers}
+        pending = {ch:next(stepper) for ch,stepper in steppers.items()}
+        start = time.perf_counter()
+        while pending:
+            for ch,value in pending.items():
+                self.ctx = ctxs[ch]
+                apply(ch,value)
+            if all(ctxs[ch].adaptive_settle for ch in pending):
+                powers = self._read_settled_powers(ctxs,list(pending))
+            else:
+                #fixed delay mode, both lasers share one settle delay
+                time.sleep(max(ctxs[ch].settle_delay for ch in pending))
+                powers = {}
+            for ch in list(pending):
+                self.ctx = ctxs[ch]
+                if ch in powers:
+                    power = powers[ch]
+                else:
+                    if self._opm_setup != (self.ctx.opm_channel,self.ctx.laser_wvl):
+                        self._select_opm(self.ctx.opm_channel,self.ctx.laser_wvl)
+                    power = self._read_settled_power() if self.ctx.adaptive_settle else self._read_power()
+                result = results[ch]
+                result.probes += 1
+                result.plr,result.power = pending[ch],power
+                overcurrent = self._check_overcurrent_status(retry_count=2)
+                if trace_source == "plr_ramp":
+                    self._record(trace_source,plr=pending[ch],power=power)
+                else:
+                    self._record(trace_source,power_level=pending[ch],power=power)
+                if overcurrent:
+                    self.ctx.logger.info(f"Overcurrent detected on Channel:{ch} at {pending[ch]}, please contact engineering")
+                    result.reason = f"overcurrent at {pending[ch]}"
+                    del pending[ch]
+                    drop(ch)
+                    continue
+                self.ctx.logger.info(f"Step {pending[ch]}, Output Power = {power}")
+                try:
+                    pending[ch] = steppers[ch].send(power)
+                except StopIteration as done:
+                    if done.value is None:
+                        result.reason = f"max PLR reached without reaching target power"
+                        drop(ch)
+                    else:
+                        result.status = 1
+                        if isinstance(done.value,tuple):
+                            result.plr,result.power = done.value
+                    result.elapsed = time.perf_counter() - start
+                    del pending[ch]
+        return results
+
+    #configure_dual_apc_laser - configures the lasers on both channels of the driver board in a single pass.
+    #laser_setups and opm_channels are lists with one entry per laser. Returns channel : status
+    def configure_dual_apc_laser(self,laser_setups:list,opm_channels:list,unit_record=None):
+        start = time.perf_counter()
+        self._check_hardware(opm=None)
+        laser_driver = Laser_Driver_API(logger=self.logger)
+        ctxs = {}
+        for laser_setup,opm_channel in zip(laser_setups,opm_channels):
+            ch = laser_setup.laser_channel
+            ctxs[ch] = APCLaserContext(
+                logger=self.logger.getChild(f"laser{ch}"),
+                laser_driver=laser_driver,
+                laser_channel=ch,
+                power_margin=0.5,
+                laser_max_current=laser_setup.laser_max_current,
+                max_plr=255,
+                power_levels=[1,100,255],
+                search_mode=self.search_mode,
+                opm_channel=opm_channel,
+                laser_wvl=laser_setup.laser_wvl
+            )
+            ctxs[ch].target_power = laser_setup.laser_power_db + ctxs[ch].power_margin
+        if len(ctxs) != len(laser_setups):
+            raise ValueError(f"Dual laser configuration needs one laser per channel")
+        targets = {ch:ctx.target_power for ch,ctx in ctxs.items()}
+        setups = {setup.laser_channel:setup for setup in laser_setups}
+
+        status = {}
+        try:
+            for ch,ctx in ctxs.items():
+                laser_driver.begin_staged(ch)
+                laser_driver.set_current_limit(ch,ctx.laser_max_current)
+            #a failed channel is turned off and rolled back straight away (rollback_staged turns the laser off)
+            def fail(ch):
+                laser_driver.rollback_staged(ch)
+            #step up the laser power on both channels
+            def apply_power(ch,level):
+                ctxs[ch].logger.info(f"Setting laser power to {level} and enabling laser")
+                laser_driver.set_laser_power(ch,level)
+                laser_driver.set_laser_state(ch,1)
+            power_steps = {ch:self._power_level_steps(ctx.power_levels) for ch,ctx in ctxs.items()}
+            for ch,result in self._interleave_steps(ctxs,power_steps,apply_power,fail,"power_ramp").items():
+                if result.status < 0:
+                    status[ch] = False
+
+            #search the plr on the channels that passed the power ramp
+            def apply_plr(ch,plr):
+                ctxs[ch].logger.info(f"Setting PLR to {plr}")
+                laser_driver.set_plr(ch,plr)
+                laser_driver.set_laser_state(ch,1)
+            searches,start_plrs,warm = {},{},{}
+            for ch,ctx in ctxs.items():
+                if ch in status:
+                    continue
+                start_plrs[ch] = laser_driver.read_register(f"LASER{ch}_PLR")
+                if self.plr_models is not None:
+                    ctx.predicted_plr = self.plr_models.predict_plr(setups[ch],targets[ch],ctx.max_plr)
+                if ctx.predicted_plr is not None:
+                    ctx.logger.info(f"Starting PLR search at the predicted PLR {ctx.predicted_plr}")
+                    refine = "bisect" if ctx.search_mode == "bisect" else "secant"
+                    searches[ch] = warm_start_search(ctx.predicted_plr,targets[ch],ctx.max_plr,refine=refine)
+                else:
+                    searches[ch] = build_plr_search(ctx.search_mode,start_plrs[ch],targets[ch],ctx.max_plr,ctx.coarse_step)
+            #a warm start miss only turns the laser off, the full search still runs on the staged channel
+            def drop_search(ch):
+                if ctxs[ch].predicted_plr is None:
+                    return fail(ch)
+                ctxs[ch].logger.info(f"Setting laser state to OFF...")
+                laser_driver.set_laser_state(ch,0)
+            results = self._interleave_steps(ctxs,searches,apply_plr,drop_search)
+            #warm starts that missed fall back to a full search from the register's PLR
+            retry = {}
+            for ch,result in results.items():
+                ctx = ctxs[ch]
+                if ctx.predicted_plr is None:
+                    continue
+                ctx.warm_start = "hit" if result.status > 0 else "miss"
+                if result.status < 0:
+                    ctx.logger.info(f"Warm start missed after {result.probes} probes, falling back to a full PLR ramp from {start_plrs[ch]}")
+                    laser_driver.set_plr(ch,start_plrs[ch])
+                    warm[ch] = result
+                    retry[ch] = build_plr_search(ctx.search_mode,start_plrs[ch],targets[ch],ctx.max_plr,ctx.coarse_step)
+            if retry:
+                for ch,result in self._interleave_steps(ctxs,retry,apply_plr,fail).items():
+                    result.probes += warm[ch].probes
+                    result.elapsed += warm[ch].elapsed
+                    results[ch] = result
+            for ch,result in results.items():
+                ctx = ctxs[ch]
+                ctx.plr_probes,ctx.plr_ramp_time = result.probes,result.elapsed
+                mode = "warm start" if ctx.warm_start == "hit" else ctx.search_mode
+                ctx.logger.info(f"PLR search ({mode}) finished in {result.probes} probes, {result.elapsed:.1f}s")
+                if result.status < 0:
+                    ctx.logger.info(f"PLR search failed, {result.reason}. LASER OUTPUT POWER NOT AT {targets[ch]}, PLEASE CONTACT ENGINEERING")
+                    status[ch] = False
+                    continue
+                laser_driver.set_plr(ch,result.plr)
+                ctx.plr,ctx.power = result.plr,result.power
+                ctx.logger.info(f"Nominal output power reached! PLR: {result.plr} Output Power: {result.power}")
+                ctx.logger.info(f"Setting laser state to OFF...")
+                laser_driver.set_laser_state(ch,0)
+                laser_driver.save_values(ch)
+                status[ch] = True
+        except Exception:
+            laser_driver.rollback_staged()
+            raise
+
+        #roll back the failed channels before saving so the save does not pick up their values
+        for ch in sorted(status,key=lambda ch: status[ch]):
+            laser_driver.commit_staged(ch) if status[ch] else laser_driver.rollback_staged(ch)
+        for ch in status:
+            self.ctx = ctxs[ch]
+            if status[ch]:
+                self._update_plr_model(setups[ch])
+            self._save_laser_record(unit_record,setups[ch],status[ch],start)
+        self.logger.info(f"Register cache: {laser_driver.get_cache_stats()}")
+        return status
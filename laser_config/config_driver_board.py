@@ -6,26 +6,62 @@ and check values on the laser driver board. Typically uses a debug cable instrum
 communicate to the driver.
 """
 
-def initialize_driver_board():
+def initialize_driver_board(logger=None,wait_for_power_cycle=None,unit_record=None,full_reset=False,watcher=None):
     #performs the following process:
-    #1. Writes the default values into the laser driver board.
-    #2. Instructs user to power cycle the board.
+    #1. Reads the board and writes the default values which do not match (all of them if full_reset).
+    #2. Instructs user to power cycle the board (skipped if the board already matched).
     #3. Verifies that the parameters match the internals.
+    #wait_for_power_cycle is called with the power cycle prompt and returns once the board is powered
+    #                    (input() if None, looked up when called so a patched input is used)
+    #unit_record - optional dict, the board snapshot and diff are stored under "driver_board"
+    #watcher - optional RebootWatcher, verification starts as soon as it sees the board come back
+    #          (wait_for_power_cycle is only used if it times out)
 
     #create a laser_driver_api object:
-    logger=logging.getLogger(__name__)
-    #board_config=Laser_Driver_API(logger=logger)
-    board_config=Laser_Driver_API()
+    board_config=Laser_Driver_API(logger=logger)
+    logger=logger or logging.getLogger(__name__)
+    wait_for_power_cycle = wait_for_power_cycle or input
     init_flag = True
+    record = {"full_reset":full_reset,"snapshot":None,"diff":{},"power_cycle":False}
+    if unit_record is not None:
+        unit_record["driver_board"] = record
+    if not full_reset:
+        try:
+            record["snapshot"] = board_config.read_snapshot()
+        except ValueError as e:
+            logger.info(f"Could not read the board image ({e}), writing all default values")
+            record["full_reset"] = full_reset = True
     logger.info(f"Initializing driver board to default values...")
     logger.info(f"Please wait.....")
-    resp = board_config.reset_board_to_default()
+    if full_reset:
+        resp = board_config.reset_board_to_default()
+        record["diff"] = {cmd:{"read":None,"write":val} for cmd,val in resp}
+    else:
+        diff = board_config.diff_snapshot(record["snapshot"])
+        record["diff"] = {cmd:{"read":board_val,"write":val} for cmd,(board_val,val) in diff.items()}
+        for cmd,(board_val,val) in diff.items():
+            logger.info(f"{cmd}: Board={board_val} | Default={val}")
+        if not diff:
+            logger.info(f"Driver board already matches the default values, no power cycle needed")
+            return True
+        resp = board_config.apply_diff(diff)
     logger.info(f"Initiazation complete!")
-    input(f"Please power cycle the driver board. ENTER when board is powered: ")
+    record["power_cycle"] = True
+    power_cycle_prompt = f"Please power cycle the driver board. ENTER when board is powered: "
+    if watcher is not None:
+        reboot = watcher.watch(board_config,f"Please power cycle the driver board, verification starts once the board is back...",power_cycle_prompt,wait_for_power_cycle)
+        record["reboot_time"] = round(reboot.elapsed,1) if reboot.ready else None
+    else:
+        wait_for_power_cycle(power_cycle_prompt)
+        board_config.notify_power_cycle()
     logger.info(f"Verifying initialized values:")
-    for cmd,val in resp:
-        reg_val=board_config.read_register(cmd)
-        result,init_flag=("Pass!",True) if val == reg_val else ("Fail!",False)
+    expected = board_config.codec.profile
+    readback=board_config.read_registers(list(expected))
+    for cmd,val in expected.items():
+        reg_val=readback[cmd]
+        result="Pass!" if val == reg_val else "Fail!"
+        init_flag = init_flag and val == reg_val
         logger.info(f"{cmd}: Write={val} | Read={reg_val} {result}")
+    record["verified"] = init_flag
     return init_flag
     #verify that the initialzed values stuck
\ No newline at end of file
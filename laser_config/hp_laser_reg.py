@@ -32,6 +32,7 @@ class RegisterMap:
     register: str
     channel: int = 0
     value_bits: int = 8
+    volatile: bool = False #volatile registers are never served from the Laser_Driver_API register cache
 
 #define the chip value registers, RegisterMap defines the command structure (reg,ch,val_bits)
 @dataclass
@@ -58,9 +59,9 @@ class CommandTable:
         "LASER2_STATE": RegisterMap("src.state[1]",0x01,8),
         "LASER1_POW": RegisterMap("src.power[0]",0x00,8),
         "LASER2_POW": RegisterMap("src.power[1]",0x01,8),
-        "LASER1_SAVE": RegisterMap("src.hp.save",0x00,8),
-        "LASER2_SAVE": RegisterMap("src.hp.save",0x01,8),
-        "LASER_STATUS": RegisterMap("src.hp.stat",0x00,16) #note channel and val bits are not required for this register
+        "LASER1_SAVE": RegisterMap("src.hp.save",0x00,8,volatile=True),
+        "LASER2_SAVE": RegisterMap("src.hp.save",0x01,8,volatile=True),
+        "LASER_STATUS": RegisterMap("src.hp.stat",0x00,16,volatile=True) #note channel and val bits are not required for this register
     })
 
 #define the bit offsets for the laser driver board status
@@ -1,152 +1,249 @@
-from laser_config.hp_laser_reg import LaserDriverConfig
-from hp_laser_decorator import auto_connect_instruments
+from laser_config.register_codec import get_codec
+from hp_laser_decorator import InstrumentClient
+from hp_laser_metrics import metrics
 import logging
 """
 laser_driver_api.py - this script defines the methods to interact with
 the hp_laser_reg data object. 
 """
 
-class Laser_Driver_API:
-    def __init__(self,debug_cable=None,logger=None):
+#per register write messages go to their own logger at DEBUG (see hp_laser_logging.py). The
+#messages use lazy % arguments so nothing is formatted when the logger is not enabled
+reg_logger = logging.getLogger(f"{__name__}.registers")
+
+class Laser_Driver_API(InstrumentClient):
+    instrument_name = "debug_cable"
+
+    def __init__(self,debug_cable=None,logger=None,codec=None):
         self.hw=debug_cable
-        self.config=LaserDriverConfig()
+        #register encoding and the board profile, compiled once per process (see register_codec.py)
+        self.codec = codec or get_codec()
         self.logger = logger or logging.getLogger(__name__)
+        #staged mode - channel : register snapshot taken when staging started
+        self._staged = {}
+        self._pending_saves = set()
+        #shadow copy of the register map (CommandTable name : value) used to skip redundant writes/reads
+        self._shadow = {}
+        self.cache_stats = {"read_hits":0,"read_misses":0,"coalesced_reads":0,"write_skips":0,"writes":0}
 
-    def _flatten_defaults(self):
-        #flattens the LaserDriverConfig defaults so that values can be iterated
-        return{
-            "LASER1_TEC":self.config.laser_config.laser1.tec,
-            "LASER2_TEC":self.config.laser_config.laser2.tec,
-            "RDCO":self.config.laser_config.rdco,
-            "LASER1_PLR":self.config.laser_config.laser1.plr,
-            "LASER2_PLR":self.config.laser_config.laser2.plr,
-            "LASER1_MODE":self.config.laser_config.laser1.mode,
-            "LASER2_MODE":self.config.laser_config.laser2.mode,
-            "LASER1_IRANGE":self.config.laser_config.laser1.irange,
-            "LASER2_IRANGE":self.config.laser_config.laser2.irange,
-            "LASER1_ILIM":self.config.laser_config.laser1.ilim,
-            "LASER2_ILIM":self.config.laser_config.laser2.ilim,
-            "LASER1_REG_DELAY_COMP":self.config.laser_config.laser1.reg_delay_comp,
-            "LASER2_REG_DELAY_COMP":self.config.laser_config.laser2.reg_delay_comp,
-            "LASER1_EXT_CI_CAP":self.config.laser_config.laser1.ext_ci_cap,
-            "LASER2_EXT_CI_CAP":self.config.laser_config.laser2.ext_ci_cap,
-            "LASER1_OFFSET_COMP":self.config.laser_config.laser1.offset_comp,
-            "LASER2_OFFSET_COMP":self.config.laser_config.laser2.offset_comp,
-            "LASER1_STATE":self.config.laser_config.laser1.state,
-            "LASER2_STATE":self.config.laser_config.laser2.state,
-            "LASER1_POW":self.config.laser_config.laser1.pow,
-            "LASER2_POW":self.config.laser_config.laser2.pow,
-        }
-     
-    @auto_connect_instruments(required=["debug_cable"])
     def _check_hardware(self,debug_cable=None):
-        if debug_cable is not None and self.hw is None:
-            self.hw = debug_cable #attach the debug_cable from the decorator if there
+        #the debug cable is bound on first use, after that this is only an attribute check
         if self.hw is None:
-            raise RuntimeError("No debug cable available for writing!")
+            self.bind(debug_cable)
+
+    def _health_probe(self):
+        return self.hw.read_reg(self.codec.records["LASER_STATUS"].register) != "Error reading register"
+
+    def _on_reconnect(self):
+        #the board may have been power cycled while the cable was down
+        self.invalidate_cache()
         
-    def _build_register_value(self,cmd:str,val:int):
-        #gets the command from the table and builds the command string.
-        #returns the command values and the value
-        cmd_value=self.config.cmd_table.entries.get(cmd)
-        max_val = (1 << cmd_value.value_bits) - 1
-        if not (0 <= val <= max_val):
-            raise ValueError(f"Value {val} exceed {cmd_value.value_bits} - bit range")
-        #build the value by combining the channel and the passed in value
-        combined = (cmd_value.channel << cmd_value.value_bits) | val
-        hex_str = f"0x{combined:05X}"
-        #returns the hex string which can be provided to the debug_cable interface
-        return cmd_value,hex_str
-    
     def _write_command(self,cmd:str,val:str):
         self._check_hardware(debug_cable=None)
-        self.hw.write_reg(cmd,val)
+        self._hw_call("write_reg",cmd,val)
+
+    def _write_register(self,cmd:str,val:int):
+        #writes the value to the CommandTable entry cmd. The write is skipped if the register cache
+        #already holds the value. Returns the register map and the hex value
+        reg_map,reg_val = self.codec.encode(cmd,val)
+        if not reg_map.volatile and self._shadow.get(cmd) == val:
+            self.cache_stats["write_skips"] += 1
+            return reg_map,reg_val
+        self._write_command(reg_map.register,reg_val)
+        self.cache_stats["writes"] += 1
+        if not reg_map.volatile:
+            self._shadow[cmd] = val
+        return reg_map,reg_val
+
+    def invalidate_cache(self,reg=None):
+        #drops the cached value of reg (all registers if reg is None) so the next read goes to the board
+        if reg is None:
+            self._shadow.clear()
+        else:
+            self._shadow.pop(reg,None)
+
+    def notify_power_cycle(self):
+        #the board reloads its saved values on power up, none of the cached values can be trusted
+        self.logger.debug(f"Power cycle, clearing register cache")
+        self.invalidate_cache()
+
+    def get_cache_stats(self):
+        return dict(self.cache_stats)
     
     def reset_board_to_default(self):
-        #writes all of the driver board values to the default values of LaserDriverConfig returns a list of register that were udpated
+        #writes all of the driver board values to the values of the board profile returns a list of register that were udpated
         result = []
-        for cmd, val in self._flatten_defaults().items():
-            cmd_value,hex_value=self._build_register_value(cmd,val)
-            self.logger.info(f"Writing {cmd} : {val} | {cmd_value.register} : {hex_value}")
-            self._write_command(cmd_value.register,hex_value)
+        self.invalidate_cache()
+        for cmd,val,cmd_value,hex_value in self.codec.encode_image():
+            self._write_register(cmd,val)
+            reg_logger.debug("Writing %s : %s | %s : %s",cmd,val,cmd_value.register,hex_value)
             result.append((cmd,val))
         #save values for both channels    
         self.save_values(0)
         self.save_values(1)
         return result
     
+    def read_snapshot(self,regs=None):
+        #reads the board image (the profile registers if regs is None) from the board, returns register : value.
+        #Raises ValueError if the board does not answer (ie. it is still booting)
+        self.invalidate_cache()
+        return self.read_registers(list(self.codec.profile) if regs is None else regs)
+
+    def diff_snapshot(self,snapshot:dict,profile=None):
+        #returns register : (board value, profile value) for the registers that do not match the profile
+        profile = self.codec.profile if profile is None else profile
+        return {reg:(snapshot.get(reg),val) for reg,val in profile.items() if snapshot.get(reg) != val}
+
+    def apply_diff(self,diff:dict):
+        #writes the profile value of every register in diff and saves, returns a list of the registers written
+        result = []
+        for cmd,(board_val,val) in diff.items():
+            cmd_value,hex_value=self._write_register(cmd,val)
+            reg_logger.debug("Writing %s : %s -> %s | %s : %s",cmd,board_val,val,cmd_value.register,hex_value)
+            result.append((cmd,val))
+        if result:
+            self.save_values(0)
+            self.save_values(1)
+        return result
+
     def set_laser_state(self,ch:int,state:int):
         #turns the laser at channel on or off
         self._check_hardware(debug_cable=None)
-        reg_map,reg_val = self._build_register_value("LASER1_STATE",state) if ch == 1 else self._build_register_value("LASER2_STATE",state)
-        self._write_command(reg_map.register,reg_val)
+        self._write_register("LASER1_STATE",state) if ch == 1 else self._write_register("LASER2_STATE",state)
 
     def set_laser_power(self,ch:int,pow:int):
         #sets the laser power level 0-255
         self._check_hardware(debug_cable=None)
-        reg_map,reg_val = self._build_register_value("LASER1_POW",pow) if ch == 1 else self._build_register_value("LASER2_POW",pow)
-        self._write_command(reg_map.register,reg_val)
+        self._write_register("LASER1_POW",pow) if ch == 1 else self._write_register("LASER2_POW",pow)
          
     def set_plr(self,ch:int,plr:int):
         #writes the new value into the plr
         self._check_hardware(debug_cable=None)
-        reg_map,reg_val = self._build_register_value("LASER1_PLR",plr) if ch == 1 else self._build_register_value("LASER2_PLR",plr)
-        self.logger.info(f"Setting PLR to {plr} | {reg_map.register} : {reg_val}")
-        self._write_command(reg_map.register,reg_val)
+        reg_map,reg_val = self._write_register("LASER1_PLR",plr) if ch == 1 else self._write_register("LASER2_PLR",plr)
+        reg_logger.debug("Setting PLR to %s | %s : %s",plr,reg_map.register,reg_val)
 
     def set_current_limit(self,ch:int,max_current:float):
         #receives the max laser current. Sets the limit.
         self._check_hardware(debug_cable=None)
         ilimit,mode = (int((245.0//980.00)*max_current),0) if max_current > 115.00 else (int((245.0//110.25)*max_current),1)
-        reg_map,reg_val = self._build_register_value("LASER1_ILIM",ilimit) if ch == 1 else self._build_register_value("LASER2_ILIM",ilimit)
-        self.logger.info(f"Setting ILIMIT to {ilimit} | {reg_map.register} : {reg_val}")
-        self._write_command(reg_map.register,reg_val)
+        reg_map,reg_val = self._write_register("LASER1_ILIM",ilimit) if ch == 1 else self._write_register("LASER2_ILIM",ilimit)
+        reg_logger.debug("Setting ILIMIT to %s | %s : %s",ilimit,reg_map.register,reg_val)
         #set the current mode (low/high current) FOR FUTURE UPDATES make current mode a parameter or variable so it's not hardlocked to 115.0mA
-        reg_map,reg_val = self._build_register_value("LASER1_IRANGE",mode) if ch == 1 else self._build_register_value("LASER2_IRANGE",mode)
-        self.logger.info(f"Setting Current mode to {mode}")
-        self._write_command(reg_map.register,reg_val)
+        self._write_register("LASER1_IRANGE",mode) if ch == 1 else self._write_register("LASER2_IRANGE",mode)
+        reg_logger.debug("Setting Current mode to %s",mode)
         self.save_values(ch=ch)
 
     def save_values(self,ch:int):
         #writes the save registers to burn the values into the ic-ht chip
+        #if the channel is staged the save is held until commit_staged is called
+        if ch in self._staged:
+            self._pending_saves.add(ch)
+            return
         self._check_hardware(debug_cable=None)
         self._write_command("src.hp.save","0x00") if ch is 1 else self._write_command("src.hp.save","0x01")
 
+    def begin_staged(self,ch:int):
+        #starts staged mode on the channel. Writes only go to the volatile registers and the
+        #(slow, wear limited) save is done once by commit_staged. The PLR and current limit registers
+        #are recorded so that rollback_staged can put them back if the ramp aborts.
+        names = [f"LASER{ch}_PLR",f"LASER{ch}_ILIM",f"LASER{ch}_IRANGE"]
+        self._staged[ch] = {name:self.read_register(name) for name in names}
+        self._pending_saves.discard(ch)
+        self.logger.info(f"Staging register writes for laser {ch}, starting values: {self._staged[ch]}")
+
+    def commit_staged(self,ch=None):
+        #ends staged mode for the channel (all channels if ch is None) and saves if any saves were held
+        for staged_ch in ([ch] if ch is not None else list(self._staged)):
+            if self._staged.pop(staged_ch,None) is None:
+                continue
+            if staged_ch in self._pending_saves:
+                self._pending_saves.discard(staged_ch)
+                self.logger.info(f"Committing staged values for laser {staged_ch}")
+                self.save_values(staged_ch)
+
+    def rollback_staged(self,ch=None):
+        #ends staged mode for the channel (all channels if ch is None), turns the laser off and writes
+        #back the values recorded by begin_staged. Nothing is saved, the chip's saved values were never changed.
+        for staged_ch in ([ch] if ch is not None else list(self._staged)):
+            snapshot = self._staged.pop(staged_ch,None)
+            if snapshot is None:
+                continue
+            self._pending_saves.discard(staged_ch)
+            self._check_hardware(debug_cable=None)
+            #the ramp was aborted (overcurrent, failed search or an exception), don't leave the laser on
+            self.set_laser_state(staged_ch,0)
+            self.logger.info(f"Turning laser {staged_ch} off")
+            for cmd,val in snapshot.items():
+                reg_map,reg_val = self._write_register(cmd,val)
+                self.logger.info(f"Rolling back {cmd} to {val} | {reg_map.register} : {reg_val}")
+
+    def _read_raw(self,register:str):
+        #reads the physical register, retrying if the debug cable reports a read error
+        error_count = 0
+        resp=self._hw_call("read_reg",register)
+        while resp == "Error reading register" and error_count<5:
+            #try reading again (5 tries to read the register)
+            metrics.record_retry("debug_cable",register)
+            resp = self._hw_call("read_reg",register)
+            error_count+=1
+        return resp
+
+    def _decode_register(self,reg:str,reg_map,resp):
+        #translate the response into an numeric value. Responses sometimes are multichannel numbers
+        #concatentated together, the codec picks out the channel of the reg_map
+        shift_resp = self.codec.decode(reg_map,resp)
+        if not reg_map.volatile:
+            self._shadow[reg] = shift_resp
+        return shift_resp
+
     def read_register(self,reg:str):
         #attempts to read the value at the specified register. If an invalid register is sent
         #returns -9999.
         self._check_hardware(debug_cable=None)
-        error_count = 0
-        reg_map=self.config.cmd_table.entries.get(reg)
+        reg_map=self.codec.records.get(reg)
         if reg_map is None:
             return -9999
-        resp=self.hw.read_reg(reg_map.register)
-        while resp is "Error reading register" and error_count<5:
-            #try reading again (5 tries to read the register)
-            resp = self.hw.read_reg(reg_map.register)
-            error_count+=1
-        #translate the response into an numeric value
-        bits_per_channel=reg_map.value_bits
-        mask=(1<<bits_per_channel)-1
-        #responses sometimes are multichannel numbers concatentated together. 
-        #get the response for the channel specified in the reg_map
-        if "src.power" in reg_map.register or "src.state" in reg_map.register: #src.power and src.state always just retrun a single unshifted value
-            return int(resp)
-        elif reg_map.channel is 0:
-            int_resp = int(resp)
-            shift_resp = int_resp & mask
-        else:
-            int_resp = int(resp)
-            shift_resp = (int_resp >> bits_per_channel) & mask
-        return shift_resp
+        #serve the read from the register cache if the value is known
+        if not reg_map.volatile and reg in self._shadow:
+            self.cache_stats["read_hits"] += 1
+            return self._shadow[reg]
+        self.cache_stats["read_misses"] += 1
+        resp=self._read_raw(reg_map.register)
+        return self._decode_register(reg,reg_map,resp)
+
+    def read_registers(self,regs:list):
+        #reads a list of registers and returns a dict of register : value (-9999 for invalid registers).
+        #Registers which share a physical register (ie. LASER1_PLR and LASER2_PLR are both src.hp.plr)
+        #are read from the board once and each channel is decoded from the same response.
+        self._check_hardware(debug_cable=None)
+        result = {}
+        groups = {}
+        for reg in regs:
+            reg_map=self.codec.records.get(reg)
+            if reg_map is None:
+                result[reg] = -9999
+            elif not reg_map.volatile and reg in self._shadow:
+                self.cache_stats["read_hits"] += 1
+                result[reg] = self._shadow[reg]
+            else:
+                result[reg] = None
+                groups.setdefault(reg_map.register,[]).append((reg,reg_map))
+        for register,names in groups.items():
+            self.cache_stats["read_misses"] += 1
+            self.cache_stats["coalesced_reads"] += len(names) - 1
+            resp=self._read_raw(register)
+            for reg,reg_map in names:
+                result[reg] = self._decode_register(reg,reg_map,resp)
+        return result
     
     def get_board_status(self):
         #Read the board's status register to get the laser status
-        result = {}
         board_status = self.read_register("LASER_STATUS")
-        for name, offset in self.config.status_flags.flags.items():
-            bit_value = (board_status >> offset) & 1
-            result[name] = bit_value
+        result = self.codec.decode_status(board_status)
+        #the board can turn a laser off by itself (ie. a fault), drop the cached state if it no longer matches
+        for state in ("LASER1_STATE","LASER2_STATE"):
+            if state in self._shadow and self._shadow[state] != result[state]:
+                self.invalidate_cache(state)
         return result
 
 
@@ -0,0 +1,83 @@
+import json
+import os
+import threading
+from datetime import datetime
+from laser_config.laser_data import LaserConfig
+from logic.plr_model import PLRModel
+
+"""
+plr_model_store.py - local JSON store of the PLR -> power models, one per laser model. Lasers of the
+same part share a wavelength and operating / max current so those make up the model key. After a
+laser is configured its PLR ramp pairs are folded into its model and the file is rewritten, the next
+laser of the same model starts its PLR search at the PLR the model predicts.
+
+The file is re-read before every update so stations sharing the file do not drop each other's units.
+"""
+
+MODEL_PATH_ENV = "HP_LASER_PLR_MODELS"
+DEFAULT_MODEL_PATH = "C:\\Santec Data\\SLS-200\\Laser Config Data\\PLR Models.json"
+#units a model needs before its predictions are used
+MIN_UNITS = 2
+
+def model_key(laser_setup:LaserConfig):
+    return f"{laser_setup.laser_wvl:g}nm op{laser_setup.laser_op_current:g}mA max{laser_setup.laser_max_current:g}mA"
+
+class PLRModelStore:
+    def __init__(self,filepath:str=None,min_units=MIN_UNITS):
+        self.filepath = filepath or os.environ.get(MODEL_PATH_ENV) or DEFAULT_MODEL_PATH
+        self.min_units = min_units
+        self._lock = threading.Lock()
+        self.models = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.filepath):
+            return {}
+        try:
+            with open(self.filepath,"r",encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError,ValueError):
+            return {} #a damaged file only costs the warm start, it is rewritten on the next update
+        return {key:PLRModel.from_dict(model) for key,model in data.get("models",{}).items()}
+
+    def _save(self):
+        directory = os.path.dirname(self.filepath)
+        if directory:
+            os.makedirs(directory,exist_ok=True)
+        data = {
+            "updated":datetime.now().isoformat(timespec="seconds"),
+            "models":{key:model.to_dict() for key,model in self.models.items()}
+        }
+        #write to a temp file and swap it in so a crash never leaves half a file
+        tmp_path = f"{self.filepath}.tmp"
+        with open(tmp_path,"w",encoding="utf-8") as f:
+            json.dump(data,f,indent=2)
+        os.replace(tmp_path,self.filepath)
+
+    def predict_plr(self,laser_setup:LaserConfig,target_power:float,max_plr:int=255):
+        #predicted PLR for the laser to reach target_power (dBm), None if its model is not trained yet
+        with self._lock:
+            model = self.models.get(model_key(laser_setup))
+            if model is None or len(model.units) < self.min_units:
+                return None
+            return model.predict_plr(target_power,max_plr)
+
+    def update(self,laser_setup:LaserConfig,pairs):
+        #folds the (plr, power dBm) pairs of a configured laser into its model and saves the store.
+        #Returns the number of pairs used
+        with self._lock:
+            self.models = self._load()
+            model = self.models.setdefault(model_key(laser_setup),PLRModel())
+            used = model.add_unit(pairs)
+            if used:
+                self._save()
+            return used
+
+_stores = {}
+
+def get_plr_model_store(filepath:str=None):
+    #returns the store for filepath, shared by every station in the process
+    path = os.path.abspath(filepath or os.environ.get(MODEL_PATH_ENV) or DEFAULT_MODEL_PATH)
+    store = _stores.get(path)
+    if store is None:
+        store = _stores[path] = PLRModelStore(path)
+    return store
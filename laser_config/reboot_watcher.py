@@ -0,0 +1,147 @@
+import logging
+import time
+from dataclasses import dataclass
+from hp_laser_decorator import reconnect_instrument, CONNECTION_ERRORS
+
+"""
+reboot_watcher.py - watches the driver board through the debug cable while it is power cycled.
+LASER_STATUS is polled until the board drops out (no answer, or INITRAM set while it reloads its saved
+values, for a few polls in a row so a single read error is not taken as a reboot) and then until it
+answers again with INITRAM clear for a few polls in a row. If the debug cable itself drops off (it is
+powered from the board on some stations) it is reconnected with a back off between attempts. Used in place of
+waiting for the operator to press ENTER after a power cycle / reconnect, callers fall back to the
+prompt if the watcher times out.
+"""
+
+@dataclass
+class RebootResult:
+    rebooted: bool = False #the board was seen going down and coming back
+    ready: bool = False #the board is answering with INITRAM clear
+    config_timeout: bool = False #CFGTIMO was set once the board came back
+    down_time: float = 0.0
+    elapsed: float = 0.0
+    reason: str = ""
+
+class RebootWatcher:
+    def __init__(self,poll_interval=0.2,drop_timeout=60.0,ready_timeout=30.0,settle_polls=3,drop_polls=3,
+                 reconnect_delay=1.0,max_reconnect_delay=10.0,logger=None):
+        #drop_timeout - time allowed for the operator to power the board off
+        #ready_timeout - time allowed for the board to come back once it dropped out
+        #settle_polls - consecutive ready polls before the board counts as ready
+        #drop_polls - consecutive failed / INITRAM polls before the board counts as down
+        #reconnect_delay - first wait before reconnecting a dropped debug cable, doubled up to max_reconnect_delay
+        self.poll_interval = poll_interval
+        self.drop_timeout = drop_timeout
+        self.ready_timeout = ready_timeout
+        self.settle_polls = settle_polls
+        self.drop_polls = drop_polls
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.logger = logger or logging.getLogger(__name__)
+        self._dropped = None #debug cable which raised a connection error
+        self._next_reconnect = 0.0
+        self._backoff = reconnect_delay
+
+    def _reconnect(self,laser_driver):
+        #binds the debug cable. A cable that dropped off is reopened at its address, at most once per back off period
+        now = time.perf_counter()
+        if now < self._next_reconnect:
+            return False
+        try:
+            if self._dropped is None:
+                laser_driver.bind()
+            else:
+                laser_driver.bind(reconnect_instrument(laser_driver.instrument_name,self._dropped))
+                self._dropped = None
+        except Exception as e:
+            self.logger.debug(f"Debug cable reconnect failed, next try in {self._backoff:.1f}s: {e}")
+            self._next_reconnect = now + self._backoff
+            self._backoff = min(self._backoff * 2,self.max_reconnect_delay)
+            return False
+        self._backoff = self.reconnect_delay
+        return True
+
+    def _poll(self,laser_driver):
+        #returns the status register value or None if the board (or the cable) is not answering
+        if laser_driver.hw is None and not self._reconnect(laser_driver):
+            return None
+        try:
+            return int(laser_driver.hw.read_reg(laser_driver.codec.records["LASER_STATUS"].register))
+        except ValueError:
+            return None #"Error reading register", the board is off or booting
+        except CONNECTION_ERRORS as e:
+            #the cable dropped off with the board, reconnect once the back off has passed
+            self.logger.debug(f"Debug cable not answering: {e}")
+            self._dropped,laser_driver.hw = laser_driver.hw,None
+            self._next_reconnect = time.perf_counter() + self._backoff
+            return None
+
+    def _is_booting(self,laser_driver,status):
+        return status is None or (status >> laser_driver.codec.status_flags["INITRAM"]) & 1
+
+    def _wait_until_ready(self,laser_driver,result:RebootResult,start:float,timeout:float):
+        ready_polls = 0
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            status = self._poll(laser_driver)
+            ready_polls = 0 if self._is_booting(laser_driver,status) else ready_polls + 1
+            if ready_polls >= self.settle_polls:
+                result.ready = True
+                result.config_timeout = bool((status >> laser_driver.codec.status_flags["CFGTIMO"]) & 1)
+                break
+            time.sleep(self.poll_interval)
+        else:
+            result.reason = f"board did not come back within {timeout}s"
+        result.elapsed = time.perf_counter() - start
+        #the board reloaded its saved values, nothing cached before the reboot can be trusted
+        laser_driver.notify_power_cycle()
+        return result
+
+    def wait_for_reboot(self,laser_driver):
+        #waits for the board to go down and come back up
+        result = RebootResult()
+        start = time.perf_counter()
+        deadline = start + self.drop_timeout
+        down_polls = 0
+        while True:
+            down_polls = down_polls + 1 if self._is_booting(laser_driver,self._poll(laser_driver)) else 0
+            if down_polls >= self.drop_polls:
+                break
+            if time.perf_counter() >= deadline:
+                result.reason = f"board was not power cycled within {self.drop_timeout}s"
+                result.elapsed = time.perf_counter() - start
+                return result
+            time.sleep(self.poll_interval)
+        dropped = time.perf_counter()
+        self.logger.info(f"Driver board power cycle detected, waiting for it to come back...")
+        self._wait_until_ready(laser_driver,result,start,self.ready_timeout)
+        result.rebooted = result.ready
+        result.down_time = result.elapsed - (dropped - start)
+        return result
+
+    def wait_for_ready(self,laser_driver,timeout=None):
+        #waits for the board to answer (ie. after it was powered on), does not need to see it go down
+        return self._wait_until_ready(laser_driver,RebootResult(),time.perf_counter(),self.ready_timeout if timeout is None else timeout)
+
+    def board_ready(self,laser_driver,message:str,timeout=None):
+        #logs message and waits for the board to answer, returns True if it did before the timeout
+        self.logger.info(message)
+        result = self.wait_for_ready(laser_driver,timeout)
+        if not result.ready:
+            self.logger.info(f"WARNING! {result.reason}")
+        return result.ready
+
+    def watch(self,laser_driver,message:str,fallback_prompt:str,fallback=None,reboot=True):
+        #logs message (the instruction for the operator) and watches the board. If the watcher times out
+        #the operator is prompted with fallback(fallback_prompt) as before (input() if None). Returns the RebootResult
+        self.logger.info(message)
+        result = self.wait_for_reboot(laser_driver) if reboot else self.wait_for_ready(laser_driver)
+        if result.ready:
+            self.logger.info(f"Driver board is back after {result.elapsed:.1f}s")
+            if result.config_timeout:
+                self.logger.info(f"WARNING! Driver board reports a configuration timeout (CFGTIMO)")
+        else:
+            self.logger.info(f"WARNING! {result.reason}")
+            (fallback or input)(fallback_prompt)
+            laser_driver.notify_power_cycle()
+        return result
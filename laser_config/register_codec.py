@@ -0,0 +1,132 @@
+import json
+import os
+from dataclasses import fields
+from typing import NamedTuple
+from laser_config.hp_laser_reg import LaserConfig, LaserChannelConfig, CommandTable, StatusBitFlags
+
+"""
+register_codec.py - register encoder / decoder for the IC-HT laser driver, compiled once per process
+from the CommandTable and a board profile (the register values written by reset_board_to_default).
+
+The board profile is the LaserConfig dataclass defaults overlaid with a JSON file of
+CommandTable name : value (Default_Config.json in the repo root unless HP_LASER_BOARD_PROFILE points
+at another file), so a different board only needs a different JSON file.
+
+Every register is compiled into an immutable RegisterRecord holding its precomputed channel bits,
+mask and decode shift. The hex strings of the 8 bit registers are built up front so encoding a
+write is a table lookup.
+"""
+
+PROFILE_ENV = "HP_LASER_BOARD_PROFILE"
+DEFAULT_PROFILE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),"Default_Config.json")
+#registers that are precomputed into hex string tables (2^value_bits strings each)
+_TABLE_BITS = 8
+
+class RegisterRecord(NamedTuple):
+    name: str #CommandTable name (ie. LASER1_PLR)
+    register: str #debug cable register (ie. src.hp.plr)
+    channel: int
+    value_bits: int
+    volatile: bool
+    max_value: int
+    channel_bits: int #channel already shifted into place for encoding
+    shift: int #right shift to get this channel's value out of a read response
+    mask: int
+
+class RegisterCodec:
+    def __init__(self,cmd_table:CommandTable=None,profile:dict=None,status_flags:StatusBitFlags=None):
+        cmd_table = cmd_table or CommandTable()
+        self.records = {}
+        self._hex_tables = {}
+        for name,reg_map in cmd_table.entries.items():
+            #src.power and src.state always return a single unshifted value
+            single_value = "src.power" in reg_map.register or "src.state" in reg_map.register
+            record = RegisterRecord(
+                name=name,
+                register=reg_map.register,
+                channel=reg_map.channel,
+                value_bits=reg_map.value_bits,
+                volatile=reg_map.volatile,
+                max_value=(1 << reg_map.value_bits) - 1,
+                channel_bits=reg_map.channel << reg_map.value_bits,
+                shift=0 if single_value or reg_map.channel == 0 else reg_map.value_bits,
+                mask=-1 if single_value else (1 << reg_map.value_bits) - 1
+            )
+            self.records[name] = record
+            if record.value_bits <= _TABLE_BITS:
+                self._hex_tables[name] = tuple(f"0x{record.channel_bits | val:05X}" for val in range(record.max_value + 1))
+        self.status_flags = dict((status_flags or StatusBitFlags()).flags)
+        self.profile = self._check_profile(profile if profile is not None else load_board_profile())
+
+    def _check_profile(self,profile:dict):
+        #makes sure every value of the profile can be encoded, returns the profile in write order
+        checked = {}
+        for name,val in profile.items():
+            record = self.records.get(name)
+            if record is None or record.volatile:
+                raise ValueError(f"Board profile register {name} is not a writable register")
+            if not (0 <= val <= record.max_value):
+                raise ValueError(f"Board profile value {name}={val} exceed {record.value_bits} - bit range")
+            checked[name] = val
+        return checked
+
+    def encode(self,name:str,val:int):
+        #returns (RegisterRecord, hex string) for writing val into the register
+        table = self._hex_tables.get(name)
+        if table is not None and 0 <= val < len(table):
+            return self.records[name],table[val]
+        record = self.records[name]
+        if not (0 <= val <= record.max_value):
+            raise ValueError(f"Value {val} exceed {record.value_bits} - bit range")
+        return record,f"0x{record.channel_bits | val:05X}"
+
+    def decode(self,record:RegisterRecord,resp):
+        #returns the value of the record's channel from a read response
+        return (int(resp) >> record.shift) & record.mask
+
+    def encode_image(self,values:dict=None):
+        #encodes a whole board image (the profile if values is None), returns a list of
+        #(name, value, RegisterRecord, hex string) in write order
+        values = self.profile if values is None else values
+        return [(name,val,*self.encode(name,val)) for name,val in values.items()]
+
+    def decode_status(self,status:int):
+        return {name:(status >> offset) & 1 for name,offset in self.status_flags.items()}
+
+def _flatten_laser_config(config:LaserConfig):
+    #CommandTable name : value for the LaserConfig dataclass values
+    channel_names = {
+        "tec":"TEC","plr":"PLR","mode":"MODE","irange":"IRANGE","ilim":"ILIM","reg_delay_comp":"REG_DELAY_COMP",
+        "ext_ci_cap":"EXT_CI_CAP","offset_comp":"OFFSET_COMP","state":"STATE","pow":"POW"
+    }
+    missing = {f.name for f in fields(LaserChannelConfig)} - set(channel_names)
+    if missing:
+        raise ValueError(f"LaserChannelConfig fields {missing} have no register")
+    values = {}
+    #write order of the reset: TEC first, the laser state and power last
+    for field_name in ("tec","rdco","plr","mode","irange","ilim","reg_delay_comp","ext_ci_cap","offset_comp","state","pow"):
+        if field_name == "rdco":
+            values["RDCO"] = config.rdco
+            continue
+        for ch,channel_config in ((1,config.laser1),(2,config.laser2)):
+            values[f"LASER{ch}_{channel_names[field_name]}"] = getattr(channel_config,field_name)
+    return values
+
+def load_board_profile(path:str=None):
+    #LaserConfig defaults overlaid with the JSON profile at path
+    path = path or os.environ.get(PROFILE_ENV) or DEFAULT_PROFILE_PATH
+    profile = _flatten_laser_config(LaserConfig())
+    if os.path.exists(path):
+        with open(path,"r",encoding="utf-8") as f:
+            profile.update({name:int(val) for name,val in json.load(f).items()})
+    return profile
+
+_codecs = {}
+
+def get_codec(profile_path:str=None):
+    #returns the codec for the board profile, compiled on first use
+    path = os.path.abspath(profile_path or os.environ.get(PROFILE_ENV) or DEFAULT_PROFILE_PATH)
+    codec = _codecs.get(path)
+    if codec is None:
+        codec = _codecs[path] = RegisterCodec(profile=load_board_profile(path))
+    return codec
@@ -0,0 +1,69 @@
+import math
+from dataclasses import dataclass, field
+
+"""
+plr_model.py - PLR -> output power (L-I style) model of a laser part. Above threshold the optical
+power in mW is close to linear in the PLR, so the (PLR, power) pairs measured during the PLR ramp of
+each unit are fitted with a least squares line power_mw = slope * plr + offset.
+
+The model keeps the lines of the most recent units. predict_plr gives the median of the PLRs the
+lines need to reach a target power (dBm), so a single odd unit does not move the prediction and the
+model follows a drifting part. The prediction is the starting point of the PLR search (see
+warm_start_search in logic/plr_search.py).
+"""
+
+#readings below this (dBm) are the laser below threshold / OPM dark readings and are not fitted
+DARK_FLOOR = -60.0
+#units kept per model
+MAX_UNITS = 50
+
+def dbm_to_mw(power:float):
+    return 10 ** (power / 10)
+
+def fit_line(pairs,dark_floor=DARK_FLOOR):
+    #least squares power_mw = slope * plr + offset through the (plr, power dBm) pairs above dark_floor.
+    #Returns (slope, offset, pairs used) or None if the pairs do not define a line
+    n = sum_plr = sum_mw = sum_plr2 = sum_plr_mw = 0
+    for plr,power in pairs:
+        if power is None or math.isnan(power) or power < dark_floor:
+            continue
+        mw = dbm_to_mw(power)
+        n += 1
+        sum_plr += plr
+        sum_mw += mw
+        sum_plr2 += plr * plr
+        sum_plr_mw += plr * mw
+    denom = n * sum_plr2 - sum_plr ** 2
+    if n < 2 or denom <= 0:
+        return None
+    slope = (n * sum_plr_mw - sum_plr * sum_mw) / denom
+    return slope,(sum_mw - slope * sum_plr) / n,n
+
+@dataclass
+class PLRModel:
+    units: list = field(default_factory=list) #[slope mW/PLR, offset mW] of each unit, oldest first
+
+    def add_unit(self,pairs,dark_floor=DARK_FLOOR):
+        #fits the (plr, power dBm) pairs of one unit and adds its line, returns the number of pairs used
+        line = fit_line(pairs,dark_floor)
+        if line is None or line[0] <= 0:
+            return 0
+        self.units.append([line[0],line[1]])
+        del self.units[:-MAX_UNITS]
+        return line[2]
+
+    def predict_plr(self,target_power:float,max_plr:int=255):
+        #lowest PLR expected to reach target_power (dBm), None if the model can not predict it
+        if not self.units:
+            return None
+        target_mw = dbm_to_mw(target_power)
+        plrs = sorted(math.ceil((target_mw - offset) / slope) for slope,offset in self.units)
+        plr = plrs[len(plrs) // 2]
+        return plr if 0 <= plr <= max_plr else None
+
+    def to_dict(self):
+        return {"units":[{"slope_mw_per_plr":slope,"offset_mw":offset} for slope,offset in self.units]}
+
+    @classmethod
+    def from_dict(cls,data:dict):
+        return cls(units=[[unit["slope_mw_per_plr"],unit["offset_mw"]] for unit in data.get("units",[])])
@@ -0,0 +1,179 @@
+import time
+from dataclasses import dataclass
+
+"""
+plr_search.py - search strategies used to find the PLR value which brings a laser up to its
+target output power. Each strategy is a generator which yields the next PLR to probe and is
+sent back the power measured at that PLR. run_plr_search drives a strategy with a probe function
+so the same strategy can be used for a single laser or stepped along side another channel,
+async_run_plr_search does the same with a coroutine probe.
+
+warm_start_search starts from a predicted PLR instead of the register value and returns None if the
+prediction turns out to be off. Strategies return the lowest probed PLR whose power reached the
+target (the same PLR the linear +1 ramp would stop at) or None if max_plr was reached without
+reaching the target.
+"""
+
+SEARCH_MODES = ("linear","bisect","secant")
+
+@dataclass
+class PLRSearchResult:
+    status: int = -1 #1 = target power reached, -1 = failed (overcurrent or max plr reached)
+    plr: int = 0
+    power: float = 0.0
+    probes: int = 0
+    elapsed: float = 0.0
+    reason: str = ""
+
+def linear_search(start_plr:int,target_power:float,max_plr:int=255,step:int=1):
+    #steps the plr up by step until the target power is reached
+    plr = start_plr
+    power = yield plr
+    while power < target_power:
+        plr += step
+        if plr > max_plr:
+            return None
+        power = yield plr
+    return plr,power
+
+def _next_refine_plr(lo:int,lo_power:float,hi:int,hi_power:float,target_power:float,use_secant:bool):
+    #picks the next plr inside of the open bracket (lo,hi)
+    mid = (lo + hi) // 2
+    if not use_secant or hi_power <= lo_power:
+        return mid
+    #interpolate between the two bracket ends, keep the probe strictly inside the bracket
+    plr = lo + round((target_power - lo_power) * (hi - lo) / (hi_power - lo_power))
+    return min(max(plr,lo + 1),hi - 1)
+
+def bracket_search(start_plr:int,target_power:float,max_plr:int=255,coarse_step:int=16,refine="bisect"):
+    #coarse steps up from start_plr until the target is bracketed, then narrows the bracket with
+    #bisection or secant steps until lo and hi are 1 PLR apart.
+    plr = start_plr
+    power = yield plr
+    if power >= target_power:
+        return plr,power
+    lo,lo_power = plr,power
+
+    #bracket the target power
+    while True:
+        if lo >= max_plr:
+            return None
+        plr = min(lo + coarse_step,max_plr)
+        power = yield plr
+        if power >= target_power:
+            hi,hi_power = plr,power
+            break
+        lo,lo_power = plr,power
+
+    return (yield from _refine_bracket(lo,lo_power,hi,hi_power,target_power,refine))
+
+def _refine_bracket(lo:int,lo_power:float,hi:int,hi_power:float,target_power:float,refine="bisect"):
+    #narrows the bracket (lo below the target, hi at or above it) until lo and hi are 1 PLR apart.
+    #Secant steps can get stuck creeping in from one side, if a secant step does not at least halve
+    #the bracket the next step is a bisection.
+    use_secant = refine == "secant"
+    while hi - lo > 1:
+        width = hi - lo
+        plr = _next_refine_plr(lo,lo_power,hi,hi_power,target_power,use_secant)
+        power = yield plr
+        if power >= target_power:
+            hi,hi_power = plr,power
+        else:
+            lo,lo_power = plr,power
+        if refine == "secant":
+            use_secant = (hi - lo) <= width // 2
+    return hi,hi_power
+
+def warm_start_search(predicted_plr:int,target_power:float,max_plr:int=255,max_steps:int=4,refine="secant"):
+    #starts at the PLR predicted by the laser model (see logic/plr_model.py) and steps away from it
+    #in doubling steps (1, 2, 4 ...) until the target is bracketed, then refines the bracket. With a
+    #good prediction the search ends after 2 probes (the predicted PLR and the one below it).
+    #Returns None if the target is not bracketed within max_steps steps, the prediction is off and
+    #the caller should fall back to a full search.
+    plr = min(max(predicted_plr,0),max_plr)
+    power = yield plr
+    step = 1
+    if power >= target_power:
+        hi,hi_power = plr,power
+        for i in range(max_steps):
+            if hi == 0:
+                return hi,hi_power
+            plr = max(hi - step,0)
+            power = yield plr
+            if power < target_power:
+                lo,lo_power = plr,power
+                break
+            hi,hi_power = plr,power
+            step *= 2
+        else:
+            return None
+    else:
+        lo,lo_power = plr,power
+        for i in range(max_steps):
+            if lo >= max_plr:
+                return None
+            plr = min(lo + step,max_plr)
+            power = yield plr
+            if power >= target_power:
+                hi,hi_power = plr,power
+                break
+            lo,lo_power = plr,power
+            step *= 2
+        else:
+            return None
+    return (yield from _refine_bracket(lo,lo_power,hi,hi_power,target_power,refine))
+
+def build_plr_search(mode:str,start_plr:int,target_power:float,max_plr:int=255,coarse_step:int=16):
+    #returns the search generator for the selected mode
+    if mode == "linear":
+        return linear_search(start_plr,target_power,max_plr)
+    if mode in ("bisect","secant"):
+        return bracket_search(start_plr,target_power,max_plr,coarse_step,refine=mode)
+    raise ValueError(f"Unknown PLR search mode {mode}, expected one of {SEARCH_MODES}")
+
+def _search_done(result:PLRSearchResult,value):
+    #fills in result from the value the search generator returned
+    if value is None:
+        result.reason = f"max PLR reached without reaching target power"
+    else:
+        result.status = 1
+        result.plr,result.power = value
+
+def run_plr_search(search,probe):
+    #drives a search generator. probe(plr) must return the measured power or None to abort
+    #(ie. an overcurrent was detected)
+    result = PLRSearchResult()
+    start = time.perf_counter()
+    try:
+        plr = next(search)
+        while True:
+            power = probe(plr)
+            result.probes += 1
+            result.plr,result.power = plr,power
+            if power is None:
+                result.reason = f"probe aborted at PLR {plr}"
+                break
+            plr = search.send(power)
+    except StopIteration as done:
+        _search_done(result,done.value)
+    result.elapsed = time.perf_counter() - start
+    return result
+
+async def async_run_plr_search(search,probe):
+    #same as run_plr_search, probe is a coroutine function (see laser_config/async_apc_laser.py)
+    result = PLRSearchResult()
+    start = time.perf_counter()
+    try:
+        plr = next(search)
+        while True:
+            power = await probe(plr)
+            result.probes += 1
+            result.plr,result.power = plr,power
+            if power is None:
+                result.reason = f"probe aborted at PLR {plr}"
+                break
+            plr = search.send(power)
+    except StopIteration as done:
+        _search_done(result,done.value)
+    result.elapsed = time.perf_counter() - start
+    return result
@@ -0,0 +1,73 @@
+import asyncio
+import time
+from dataclasses import dataclass
+
+"""
+settle.py - settle detection for instrument readings. Instead of sleeping a fixed amount of time
+before taking a measurement, the reading is polled until it holds steady inside of a tolerance
+window (or a timeout is hit). async_wait_for_settle is the same detector for coroutine readers and
+wait_for_settle_all settles several readings (ie. one per OPM channel) that changed together.
+"""
+
+@dataclass
+class SettleResult:
+    value: float = 0.0
+    elapsed: float = 0.0
+    settled: bool = False
+    samples: int = 0
+
+def wait_for_settle(read_fn,poll_interval=0.1,tolerance=0.05,window=3,timeout=5.0,min_wait=0.2):
+    #polls read_fn every poll_interval seconds. Once the last `window` readings are within tolerance
+    #(peak to peak) the mean of those readings is returned. min_wait gives the hardware time to start
+    #responding so the reading does not settle on the value from before the change.
+    #if timeout is reached the last reading is returned with settled=False
+    start = time.perf_counter()
+    readings = []
+    if min_wait > 0:
+        time.sleep(min_wait)
+    while True:
+        readings.append(read_fn())
+        recent = readings[-window:]
+        if len(recent) == window:
+            high,low = max(recent),min(recent)
+            #identical readings are checked separately so a dark reading (-inf) still settles
+            if high == low or high - low <= tolerance:
+                return SettleResult(sum(recent)/window,time.perf_counter()-start,True,len(readings))
+        elapsed = time.perf_counter() - start
+        if elapsed >= timeout:
+            return SettleResult(readings[-1],elapsed,False,len(readings))
+        time.sleep(poll_interval)
+
+def wait_for_settle_all(read_fns:dict,poll_interval=0.1,tolerance=0.05,window=3,timeout=5.0,min_wait=0.2):
+    #same as wait_for_settle for several readings that changed at the same time (ie. both lasers stepped
+    #together). The readings are settled one after the other in read_fns order, while the first one is
+    #polled the others settle on their own so they only need their window of readings. Each reader is
+    #only switched to once and the timeout is shared. Returns key : SettleResult
+    start = time.perf_counter()
+    results = {}
+    if min_wait > 0:
+        time.sleep(min_wait)
+    for key,read_fn in read_fns.items():
+        remaining = max(timeout - (time.perf_counter() - start),0.0)
+        result = wait_for_settle(read_fn,poll_interval,tolerance,window,remaining,min_wait=0)
+        result.elapsed = time.perf_counter() - start
+        results[key] = result
+    return results
+
+async def async_wait_for_settle(read_fn,poll_interval=0.1,tolerance=0.05,window=3,timeout=5.0,min_wait=0.2):
+    #same as wait_for_settle, read_fn is a coroutine function and the waits do not block the event loop
+    start = time.perf_counter()
+    readings = []
+    if min_wait > 0:
+        await asyncio.sleep(min_wait)
+    while True:
+        readings.append(await read_fn())
+        recent = readings[-window:]
+        if len(recent) == window:
+            high,low = max(recent),min(recent)
+            if high == low or high - low <= tolerance:
+                return SettleResult(sum(recent)/window,time.perf_counter()-start,True,len(readings))
+        elapsed = time.perf_counter() - start
+        if elapsed >= timeout:
+            return SettleResult(readings[-1],elapsed,False,len(readings))
+        await asyncio.sleep(poll_interval)
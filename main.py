@@ -1,15 +1,26 @@
 import user_io.hp_laser_cli as io
 from user_io.unit_info_data import UnitInfo
+import json
 import logging
 import os
 import math
+import time
 from datetime import datetime
 from laser_config.config_driver_board import initialize_driver_board
-from tec_config.config_tec import run_tec_stability
+from laser_config.reboot_watcher import RebootWatcher
+from laser_config.laser_driver_api import Laser_Driver_API
+from tec_config.tec_stability import run_tec_stability_stream
 from laser_config.config_apc_laser import APCLaserConfig
+from laser_config.plr_model_store import get_plr_model_store
 from laser_config.laser_data import LaserConfig
+from hp_laser_decorator import warm_up_instruments, WARMUP_TIMEOUT
+from hp_laser_logging import start_logging
+from hp_laser_metrics import metrics
+from data_report import TraceRecorder, export_trace_csv
+from results_store import get_results_store
 
 PRODUCT_VERSION = 1.0        
+DATA_DIR = "C:\Santec Data\SLS-200\Laser Config Data"
 """
 main.py - python script which sets initial values for the high powered laser driver board.
 Initial parameters are kept within a json file (Default_Config.json) which should be located
@@ -29,75 +40,117 @@ the PLR (Currently only works for APC mode lasers) monitoring the power level un
 The script will output a test report with all recorded PLR values and recorded power levels.
 """
 
-def setup_logging():
+def setup_logging(unit_sn=None):
     #setup logging object for printing to console and writing to a log file
     #note: this object is global in nature and after this setup is ready to go
     #      in a future update might need to pass this around to change parameters 
     #setup a file path for the log file
-    file_path = "C:\Santec Data\SLS-200\Laser Config Data"
+    file_path = DATA_DIR
     timestamp = datetime.now()
     str_date_time = timestamp.strftime("%m%d%Y-%H%M%S%p")
    
-    unit_sn = io.get_unit_sn()
+    unit_sn = unit_sn or io.get_unit_sn()
     file_path += "\\" + unit_sn
     log_file_name = f"{unit_sn} - LogFile - {str_date_time}.txt"
     os.makedirs(file_path,exist_ok=True)
     log_path = os.path.join(file_path,log_file_name)
     
-    #start some fresh loggers
-    for handler in logging.root.handlers[:]:
-        logging.root.removeHandler(handler)
-    logging.basicConfig(
-        level=logging.DEBUG,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.FileHandler(log_path,mode='a',encoding='utf-8'),
-            logging.StreamHandler()
-        ]
-    )
+    #start some fresh loggers, records are written by a background listener (see hp_laser_logging.py)
+    start_logging(log_path)
     logger=logging.getLogger(__name__)
-    logging.getLogger("pyvisa").setLevel(logging.WARNING)
     logger.info(f"Started new config session for SN:{unit_sn}")
     logger.info(f"Logging to file:{log_file_name}")
     #return the serial number
     return logger,unit_sn
+
+def open_trace_recorder(unit_sn:str):
+    #the PLR/power/TEC trace of the session is saved next to the log file
+    str_date_time = datetime.now().strftime("%m%d%Y-%H%M%S%p")
+    return TraceRecorder(os.path.join(DATA_DIR,unit_sn,f"{unit_sn} - Trace - {str_date_time}.trc"))
+
+def close_trace_recorder(recorder:TraceRecorder,logger):
+    recorder.close()
+    if recorder.samples:
+        logger.info(f"Saved {recorder.samples} trace samples to {export_trace_csv(recorder.filepath)}")
+
+def save_unit_record(unit_sn:str,unit_record:dict,logger):
+    #saves what the workflows recorded about the unit (ie. the driver board diff) next to the log file
+    if not unit_record:
+        return
+    str_date_time = datetime.now().strftime("%m%d%Y-%H%M%S%p")
+    record_path = os.path.join(DATA_DIR,unit_sn,f"{unit_sn} - Unit Record - {str_date_time}.json")
+    with open(record_path,"w",encoding="utf-8") as f:
+        json.dump({"unit_sn":unit_sn,**unit_record},f,indent=2)
+    logger.info(f"Saved unit record to {record_path}")
+
+def report_instrument_metrics(unit_sn:str,logger):
+    #logs the instrument latency summary of the session (set HP_LASER_METRICS=1 to record it)
+    if not metrics.enabled or not metrics.commands:
+        return
+    str_date_time = datetime.now().strftime("%m%d%Y-%H%M%S%p")
+    json_path = metrics.export_json(os.path.join(DATA_DIR,unit_sn,f"{unit_sn} - Instrument Metrics - {str_date_time}.json"))
+    logger.info(f"Instrument metrics ({json_path}):\n{metrics.summary_table()}")
+    metrics.reset()
  
 def main():
     print(f"\n*********************HP LASER CONFIG V{PRODUCT_VERSION}*********************\n")
     log_str = ""
+    #connect to the instruments while the operator is entering the SN
+    warmup = warm_up_instruments()
     logger,unit_sn=setup_logging()
+    recorder=open_trace_recorder(unit_sn)
+    unit_record={}
+    results_store=get_results_store()
+    errors = warmup.wait(timeout=WARMUP_TIMEOUT)
+    logger.info(f"Instrument connection took {warmup.elapsed:.1f}s")
+    for name,error in errors.items():
+        logger.info(f"WARNING! {name} is not connected: {error}. Check the instrument before running a process that needs it.")
     
     while True:
         resp=io.display_menu(unit_sn)
         if resp == 1:
             #initialize the driver board
-            init_status = initialize_driver_board()
+            start = time.perf_counter()
+            init_status = initialize_driver_board(unit_record=unit_record,watcher=RebootWatcher())
+            results_store.record_workflow(unit_sn,"init",init_status,unit_record,duration_s=round(time.perf_counter()-start,1))
             log_str = "Driver board initialization - PASS!" if init_status else "\n*********Driver board initialization - FAIL*********\n*********PLEASE CONTACT ENGINEREING*********\n"
             logger.info(log_str)
         elif resp == -1:
             #run the TEC stability test
             num_tec=io.setup_tec_test()
-            init_status = run_tec_stability(num_tec)
+            start = time.perf_counter()
+            init_status = run_tec_stability_stream(num_tec,recorder=recorder,unit_record=unit_record)
+            results_store.record_workflow(unit_sn,"tec",init_status,unit_record,duration_s=round(time.perf_counter()-start,1))
             log_str = "TEC Stability - PASS!" if init_status else "\n*********TEC Stability - FAIL!*********\n*********PLEASE CONTACT ENGINEREING*********\n"
             logger.info(log_str)
         elif resp == 2:
             #configure the laser
-            laser_info = io.setup_configure_laser()
+            laser_info = io.setup_configure_laser(wait_for_board=lambda message: RebootWatcher(ready_timeout=120.0).board_ready(Laser_Driver_API(),message))
             #update laser_power db
             laser_info["laser_power_db"] = 10*math.log10(laser_info["laser_power_mw"])
             logger.info(laser_info)
             laser_config = LaserConfig(**laser_info)
-            apc_config=APCLaserConfig()
-            plr_status = apc_config.configure_apc_laser(laser_setup=laser_config)
+            apc_config=APCLaserConfig(recorder=recorder,plr_models=get_plr_model_store())
+            plr_status = apc_config.configure_apc_laser(laser_setup=laser_config,unit_record=unit_record)
+            results_store.record_workflow(unit_sn,"laser",plr_status,unit_record,laser_sns=[laser_config.laser_sn])
             log_str = "Laser Configuration - PASS" if plr_status else "\n*********Laser Configuration - FAIL!*********\n*********PLEASE CONTACT ENGINEREING*********\n"
         elif resp == 3:
             #user wants to run stability (program later)
             pass
         elif resp == 4:
             #user has changed serial number, so change logger
+            close_trace_recorder(recorder,logger)
+            save_unit_record(unit_sn,unit_record,logger)
+            report_instrument_metrics(unit_sn,logger)
             logger,unit_sn=setup_logging()
+            recorder=open_trace_recorder(unit_sn)
+            unit_record={}
         elif resp == 5:
             #quit
+            close_trace_recorder(recorder,logger)
+            save_unit_record(unit_sn,unit_record,logger)
+            report_instrument_metrics(unit_sn,logger)
+            results_store.close()
             logger.info(f"*********************HP LASER CONFIG Script Complete*********************\n")
             break
 
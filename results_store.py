@@ -0,0 +1,247 @@
+import argparse
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+from datetime import datetime
+
+"""
+results_store.py - SQLite store of the structured workflow results (driver board init, TEC stability
+and laser configuration), one row per workflow per unit and one row per laser. The database is in
+WAL mode and indexed by unit SN, laser SN, workflow and timestamp so the history of a unit or laser
+is a single index lookup.
+
+record() only puts the row on a queue, a writer thread inserts the rows in batches (one transaction
+per batch) so the station loop does not wait on the disk. Values that are not their own column are
+kept in the JSON data column.
+
+    store = get_results_store()
+    store.record("SN1234","laser",True,laser_sn="L1",plr=65,power=3.5,data={...})
+    store.last_laser_result("L1")["plr"]
+
+usage: python results_store.py --laser L1
+       python results_store.py --unit SN1234 --workflow tec --since 2026-01-01
+"""
+
+RESULTS_DB_ENV = "HP_LASER_RESULTS_DB"
+DEFAULT_DB_PATH = "C:\\Santec Data\\SLS-200\\Laser Config Data\\Results.db"
+RESULT_COLUMNS = ("timestamp","unit_sn","laser_sn","workflow","passed","station","plr","power","duration_s","data")
+WORKFLOWS = ("init","tec","laser")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    unit_sn TEXT NOT NULL,
+    laser_sn TEXT,
+    workflow TEXT NOT NULL,
+    passed INTEGER NOT NULL,
+    station TEXT,
+    plr INTEGER,
+    power REAL,
+    duration_s REAL,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_results_unit ON results (unit_sn, timestamp);
+CREATE INDEX IF NOT EXISTS idx_results_laser ON results (laser_sn, timestamp);
+CREATE INDEX IF NOT EXISTS idx_results_workflow ON results (workflow, timestamp);
+CREATE INDEX IF NOT EXISTS idx_results_timestamp ON results (timestamp);
+"""
+
+def _connect(filepath:str):
+    connection = sqlite3.connect(filepath,timeout=30.0)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+class ResultsStore:
+    def __init__(self,filepath:str=None,batch_size=50,flush_interval=1.0,logger=None):
+        self.filepath = filepath or os.environ.get(RESULTS_DB_ENV) or DEFAULT_DB_PATH
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.logger = logger or logging.getLogger(__name__)
+        self._rows = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+        directory = os.path.dirname(self.filepath)
+        if directory:
+            os.makedirs(directory,exist_ok=True)
+        connection = _connect(self.filepath)
+        try:
+            connection.executescript(_SCHEMA)
+        finally:
+            connection.close()
+
+    def record(self,unit_sn:str,workflow:str,passed:bool,laser_sn=None,station=None,plr=None,power=None,duration_s=None,data=None):
+        #queues a result row, the writer thread is started on the first row
+        if self._closed:
+            return
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._write_loop,name="results-store",daemon=True)
+                    self._thread.start()
+        row = (
+            datetime.now().isoformat(sep=" ",timespec="seconds"),str(unit_sn),None if laser_sn is None else str(laser_sn),
+            workflow,int(bool(passed)),station,plr,power,duration_s,None if data is None else json.dumps(data,default=str)
+        )
+        self._rows.put(row)
+
+    def record_workflow(self,unit_sn:str,workflow:str,passed:bool,unit_record:dict,station=None,duration_s=None,laser_sns=None):
+        #records a workflow from the details it stored in unit_record (see initialize_driver_board,
+        #run_tec_stability_stream and configure_apc_laser). The laser workflow is one row per laser,
+        #laser_sns limits it to the lasers configured by this run
+        if workflow != "laser":
+            data = unit_record.get("driver_board" if workflow == "init" else workflow)
+            self.record(unit_sn,workflow,passed,station=station,duration_s=duration_s,data=data)
+            return
+        lasers = unit_record.get("lasers",{})
+        for laser_sn in (lasers if laser_sns is None else laser_sns):
+            laser = lasers.get(laser_sn)
+            if laser is not None:
+                self.record(unit_sn,"laser",laser["passed"],laser_sn=laser_sn,station=station,plr=laser["plr"],power=laser["power"],
+                            duration_s=laser["duration_s"],data=laser)
+
+    def _write_batch(self,connection,rows):
+        try:
+            with connection:
+                connection.executemany(f"INSERT INTO results ({','.join(RESULT_COLUMNS)}) VALUES ({','.join('?' * len(RESULT_COLUMNS))})",rows)
+        except sqlite3.Error as e:
+            #the log file still has the results, a database error must not stop the station
+            self.logger.info(f"WARNING: could not save {len(rows)} results to {self.filepath}: {e}")
+
+    def _write_loop(self):
+        connection = _connect(self.filepath)
+        try:
+            while True:
+                row = self._rows.get()
+                rows,done = [],row is None
+                if not done:
+                    rows.append(row)
+                #collect the rest of the batch, anything already queued goes in the same transaction
+                while not done and len(rows) < self.batch_size:
+                    try:
+                        row = self._rows.get(timeout=self.flush_interval)
+                    except queue.Empty:
+                        break
+                    if row is None:
+                        done = True
+                    else:
+                        rows.append(row)
+                if rows:
+                    self._write_batch(connection,rows)
+                for i in range(len(rows) + done):
+                    self._rows.task_done()
+                if done:
+                    return
+        finally:
+            connection.close()
+
+    def flush(self):
+        #waits for the queued rows to be written
+        if self._thread is not None:
+            self._rows.join()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None:
+            self._rows.put(None)
+            self._thread.join()
+
+    def query(self,unit_sn=None,laser_sn=None,workflow=None,passed=None,since=None,until=None,limit=100):
+        #returns the matching results newest first as dicts, data is decoded. since / until are
+        #"YYYY-MM-DD[ HH:MM:SS]" strings, an until date includes the whole day
+        self.flush()
+        filters,args = [],[]
+        for column,value in (("unit_sn",unit_sn),("laser_sn",laser_sn),("workflow",workflow)):
+            if value is not None:
+                filters.append(f"{column} = ?")
+                args.append(value)
+        if passed is not None:
+            filters.append("passed = ?")
+            args.append(int(bool(passed)))
+        if since is not None:
+            filters.append("timestamp >= ?")
+            args.append(since)
+        if until is not None:
+            filters.append("timestamp <= ?")
+            args.append(f"{until} 23:59:59" if len(until) == 10 else until)
+        sql = f"SELECT {','.join(RESULT_COLUMNS)} FROM results"
+        if filters:
+            sql += " WHERE " + " AND ".join(filters)
+        sql += " ORDER BY timestamp DESC, id DESC"
+        if limit:
+            sql += " LIMIT ?"
+            args.append(limit)
+        connection = _connect(self.filepath)
+        try:
+            rows = connection.execute(sql,args).fetchall()
+        finally:
+            connection.close()
+        results = []
+        for row in rows:
+            result = dict(zip(RESULT_COLUMNS,row))
+            result["passed"] = bool(result["passed"])
+            result["data"] = json.loads(result["data"]) if result["data"] else {}
+            results.append(result)
+        return results
+
+    def last_laser_result(self,laser_sn:str,passed=True):
+        #latest laser configuration of the laser (the last passing one by default), None if there is none
+        results = self.query(laser_sn=laser_sn,workflow="laser",passed=passed,limit=1)
+        return results[0] if results else None
+
+    def unit_history(self,unit_sn:str,workflow=None,limit=100):
+        return self.query(unit_sn=unit_sn,workflow=workflow,limit=limit)
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_results_store(filepath:str=None):
+    #returns the store for filepath, shared by every station in the process and closed at exit
+    path = os.path.abspath(filepath or os.environ.get(RESULTS_DB_ENV) or DEFAULT_DB_PATH)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = ResultsStore(path)
+            atexit.register(store.close)
+    return store
+
+def _format_table(results):
+    lines = [f"{'timestamp':<21}{'unit':<16}{'laser':<16}{'workflow':<10}{'result':<8}{'plr':>5}{'power':>9}{'time s':>9}  station"]
+    for r in results:
+        plr = "" if r["plr"] is None else r["plr"]
+        power = "" if r["power"] is None else f"{r['power']:.2f}"
+        duration = "" if r["duration_s"] is None else f"{r['duration_s']:.1f}"
+        lines.append(f"{r['timestamp']:<21}{r['unit_sn']:<16}{r['laser_sn'] or '':<16}{r['workflow']:<10}{'PASS' if r['passed'] else 'FAIL':<8}"
+                     f"{plr:>5}{power:>9}{duration:>9}  {r['station'] or ''}")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="HP laser config results lookup")
+    parser.add_argument("--db",default=None,help=f"results database (default ${RESULTS_DB_ENV} or {DEFAULT_DB_PATH})")
+    parser.add_argument("--unit",help="unit SN")
+    parser.add_argument("--laser",help="laser SN")
+    parser.add_argument("--workflow",choices=WORKFLOWS)
+    parser.add_argument("--since",help="YYYY-MM-DD[ HH:MM:SS]")
+    parser.add_argument("--until",help="YYYY-MM-DD[ HH:MM:SS]")
+    result = parser.add_mutually_exclusive_group()
+    result.add_argument("--passed",action="store_true",help="only passing results")
+    result.add_argument("--failed",action="store_true",help="only failing results")
+    parser.add_argument("--limit",type=int,default=50)
+    parser.add_argument("--json",action="store_true",help="print the results (with their data) as JSON")
+    args = parser.parse_args()
+
+    store = ResultsStore(args.db)
+    passed = True if args.passed else False if args.failed else None
+    results = store.query(unit_sn=args.unit,laser_sn=args.laser,workflow=args.workflow,passed=passed,since=args.since,until=args.until,limit=args.limit)
+    print(json.dumps(results,indent=2) if args.json else _format_table(results))
+
+if __name__ == "__main__":
+    main()
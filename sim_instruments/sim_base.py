@@ -0,0 +1,45 @@
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+"""
+sim_base.py - shared pieces for the simulated instruments. LatencyModel injects a per call delay
+(base + random jitter, optionally overridden per command) so cycle time can be measured without
+hardware. SimInstrument keeps call counts and the total time spent in injected latency.
+"""
+
+#keep a reference to the real sleep so injected latency is still I/O time if time.sleep is patched (ie. by a benchmark)
+_io_sleep = time.sleep
+
+@dataclass
+class LatencyModel:
+    base: float = 0.0
+    jitter: float = 0.0
+    per_command: dict = field(default_factory=dict) #command name : base delay override
+
+    def delay(self,command:str):
+        delay = self.per_command.get(command,self.base)
+        if self.jitter:
+            delay += random.uniform(0,self.jitter)
+        return delay
+
+class SimInstrument:
+    def __init__(self,latency=None):
+        self.latency = latency or LatencyModel()
+        self.call_counts = Counter()
+        self.io_time = 0.0
+        self._lock = threading.RLock()
+
+    def _call(self,command:str):
+        #counts the call and sleeps for the injected latency
+        self.call_counts[command] += 1
+        delay = self.latency.delay(command)
+        if delay > 0:
+            _io_sleep(delay)
+            self.io_time += delay
+
+    def reset_stats(self):
+        self.call_counts.clear()
+        self.io_time = 0.0
@@ -0,0 +1,47 @@
+import math
+import random
+import time
+from sim_instruments.sim_base import SimInstrument
+
+"""
+sim_daq.py - simulated SLS-TEC-DAQ. For every TEC channel the DAQ returns a (sense voltage,
+thermistor voltage) pair in the order calc_temp_readings expects. Thermistor resistance follows the
+same B equation as TecData so the calculated temperature matches the simulated one.
+"""
+
+class SimDAQ(SimInstrument):
+    def __init__(self,temps=None,drift_per_s=0.0,noise=0.01,b_value=3900,therm_res_25c=10000,r_sense=10000,v_sense=1.0,latency=None,seed=None):
+        super().__init__(latency)
+        self.temps = list(temps or [25.0,25.0]) #degrees C per TEC channel
+        self.drift_per_s = drift_per_s
+        self.noise = noise #degrees C
+        self.b_value = b_value
+        self.therm_res_25c = therm_res_25c
+        self.r_sense = r_sense
+        self.v_sense = v_sense
+        self.channels = {}
+        self._rng = random.Random(seed)
+        self._start = time.monotonic()
+
+    def set_channel(self,ch:int,fcn:int):
+        self._call("set_channel")
+        self.channels[ch] = fcn
+
+    def set_temperature(self,ch:int,temp:float):
+        self.temps[ch - 1] = temp
+
+    def temperature(self,ch:int):
+        return self.temps[ch - 1] + self.drift_per_s * (time.monotonic() - self._start)
+
+    def read_data(self):
+        self._call("read_data")
+        num_ch = len(self.channels) // 2 if self.channels else len(self.temps)
+        readings = []
+        for ch in range(1,num_ch + 1):
+            temp_k = self.temperature(ch) + self._rng.gauss(0,self.noise) + 273.15
+            #inverse of the TecData.calc_temp equation
+            r_therm = self.therm_res_25c * math.exp(self.b_value * (1 / 297.75 - 1 / temp_k))
+            i_therm = self.v_sense / self.r_sense
+            readings.append(self.v_sense)
+            readings.append(i_therm * r_therm)
+        return readings
@@ -0,0 +1,96 @@
+import time
+from laser_config.hp_laser_reg import CommandTable, StatusBitFlags
+from sim_instruments.sim_base import SimInstrument
+
+"""
+sim_debug_cable.py - simulated CLI debug cable attached to an IC-HT driver board. Holds a register
+file built from CommandTable and follows the same encoding as Laser_Driver_API (channel shifted
+above the value bits on write, channels concatenated on read). The status register is built from
+StatusBitFlags. Supports save (EEPROM image), power cycles (the board drops off the cable and
+reloads the saved image) and overcurrent injection by PLR threshold.
+"""
+
+READ_ERROR = "Error reading register"
+#registers which hold one value per physical register (src.state[n], src.power[n])
+_SINGLE_VALUE_PREFIXES = ("src.state","src.power")
+
+class SimDebugCable(SimInstrument):
+    def __init__(self,latency=None,ovc_plr=None,init_time=0.5):
+        super().__init__(latency)
+        self.flags = StatusBitFlags().flags
+        #physical register : bits per channel
+        self.value_bits = {}
+        for reg_map in CommandTable().entries.values():
+            self.value_bits[reg_map.register] = reg_map.value_bits
+        self.registers = {register:[0,0] for register in self.value_bits}
+        self.eeprom = {register:[0,0] for register in self.value_bits}
+        self.ovc_plr = ovc_plr or {} #laser channel : plr at which an overcurrent is reported
+        self.init_time = init_time
+        self.save_count = 0
+        self._offline_until = 0.0
+        self._booted_at = time.monotonic() - init_time
+
+    def _is_single(self,register:str):
+        return register.startswith(_SINGLE_VALUE_PREFIXES)
+
+    def is_online(self):
+        return time.monotonic() >= self._offline_until
+
+    def power_cycle(self,down_time=1.0):
+        #drops the board off the cable for down_time seconds then reloads the saved values
+        with self._lock:
+            self._offline_until = time.monotonic() + down_time
+            self._booted_at = self._offline_until
+            self.registers = {register:list(values) for register,values in self.eeprom.items()}
+
+    def write_reg(self,register:str,value:str):
+        self._call("write_reg")
+        with self._lock:
+            if not self.is_online() or register not in self.value_bits:
+                return
+            combined = int(value,16)
+            if register == "src.hp.save":
+                self.eeprom = {reg:list(values) for reg,values in self.registers.items()}
+                self.save_count += 1
+                return
+            bits = self.value_bits[register]
+            ch = (combined >> bits) & 1
+            val = combined & ((1 << bits) - 1)
+            if self._is_single(register):
+                self.registers[register] = [val,val]
+            else:
+                self.registers[register][ch] = val
+
+    def read_reg(self,register:str):
+        self._call("read_reg")
+        with self._lock:
+            if not self.is_online() or register not in self.value_bits:
+                return READ_ERROR
+            if register == "src.hp.stat":
+                return str(self.status())
+            values = self.registers[register]
+            if self._is_single(register):
+                return str(values[0])
+            return str((values[1] << self.value_bits[register]) | values[0])
+
+    #helpers used by the simulated OPM and for checking results
+    def plr(self,ch:int):
+        return self.registers["src.hp.plr"][ch - 1]
+
+    def laser_on(self,ch:int):
+        return self.registers[f"src.state[{ch - 1}]"][0] == 1
+
+    def power_level(self,ch:int):
+        return self.registers[f"src.power[{ch - 1}]"][0]
+
+    def status(self):
+        status = 0
+        for ch in (1,2):
+            if self.laser_on(ch):
+                status |= 1 << self.flags[f"LASER{ch}_STATE"]
+                threshold = self.ovc_plr.get(ch)
+                if threshold is not None and self.plr(ch) >= threshold:
+                    status |= 1 << self.flags[f"LASER{ch}_OVC"]
+        if time.monotonic() - self._booted_at < self.init_time:
+            status |= 1 << self.flags["INITRAM"]
+        return status
@@ -0,0 +1,73 @@
+import math
+import random
+import time
+from dataclasses import dataclass
+from sim_instruments.sim_base import SimInstrument
+
+"""
+sim_opm.py - simulated multi-channel optical power meter. Each OPM channel is mapped to a laser
+channel on a SimDebugCable, the optical power follows a PLR -> power curve (scaled by the laser
+power level register) and moves towards a new value with a first order settle, plus gaussian noise.
+"""
+
+@dataclass
+class LinearPLRCurve:
+    #simple laser L-I style curve, no light below threshold then linear in PLR
+    threshold_plr: int = 20
+    mw_per_plr: float = 0.05
+
+    def __call__(self,plr:int):
+        return max(plr - self.threshold_plr,0) * self.mw_per_plr
+
+class SimOPM(SimInstrument):
+    def __init__(self,cable=None,channel_map=None,curve=None,noise_db=0.005,settle_time=0.3,dark_power=-80.0,latency=None,seed=None):
+        super().__init__(latency)
+        self.cable = cable
+        self.channel_map = channel_map or {1:1,2:2} #opm channel : laser channel
+        self.curves = curve if isinstance(curve,dict) else {1:curve or LinearPLRCurve(),2:curve or LinearPLRCurve()}
+        self.noise_db = noise_db
+        self.settle_time = settle_time #time constant of the settle in seconds
+        self.dark_power = dark_power
+        self.channel = 1
+        self.wavelength = 1550.0
+        self._rng = random.Random(seed)
+        self._settle = {} #opm channel : (target power, start power, time of change)
+
+    def set_opm_channel(self,ch:int):
+        self._call("set_opm_channel")
+        self.channel = ch
+
+    def set_wavelength(self,wvl:float):
+        self._call("set_wavelength")
+        self.wavelength = wvl
+
+    def target_power(self,opm_ch:int):
+        #steady state power (dBm) for the laser mapped to the opm channel
+        laser_ch = self.channel_map.get(opm_ch)
+        if self.cable is None or laser_ch is None or not self.cable.laser_on(laser_ch):
+            return self.dark_power
+        power_mw = self.curves[laser_ch](self.cable.plr(laser_ch)) * self.cable.power_level(laser_ch) / 255
+        return 10 * math.log10(power_mw) if power_mw > 0 else self.dark_power
+
+    def read_power(self):
+        self._call("read_power")
+        with self._lock:
+            now = time.monotonic()
+            #every laser keeps settling while another OPM channel is being read, so changes are
+            #picked up on all of the channels, not just the selected one
+            for opm_ch in set(self.channel_map) | {self.channel}:
+                target = self.target_power(opm_ch)
+                last = self._settle.get(opm_ch)
+                if last is None:
+                    self._settle[opm_ch] = (target,target,now)
+                elif last[0] != target:
+                    #start the settle from wherever the reading currently is
+                    self._settle[opm_ch] = (target,self._settled_value(last,now),now)
+            power = self._settled_value(self._settle[self.channel],now)
+        return max(power + self._rng.gauss(0,self.noise_db),self.dark_power)
+
+    def _settled_value(self,settle,now):
+        target,start,changed = settle
+        if self.settle_time <= 0:
+            return target
+        return target + (start - target) * math.exp(-(now - changed) / self.settle_time)
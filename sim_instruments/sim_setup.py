@@ -0,0 +1,31 @@
+import hp_laser_decorator
+from hp_laser_metrics import instrument
+from sim_instruments.sim_debug_cable import SimDebugCable
+from sim_instruments.sim_opm import SimOPM
+from sim_instruments.sim_daq import SimDAQ
+
+"""
+sim_setup.py - builds a linked set of simulated instruments (the OPM reads the lasers on the
+simulated debug cable) and registers them in the hp_laser_decorator instrument cache so every
+auto_connect_instruments call uses them instead of autodetecting hardware.
+"""
+
+def create_sim_instruments(latency=None,ovc_plr=None,curve=None,temps=None,seed=None):
+    #latency can be a single LatencyModel or a dict of instrument name : LatencyModel
+    latency = latency if isinstance(latency,dict) else {"debug_cable":latency,"opm":latency,"daq":latency}
+    cable = SimDebugCable(latency=latency.get("debug_cable"),ovc_plr=ovc_plr)
+    opm = SimOPM(cable=cable,curve=curve,latency=latency.get("opm"),seed=seed)
+    daq = SimDAQ(temps=temps,latency=latency.get("daq"),seed=seed)
+    return {"debug_cable":cable,"opm":opm,"daq":daq}
+
+def install_sim_instruments(instruments=None,cache=None):
+    #registers the simulated instruments, returns the instruments that were installed
+    instruments = instruments or create_sim_instruments()
+    cache = hp_laser_decorator._instrument_cache if cache is None else cache
+    cache.update({name:instrument(name,target) for name,target in instruments.items()})
+    return instruments
+
+def remove_sim_instruments(cache=None):
+    cache = hp_laser_decorator._instrument_cache if cache is None else cache
+    for name in ("debug_cable","opm","daq"):
+        cache.pop(name,None)
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from laser_config.config_driver_board import initialize_driver_board
+from laser_config.reboot_watcher import RebootWatcher
+from laser_config.config_apc_laser import APCLaserConfig
+from laser_config.async_apc_laser import configure_apc_laser_with_tec_monitor
+from laser_config.plr_model_store import get_plr_model_store
+from results_store import get_results_store
+from tec_config.tec_stability import run_tec_stability_stream
+from station.station_session import StationSession
+from hp_laser_metrics import metrics
+
+"""
+orchestrator.py - runs the main.py workflows (initialize driver board, TEC stability, configure
+laser) on several stations at once, one worker thread per station. Each station runs inside its
+own StationSession so it only talks to its own instruments and writes its own log.
+"""
+
+@dataclass
+class StationJob:
+    workflows: list = field(default_factory=lambda: ["init","tec","laser"])
+    num_tec: int = 1
+    lasers: list = field(default_factory=list) #list of (LaserConfig, opm channel)
+    search_mode: str = "linear"
+    warm_start: bool = True #start the PLR search at the PLR predicted by the laser's PLR model
+    watch_reboot: bool = True #detect the power cycle of the init workflow instead of waiting for ENTER
+    tec_monitor: bool = False #watch the TEC temperature during the laser ramp and abort it on an overtemp (no warm start)
+    #operator prompts for the physical steps before a workflow (workflow : prompt)
+    prompts: dict = field(default_factory=lambda: {
+        "tec":"Please power on the board, confirm the TEC light is green (press ENTER when the light has turned green): "
+    })
+
+def run_station_job(session:StationSession,job:StationJob,recorder=None,unit_record=None,results_store=None):
+    #runs the job's workflows in order on the session's instruments, stops at the first failure.
+    #recorder - optional data_report.TraceRecorder for the PLR/power/TEC trace
+    #unit_record - optional dict the workflows store their details in (ie. the driver board diff)
+    #results_store - optional results_store.ResultsStore the workflow outcomes are recorded in
+    #returns a dict of workflow : status
+    results = {}
+    unit_record = {} if unit_record is None else unit_record
+    for workflow in job.workflows:
+        if workflow in job.prompts:
+            session.prompt(job.prompts[workflow])
+        start = time.perf_counter()
+        laser_sns = []
+        if workflow == "init":
+            status = initialize_driver_board(logger=session.logger,wait_for_power_cycle=session.prompt,unit_record=unit_record,
+                                             watcher=RebootWatcher(logger=session.logger) if job.watch_reboot else None)
+        elif workflow == "tec":
+            status = run_tec_stability_stream(job.num_tec,logger=session.logger,recorder=recorder,unit_record=unit_record)
+        elif workflow == "laser":
+            status = True
+            for laser_setup,opm_channel in job.lasers:
+                if job.tec_monitor:
+                    laser_status = asyncio.run(configure_apc_laser_with_tec_monitor(laser_setup,opm_channel,job.num_tec,search_mode=job.search_mode,
+                                                                                    logger=session.logger,recorder=recorder,unit_record=unit_record))
+                else:
+                    apc_config = APCLaserConfig(logger=session.logger,search_mode=job.search_mode,recorder=recorder,
+                                                plr_models=get_plr_model_store() if job.warm_start else None)
+                    laser_status = apc_config.configure_apc_laser(laser_setup,opm_channel=opm_channel,unit_record=unit_record)
+                results[f"laser_{laser_setup.laser_sn}"] = laser_status
+                laser_sns.append(laser_setup.laser_sn)
+                status = status and laser_status
+        else:
+            raise ValueError(f"Unknown workflow {workflow}")
+        results[workflow] = status
+        if results_store is not None:
+            results_store.record_workflow(session.unit_sn,workflow,status,unit_record,station=session.name,
+                                          duration_s=round(time.perf_counter() - start,1),laser_sns=laser_sns)
+        session.logger.info(f"{workflow}: {'PASS' if status else 'FAIL'}")
+        if not status:
+            break
+    return results
+
+class StationOrchestrator:
+    def __init__(self,sessions:list,logger=None,results_store=None):
+        self.sessions = sessions
+        self.logger = logger or logging.getLogger(__name__)
+        #every station records into the same results database
+        self.results_store = results_store or get_results_store()
+        #all stations share the operator console
+        self.prompt_lock = threading.Lock()
+        for session in self.sessions:
+            session.prompt_lock = self.prompt_lock
+
+    def _run_station(self,session:StationSession,job:StationJob):
+        session.open()
+        try:
+            with session.activate():
+                return run_station_job(session,job,results_store=self.results_store)
+        except Exception as e:
+            session.logger.exception(f"Station {session.name} aborted: {e}")
+            return {"error":str(e)}
+        finally:
+            session.close()
+
+    def run(self,jobs:dict):
+        #jobs - dict of station name : StationJob. Returns dict of station name : results
+        results = {}
+        with ThreadPoolExecutor(max_workers=max(len(self.sessions),1),thread_name_prefix="station") as pool:
+            futures = {session.name:pool.submit(self._run_station,session,jobs[session.name]) for session in self.sessions if session.name in jobs}
+            for name,future in futures.items():
+                results[name] = future.result()
+                self.logger.info(f"Station {name} finished: {results[name]}")
+        self.results_store.flush()
+        if metrics.enabled:
+            self.logger.info(f"Instrument metrics (all stations):\n{metrics.summary_table()}")
+        return results
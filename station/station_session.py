@@ -0,0 +1,81 @@
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from hp_laser_decorator import bind_instrument_cache, unbind_instrument_cache
+from hp_laser_metrics import instrument
+
+"""
+station_session.py - a station is one debug cable / OPM channel / DAQ set used to configure one unit.
+A StationSession owns the instrument handles and the logger of its station. While a session is
+active on a thread every auto_connect_instruments call made on that thread gets the session's
+instruments instead of the process wide instrument cache, so several stations can run in one process.
+"""
+
+class SharedOPMChannel:
+    #wraps one channel of a multi-channel OPM that is shared between stations. Every call selects the
+    #station's channel while holding the OPM lock so stations can not read each other's channel.
+    def __init__(self,opm,channel:int,lock=None):
+        self.opm = opm
+        self.channel = channel
+        self.wavelength = None
+        self.lock = lock or threading.Lock()
+
+    def set_opm_channel(self,ch:int):
+        #the station's channel is fixed, the channel asked for by the workflow is ignored
+        pass
+
+    def set_wavelength(self,wvl:float):
+        self.wavelength = wvl
+
+    def read_power(self):
+        with self.lock:
+            self.opm.set_opm_channel(self.channel)
+            if self.wavelength is not None:
+                self.opm.set_wavelength(self.wavelength)
+            return self.opm.read_power()
+
+class StationSession:
+    def __init__(self,name:str,unit_sn:str,instruments=None,log_dir=None,prompt_lock=None):
+        #instruments - dict of instrument name ("debug_cable","opm","daq") : handle, or a callable which
+        #returns the handle when the session is opened. Missing instruments are autodetected on first use.
+        self.name = name
+        self.unit_sn = unit_sn
+        self.log_dir = log_dir
+        self.prompt_lock = prompt_lock or threading.Lock()
+        self.instruments = {}
+        self._instrument_sources = instruments or {}
+        self.logger = logging.getLogger(f"station.{name}")
+        self._log_handler = None
+
+    def open(self):
+        for name,source in self._instrument_sources.items():
+            self.instruments[name] = instrument(name,source() if callable(source) else source)
+        if self.log_dir and self._log_handler is None:
+            os.makedirs(self.log_dir,exist_ok=True)
+            log_path = os.path.join(self.log_dir,f"{self.unit_sn} - {self.name}.txt")
+            self._log_handler = logging.FileHandler(log_path,mode='a',encoding='utf-8')
+            self._log_handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+            self.logger.addHandler(self._log_handler)
+        self.logger.info(f"Opened station {self.name} for SN:{self.unit_sn}")
+        return self
+
+    def close(self):
+        if self._log_handler is not None:
+            self.logger.removeHandler(self._log_handler)
+            self._log_handler.close()
+            self._log_handler = None
+
+    @contextmanager
+    def activate(self):
+        #binds the session's instruments to the calling thread
+        bind_instrument_cache(self.instruments)
+        try:
+            yield self
+        finally:
+            unbind_instrument_cache()
+
+    def prompt(self,text=""):
+        #operator prompts are serialized between stations and tagged with the station name
+        with self.prompt_lock:
+            return input(f"[{self.name} SN:{self.unit_sn}] {text}")
@@ -0,0 +1,42 @@
+from tec_config.daq_api import DAQ_api
+from tec_config.tec_data import TecData
+from tec_config.config_tec import calc_temp_readings
+from hp_laser_async import AsyncInstrument
+import asyncio
+import logging
+
+"""
+async_tec_monitor.py - watches the laser diode TEC temperatures while another task (ie. the laser
+ramp) runs. Returns (ends the task) as soon as a channel is outside of the temperature limits so the
+caller can cancel whatever is heating the laser. A channel with no thermistor current ends the
+monitor the same way.
+"""
+
+async def monitor_tec(num_ch:int,daq=None,period=1.0,min_temp=0.0,max_temp=70.0,logger=None):
+    #daq - AsyncInstrument wrapping a DAQ_api (one is created if not given). Runs until an overtemp,
+    #then returns (channel, temperature)
+    logger = logger or logging.getLogger(__name__)
+    own_daq = daq is None
+    daq = daq or AsyncInstrument(DAQ_api(logger=logger),"daq")
+    calc_obj = TecData()
+    try:
+        await daq.config_daq(ch=[i + 1 for i in range(2*num_ch)],fcn=[0] * (2*num_ch))
+        logger.info(f"Monitoring TEC temperature every {period}s ({min_temp}C - {max_temp}C)")
+        while True:
+            readings = await daq.get_data()
+            log_str,temps = calc_temp_readings(calc_obj=calc_obj,log_str="TEC Reading:",daq_readings=readings,num_ch=num_ch)
+            logger.debug(log_str)
+            for i,temp in enumerate(temps):
+                if temp is None:
+                    #no thermistor current, the temperature can not be watched so the ramp is stopped too
+                    logger.info(log_str)
+                    logger.info(f"ERROR! No thermistor current on CH{i+1}, please check the DAQ-TEC connections and inform engineering!!!!")
+                    return i + 1,temp
+                if not (min_temp < temp < max_temp):
+                    logger.info(log_str)
+                    logger.info(f"ERROR! Overtemp conditon encountered on CH{i+1}! Please power off the board and inform engineering!!!!")
+                    return i + 1,temp
+            await asyncio.sleep(period)
+    finally:
+        if own_daq:
+            daq.close()
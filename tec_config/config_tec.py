@@ -20,11 +20,12 @@ def calc_temp_readings(calc_obj:TecData,log_str:str,daq_readings=[],num_ch=0):
     temp = []
     for i in range(0,2*num_ch,2):
         calculated_temp = calc_obj.calc_temp(ch=(i//2)+1,v_therm=daq_readings[i+1],i_therm=daq_readings[i])
-        log_str += f" CH{(i//2)+1}: {calculated_temp:.2f}C |"
+        #calc_temp returns None if there is no thermistor current (thermistor open or not connected)
+        log_str += f" CH{(i//2)+1}: no current |" if calculated_temp is None else f" CH{(i//2)+1}: {calculated_temp:.2f}C |"
         temp.append(calculated_temp)
     return log_str,temp
 
-def run_tec_stability(num_ch=0):
+def run_tec_stability(num_ch=0,logger=None,recorder=None):
     calc_obj = TecData()
     daq_readings=[]
     baseline_temp=[]
@@ -35,8 +36,8 @@ def run_tec_stability(num_ch=0):
     ch = [i + 1 for i in range(2*num_ch)]
     fcn = [0] * (2*num_ch)
     stability_flag = True
-    logger=logging.getLogger(__name__)
-    daq=DAQ_api()
+    logger=logger or logging.getLogger(__name__)
+    daq=DAQ_api(logger=logger)
 
     #configure the daq for measuring voltage
     daq.config_daq(ch=ch,fcn=fcn)
@@ -48,12 +49,23 @@ def run_tec_stability(num_ch=0):
     daq_readings=daq.get_data()
     log_str,baseline_temp = calc_temp_readings(calc_obj=calc_obj,log_str="Baseline Reading:",daq_readings=daq_readings,num_ch=num_ch)
     logger.info(log_str)
+    if recorder is not None:
+        recorder.record("tec",tec_temps=baseline_temp)
+    if None in baseline_temp:
+        logger.info("ERROR! No thermistor current, please check the DAQ-TEC connections and inform engineering!!!!")
+        return False
     
     #Start a loop, need at least 6 consectutive measurements to ensure DAQ stability
     while meas_in_tol <= 6 and idx < 12:
 
         daq_readings=daq.get_data()
         log_str,temp_calc = calc_temp_readings(calc_obj=calc_obj,log_str="Current Reading:",daq_readings=daq_readings,num_ch=num_ch)
+        if recorder is not None:
+            recorder.record("tec",tec_temps=temp_calc)
+        if None in temp_calc:
+            logger.info(log_str)
+            logger.info("ERROR! No thermistor current, please check the DAQ-TEC connections and inform engineering!!!!")
+            return False
         
         #check if the temperature readings are stable and check if any readings exceed the maximums
         for i in range(len(temp_calc)):
@@ -1,30 +1,85 @@
-from hp_laser_decorator import auto_connect_instruments
+from hp_laser_decorator import InstrumentClient
+from tec_config.daq_ring_buffer import DAQRingBuffer
 import logging
+import threading
+import time
 
 """
-daq_api.py - provides an interface to the daq plugin.
+daq_api.py - provides an interface to the daq plugin. Readings can be taken one at a time (get_data)
+or continuously by a background thread into a DAQRingBuffer (start_acquisition / latest).
 """
 
-class DAQ_api():
+class DAQ_api(InstrumentClient):
+    instrument_name = "daq"
+
     def __init__(self,daq=None,logger=None):
         self.hw=daq
         self.logger = logger or logging.getLogger(__name__)
+        self.buffer = None
+        self.acquisition_error = None
+        self._daq_config = ([],[]) #(channels, functions) of the last config_daq, re-applied after a reconnect
+        self._acq_thread = None
+        self._acq_stop = threading.Event()
 
-    @auto_connect_instruments(required=["daq"])
     def _check_hardware(self,daq=None):
-        if daq is not None and self.hw is None:
-            self.hw = daq #attach the debug_cable from the decorator if there
+        #the daq is bound on first use, after that this is only an attribute check
         if self.hw is None:
-            raise RuntimeError("No debug cable available for writing!")
+            self.bind(daq)
+
+    def _health_probe(self):
+        return len(self.hw.read_data()) > 0
         
     def config_daq(self,ch=[],fcn=[]):
         #configures the daq channels
         self._check_hardware(daq=None)
+        self._daq_config = (list(ch),list(fcn))
         for i in range(len(ch)):
-            self.hw.set_channel(ch[i],fcn[i])
+            self._hw_call("set_channel",ch[i],fcn[i])
+
+    def _on_reconnect(self):
+        #the reconnected daq starts with its default channel setup
+        for ch,fcn in zip(*self._daq_config):
+            self.hw.set_channel(ch,fcn)
     
     def get_data(self):
         #returns an array
         self._check_hardware(daq=None)
-        readings=self.hw.read_data()
-        return readings
\ No newline at end of file
+        readings=self._hw_call("read_data")
+        return readings
+
+    def start_acquisition(self,rate=10.0,capacity=36000,num_channels=None):
+        #starts reading the daq continuously at rate (readings per second) into a ring buffer holding the
+        #latest capacity readings. num_channels defaults to the number of values the daq returns.
+        self._check_hardware(daq=None)
+        self.stop_acquisition()
+        first = self._hw_call("read_data")
+        self.buffer = DAQRingBuffer(num_channels or len(first),capacity)
+        self.buffer.append(first,time.perf_counter())
+        self.acquisition_error = None
+        self._acq_stop.clear()
+        self._acq_thread = threading.Thread(target=self._acquire,args=(1.0/rate,),name="daq-acquisition",daemon=True)
+        self._acq_thread.start()
+        self.logger.info(f"Started DAQ acquisition at {rate}Hz, buffer of {capacity} readings")
+
+    def _acquire(self,period:float):
+        next_read = time.perf_counter() + period
+        while not self._acq_stop.wait(max(next_read - time.perf_counter(),0)):
+            try:
+                self.buffer.append(self.hw.read_data(),time.perf_counter())
+            except Exception as e:
+                self.acquisition_error = e
+                self.logger.info(f"ERROR! DAQ acquisition stopped: {e}")
+                return
+            next_read += period
+
+    def stop_acquisition(self):
+        if self._acq_thread is not None:
+            self._acq_stop.set()
+            self._acq_thread.join()
+            self._acq_thread = None
+
+    def latest(self,n:int,ch=None):
+        #zero copy view of the latest n readings, all channels interleaved or only channel ch (0 indexed)
+        if self.buffer is None:
+            raise RuntimeError("DAQ acquisition has not been started!")
+        return self.buffer.latest(n,ch)
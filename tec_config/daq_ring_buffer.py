@@ -0,0 +1,56 @@
+from array import array
+import threading
+
+"""
+daq_ring_buffer.py - fixed size ring buffer for continuous DAQ acquisition. Samples are stored as
+doubles in one preallocated array, interleaved by channel (frame = one reading of every channel).
+Every frame is written twice (at i and i+capacity) so the latest N frames are always one contiguous
+block, which lets latest() hand out memoryview slices instead of copies.
+
+Views point into the live buffer, copy them (ie. list(view)) if they need to outlive capacity more frames.
+"""
+
+class DAQRingBuffer:
+    def __init__(self,num_channels:int,capacity:int):
+        self.num_channels = num_channels
+        self.capacity = capacity
+        self._data = array('d',bytes(8 * 2 * capacity * num_channels))
+        self._times = array('d',bytes(8 * 2 * capacity))
+        self._data_view = memoryview(self._data)
+        self._times_view = memoryview(self._times)
+        self._head = 0 #slot the next frame is written to
+        self.count = 0 #total frames written
+        self._lock = threading.Lock()
+
+    def append(self,frame,timestamp=0.0):
+        n = self.num_channels
+        with self._lock:
+            i = self._head * n
+            j = i + self.capacity * n
+            data = self._data
+            for k in range(n):
+                data[i + k] = data[j + k] = frame[k]
+            self._times[self._head] = self._times[self._head + self.capacity] = timestamp
+            self._head = (self._head + 1) % self.capacity
+            self.count += 1
+
+    def _window(self,n:int):
+        #start/stop frame index (in the doubled buffer) of the latest n frames
+        n = min(n,self.count,self.capacity)
+        stop = self._head + self.capacity
+        return stop - n,stop
+
+    def latest(self,n:int,ch=None):
+        #returns a view of the latest n frames. ch=None returns all channels interleaved, otherwise only
+        #the readings of channel ch (0 indexed)
+        with self._lock:
+            start,stop = self._window(n)
+            nc = self.num_channels
+            if ch is None:
+                return self._data_view[start * nc:stop * nc]
+            return self._data_view[start * nc + ch:stop * nc:nc]
+
+    def latest_times(self,n:int):
+        with self._lock:
+            start,stop = self._window(n)
+            return self._times_view[start:stop]
@@ -1,5 +1,5 @@
-import math
 from dataclasses import dataclass,field
+from tec_config.thermistor import BEquation, ThermistorConverter, b_equation_temp
 
 """
 tec_data.py - this file holds data objects for data collected from the tec
@@ -16,19 +16,19 @@ class TecData():
         self.tec_ch1 = TecChannelConfig()
         self.tec_ch2 = TecChannelConfig()
 
-    def _set_r_therm(self,ch:int,v_therm:float,i_therm:float):
-        #make sure no illegal division are about to happen
-        if ch == 1:
-            self.tec_ch1.r_therm = v_therm/ (i_therm / self.tec_ch1.r_sense)
-        else:
-            self.tec_ch2.r_therm = v_therm/ (i_therm / self.tec_ch2.r_sense)
+    def _channel_config(self,ch:int):
+        return self.tec_ch1 if ch == 1 else self.tec_ch2
         
     def calc_temp(self,ch:int,v_therm:int,i_therm:float):
-        if i_therm != 0:
-            self._set_r_therm(ch,v_therm,i_therm)
-            #calculate the LD temperature, note the formula has temp in K. This method converts to C so it's usable
-            if ch == 1:
-                return (-(self.tec_ch1.b_value*297.75)/((297.75*math.log((self.tec_ch1.r_therm/self.tec_ch1.therm_res_25c))-self.tec_ch1.b_value))-273.15)
-            else:
-                return (-(self.tec_ch2.b_value*297.75)/((297.75*math.log((self.tec_ch2.r_therm/self.tec_ch2.therm_res_25c))-self.tec_ch2.b_value))-273.15)
-        
\ No newline at end of file
+        #calculate the LD temperature, note the formula has temp in K. This method converts to C so it's usable
+        cfg = self._channel_config(ch)
+        return b_equation_temp(v_therm,i_therm,cfg.r_sense,cfg.b_value,cfg.therm_res_25c)
+
+    def converter(self,num_ch=2,use_table=False):
+        #builds a batch converter (see thermistor.py) from the current channel configs
+        configs = [self._channel_config(ch) for ch in range(1,num_ch+1)]
+        return ThermistorConverter(
+            [BEquation(cfg.b_value,cfg.therm_res_25c) for cfg in configs],
+            r_sense=[cfg.r_sense for cfg in configs],
+            use_table=use_table
+        )
@@ -0,0 +1,125 @@
+from tec_config.daq_api import DAQ_api
+from tec_config.tec_data import TecData
+from tec_config.config_tec import calc_temp_readings
+from collections import deque
+from dataclasses import dataclass
+import logging
+import time
+
+"""
+tec_stability.py - streaming TEC stability test. Samples the DAQ at a fixed rate and keeps rolling
+statistics (mean, slope, peak to peak) over a time window for each TEC channel. The test passes as
+soon as every channel has been inside the slope, peak to peak and drift (window mean against the
+first reading) limits for a full window, fails straight away on an overtemp, and fails if stability
+is not reached before the timeout.
+"""
+
+@dataclass
+class TecStabilityConfig:
+    sample_rate: float = 1.0 #samples per second
+    window_s: float = 20.0 #time every channel must be stable for
+    max_slope: float = 0.1 #degC per minute
+    max_p2p: float = 0.5 #degC peak to peak within the window
+    max_drift: float = 1.0 #degC between the window mean and the first reading (the run_tec_stability tolerance)
+    min_temp: float = 0.0
+    max_temp: float = 70.0
+    timeout_s: float = 120.0
+
+class RollingChannelStats:
+    def __init__(self,window:int):
+        self.samples = deque(maxlen=window)
+
+    def add(self,t:float,temp:float):
+        self.samples.append((t,temp))
+
+    def is_full(self):
+        return len(self.samples) == self.samples.maxlen
+
+    def mean(self):
+        return sum(temp for t,temp in self.samples) / len(self.samples)
+
+    def p2p(self):
+        temps = [temp for t,temp in self.samples]
+        return max(temps) - min(temps)
+
+    def slope(self):
+        #least squares slope in degC per minute
+        n = len(self.samples)
+        if n < 2:
+            return 0.0
+        t_mean = sum(t for t,temp in self.samples) / n
+        temp_mean = self.mean()
+        num = sum((t - t_mean) * (temp - temp_mean) for t,temp in self.samples)
+        den = sum((t - t_mean) ** 2 for t,temp in self.samples)
+        return 60.0 * num / den if den else 0.0
+
+def _save_tec_record(unit_record,passed,elapsed,stats,reason="",baseline=None):
+    #stores the outcome and the window statistics of each channel in unit_record["tec"]
+    if unit_record is None:
+        return
+    baseline = baseline or [None] * len(stats)
+    unit_record["tec"] = {
+        "passed":passed,
+        "elapsed_s":round(elapsed,1),
+        "reason":reason,
+        "channels":[{"baseline":base,"mean":s.mean(),"slope":s.slope(),"p2p":s.p2p()} if s.samples else {} for s,base in zip(stats,baseline)]
+    }
+
+#unit_record - optional dict, the outcome is stored in unit_record["tec"]
+def run_tec_stability_stream(num_ch=0,config=None,logger=None,daq=None,recorder=None,unit_record=None):
+    config = config or TecStabilityConfig()
+    logger = logger or logging.getLogger(__name__)
+    calc_obj = TecData()
+    daq = daq or DAQ_api(logger=logger)
+    ch = [i + 1 for i in range(2*num_ch)]
+    fcn = [0] * (2*num_ch)
+    window = max(int(config.window_s * config.sample_rate),2)
+    stats = [RollingChannelStats(window) for i in range(num_ch)]
+    period = 1.0 / config.sample_rate
+    baseline = None #first reading of each channel, the window mean must stay within max_drift of it
+
+    #configure the daq for measuring voltage
+    daq.config_daq(ch=ch,fcn=fcn)
+    logger.info(f"Starting TEC stability test ({config.sample_rate}Hz, {config.window_s}s window, slope<{config.max_slope}C/min, p2p<{config.max_p2p}C)...")
+    start = time.perf_counter()
+    next_sample = start
+    while True:
+        now = time.perf_counter()
+        elapsed = now - start
+        log_str,temps = calc_temp_readings(calc_obj=calc_obj,log_str=f"{elapsed:6.1f}s:",daq_readings=daq.get_data(),num_ch=num_ch)
+        if recorder is not None:
+            recorder.record("tec",tec_temps=temps)
+
+        #fail straight away on a reading that could not be converted (no thermistor current) or an overtemp
+        for i,temp in enumerate(temps):
+            if temp is None:
+                logger.info(log_str)
+                logger.info(f"ERROR! No thermistor current on CH{i+1}, please check the DAQ-TEC connections and inform engineering!!!!")
+                _save_tec_record(unit_record,False,elapsed,stats,f"no thermistor current on CH{i+1}",baseline)
+                return False
+            if not (config.min_temp < temp < config.max_temp):
+                logger.info(log_str)
+                logger.info(f"ERROR! Overtemp conditon encountered on CH{i+1}! Please power off the board and inform engineering!!!!")
+                _save_tec_record(unit_record,False,elapsed,stats,f"overtemp on CH{i+1} ({temp})",baseline)
+                return False
+            stats[i].add(now,temp)
+        if baseline is None:
+            baseline = list(temps)
+
+        stable = all(s.is_full() and abs(s.slope()) <= config.max_slope and s.p2p() <= config.max_p2p
+                     and abs(s.mean() - base) <= config.max_drift for s,base in zip(stats,baseline))
+        log_str += " | ".join(f" CH{i+1} slope={s.slope():+.3f}C/min p2p={s.p2p():.3f}C drift={s.mean() - baseline[i]:+.3f}C" for i,s in enumerate(stats))
+        logger.debug(log_str)
+        if stable:
+            logger.info(log_str)
+            logger.info(f"TEC temperature stable, decision after {elapsed:.1f}s")
+            _save_tec_record(unit_record,True,elapsed,stats,baseline=baseline)
+            return True
+        if elapsed >= config.timeout_s:
+            logger.info(log_str)
+            logger.info(f"TEC temperature did not stabilize within {config.timeout_s}s")
+            _save_tec_record(unit_record,False,elapsed,stats,f"not stable within {config.timeout_s}s",baseline)
+            return False
+
+        next_sample += period
+        time.sleep(max(next_sample - time.perf_counter(),0))
@@ -0,0 +1,105 @@
+import math
+from array import array
+from dataclasses import dataclass
+
+"""
+thermistor.py - batch thermistor temperature conversion. Converts whole blocks of DAQ readings
+(interleaved i_therm, v_therm pairs per channel, the layout returned by the DAQ and kept by
+DAQRingBuffer) into temperatures, one array per channel. Each channel has its own thermistor model
+(B equation or Steinhart-Hart) and sense resistor. For high rate streams an interpolation table
+over ln(R) can be built once and used instead of evaluating the model for every sample.
+"""
+
+#reference temperature (K) used by the TecData B equation
+T0_KELVIN = 297.75
+KELVIN = 273.15
+
+@dataclass(frozen=True)
+class BEquation:
+    b_value: float = 3900
+    therm_res_25c: float = 10000
+
+    def inv_temp(self,ln_r:float):
+        #1/T for ln(R), same equation as TecData.calc_temp
+        return 1.0 / T0_KELVIN - (ln_r - math.log(self.therm_res_25c)) / self.b_value
+
+@dataclass(frozen=True)
+class SteinhartHart:
+    a: float
+    b: float
+    c: float
+
+    def inv_temp(self,ln_r:float):
+        return self.a + self.b * ln_r + self.c * ln_r ** 3
+
+class ThermistorTable:
+    #linear interpolation table of temperature (C) over ln(R), built once per thermistor model
+    def __init__(self,model,t_min=-20.0,t_max=120.0,points=2048):
+        ln_r = [self._ln_r_at(model,t) for t in (t_min,t_max)]
+        self.lo,self.hi = min(ln_r),max(ln_r)
+        self.step = (self.hi - self.lo) / (points - 1)
+        self.inv_step = 1.0 / self.step
+        self.temps = array('d',(1.0 / model.inv_temp(self.lo + i * self.step) - KELVIN for i in range(points)))
+
+    @staticmethod
+    def _ln_r_at(model,temp_c:float):
+        #solve model.inv_temp(ln_r) = 1/T by bisection (works for any monotonic model)
+        target = 1.0 / (temp_c + KELVIN)
+        lo,hi = math.log(1e-1),math.log(1e8)
+        rising = model.inv_temp(hi) > model.inv_temp(lo)
+        for i in range(100):
+            mid = (lo + hi) / 2
+            if (model.inv_temp(mid) < target) == rising:
+                lo = mid
+            else:
+                hi = mid
+        return (lo + hi) / 2
+
+    def lookup(self,ln_r:float):
+        x = (ln_r - self.lo) * self.inv_step
+        i = int(x)
+        if i < 0 or i >= len(self.temps) - 1:
+            return math.nan #outside of the table range
+        frac = x - i
+        return self.temps[i] + (self.temps[i + 1] - self.temps[i]) * frac
+
+class ThermistorConverter:
+    def __init__(self,models:list,r_sense=10000,use_table=False,table_range=(-20.0,120.0),table_points=2048):
+        #models - one thermistor model per channel. r_sense - one value for every channel or a list
+        self.models = list(models)
+        self.r_sense = list(r_sense) if isinstance(r_sense,(list,tuple)) else [r_sense] * len(self.models)
+        self.tables = [ThermistorTable(model,*table_range,table_points) for model in self.models] if use_table else None
+
+    def convert_channel(self,ch:int,i_therm,v_therm):
+        #converts matching sequences of i_therm/v_therm readings for channel ch (0 indexed).
+        #returns an array of temperatures in C, nan where the reading can not be converted
+        log = math.log
+        nan = math.nan
+        r_sense = self.r_sense[ch]
+        ln_r = [log(v * r_sense / i) if i > 0 and v > 0 else nan for i,v in zip(i_therm,v_therm)]
+        if self.tables is not None:
+            lookup = self.tables[ch].lookup
+            return array('d',[lookup(x) if x == x else nan for x in ln_r])
+        model = self.models[ch]
+        if isinstance(model,BEquation):
+            #B equation reduces to 1/(k0 - ln_r/B)
+            k0 = 1.0 / T0_KELVIN + log(model.therm_res_25c) / model.b_value
+            inv_b = 1.0 / model.b_value
+            return array('d',[1.0 / (k0 - x * inv_b) - KELVIN for x in ln_r])
+        inv_temp = model.inv_temp
+        return array('d',[1.0 / inv_temp(x) - KELVIN for x in ln_r])
+
+    def convert(self,readings,num_ch=None):
+        #converts a block of interleaved readings [i1,v1,i2,v2,...] (one pair per channel per frame).
+        #readings can be a list, array or memoryview (ie. DAQRingBuffer.latest). Returns one array per channel
+        num_ch = num_ch or len(self.models)
+        stride = 2 * num_ch
+        view = memoryview(readings) if not isinstance(readings,list) else readings
+        return [self.convert_channel(ch,view[2*ch::stride],view[2*ch+1::stride]) for ch in range(num_ch)]
+
+def b_equation_temp(v_therm:float,i_therm:float,r_sense:float,b_value:float,therm_res_25c:float):
+    #single sample conversion, returns None if there is no thermistor current
+    if i_therm == 0:
+        return None
+    r_therm = v_therm / (i_therm / r_sense)
+    return (-(b_value*T0_KELVIN)/((T0_KELVIN*math.log((r_therm/therm_res_25c))-b_value))-KELVIN)
@@ -0,0 +1,47 @@
+import pytest
+from tec_config.daq_ring_buffer import DAQRingBuffer
+
+def fill(buffer,frames):
+    for i in range(frames):
+        buffer.append([i + 0.1 * ch for ch in range(buffer.num_channels)],timestamp=float(i))
+
+def test_partial_fill():
+    buffer = DAQRingBuffer(num_channels=2,capacity=5)
+    fill(buffer,3)
+    assert list(buffer.latest(10)) == pytest.approx([0.0,0.1,1.0,1.1,2.0,2.1])
+    assert list(buffer.latest_times(2)) == [1.0,2.0]
+
+@pytest.mark.parametrize("frames",[5,6,9,10,23])
+def test_wrap_around_keeps_latest_frames_in_order(frames):
+    buffer = DAQRingBuffer(num_channels=3,capacity=5)
+    fill(buffer,frames)
+    expected = [i + 0.1 * ch for i in range(frames - 5,frames) for ch in range(3)]
+    assert buffer.count == frames
+    assert list(buffer.latest(5)) == pytest.approx(expected)
+    assert list(buffer.latest(2)) == pytest.approx(expected[-6:])
+    assert list(buffer.latest_times(5)) == [float(i) for i in range(frames - 5,frames)]
+
+def test_channel_view_after_wrap():
+    buffer = DAQRingBuffer(num_channels=2,capacity=4)
+    fill(buffer,7)
+    assert list(buffer.latest(4,ch=0)) == [3.0,4.0,5.0,6.0]
+    assert list(buffer.latest(3,ch=1)) == pytest.approx([4.1,5.1,6.1])
+
+def test_request_larger_than_capacity_is_clamped():
+    buffer = DAQRingBuffer(num_channels=1,capacity=3)
+    fill(buffer,8)
+    assert list(buffer.latest(100)) == [5.0,6.0,7.0]
+
+def test_empty_buffer():
+    buffer = DAQRingBuffer(num_channels=2,capacity=3)
+    assert len(buffer.latest(3)) == 0 and len(buffer.latest_times(3)) == 0
+
+def test_views_are_not_copies():
+    #a view sees frames written after it was taken once the buffer wraps past it
+    buffer = DAQRingBuffer(num_channels=1,capacity=2)
+    fill(buffer,2)
+    view = buffer.latest(2)
+    snapshot = list(view)
+    fill(buffer,4)
+    assert snapshot == [0.0,1.0]
+    assert list(view) != snapshot
@@ -0,0 +1,76 @@
+import csv
+import math
+import struct
+from data_report import TRACE_COLUMNS, TraceRecorder, export_trace_csv, read_trace
+
+def record_samples(recorder,count):
+    for i in range(count):
+        recorder.record("plr_ramp",channel=1,plr=i,power=-10.0 + i * 0.1,board_status=1)
+
+def test_round_trip_across_chunks(tmp_path):
+    path = str(tmp_path / "unit.trc")
+    recorder = TraceRecorder(path,chunk_rows=4)
+    record_samples(recorder,10)
+    recorder.record("tec",tec_temps=[25.1,24.9])
+    recorder.close()
+    data = read_trace(path)
+    assert list(data) == list(TRACE_COLUMNS)
+    assert recorder.samples == 11
+    assert list(data["plr"][:10]) == [float(i) for i in range(10)]
+    assert data["power"][3] == -9.7
+    #missing values are NaN
+    assert math.isnan(data["plr"][10]) and math.isnan(data["tec2"][0])
+    assert (data["tec1"][10],data["tec2"][10]) == (25.1,24.9)
+
+def test_flush_writes_buffered_samples(tmp_path):
+    path = str(tmp_path / "unit.trc")
+    recorder = TraceRecorder(path,chunk_rows=100,flush_interval=60.0)
+    record_samples(recorder,3)
+    recorder.flush()
+    assert len(read_trace(path)["plr"]) == 3
+    recorder.close()
+
+def test_write_error_drops_chunk_and_keeps_writer(tmp_path):
+    path = str(tmp_path / "unit.trc")
+    recorder = TraceRecorder(path,chunk_rows=100,flush_interval=60.0)
+    write_chunk = recorder._write_chunk
+    def failing_write(chunk):
+        raise OSError("disk full")
+    recorder._write_chunk = failing_write
+    record_samples(recorder,3)
+    recorder.flush()
+    assert (recorder.dropped_chunks,recorder.dropped_samples) == (1,3)
+    #the writer thread is still running, later chunks are written
+    recorder._write_chunk = write_chunk
+    record_samples(recorder,2)
+    recorder.close()
+    assert len(read_trace(path)["plr"]) == 2
+
+def test_appends_to_existing_trace(tmp_path):
+    path = str(tmp_path / "unit.trc")
+    for run in range(2):
+        recorder = TraceRecorder(path)
+        record_samples(recorder,5)
+        recorder.close()
+    assert len(read_trace(path)["plr"]) == 10
+
+def test_truncated_chunk_is_dropped(tmp_path):
+    path = str(tmp_path / "unit.trc")
+    recorder = TraceRecorder(path,chunk_rows=2)
+    record_samples(recorder,4)
+    recorder.close()
+    with open(path,"ab") as f:
+        f.write(b"CHNK" + struct.pack("<I",50) + b"\0" * 16)
+    assert len(read_trace(path)["plr"]) == 4
+
+def test_export_csv(tmp_path):
+    path = str(tmp_path / "unit.trc")
+    recorder = TraceRecorder(path)
+    recorder.record("power_ramp",channel=2,power_level=100,power=-3.0,board_status=17)
+    recorder.record("tec",tec_temps=[25.0])
+    recorder.close()
+    with open(export_trace_csv(path),newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert rows[0]["source"] == "power_ramp"
+    assert (rows[0]["channel"],rows[0]["power_level"],rows[0]["board_status"],rows[0]["plr"]) == ("2","100","17","")
+    assert (rows[1]["source"],rows[1]["tec1"],rows[1]["tec2"]) == ("tec","25.0","")
@@ -0,0 +1,106 @@
+import math
+import pytest
+from laser_config.laser_data import LaserConfig
+from laser_config.plr_model_store import PLRModelStore, model_key
+from logic.plr_model import MAX_UNITS, PLRModel, fit_line
+from logic.plr_search import run_plr_search, warm_start_search
+
+def ramp_pairs(slope,threshold,plrs=range(0,80,4)):
+    #(plr, power dBm) pairs of a laser with power_mw = slope * (plr - threshold) above threshold
+    pairs = []
+    for plr in plrs:
+        mw = slope * (plr - threshold)
+        pairs.append((plr,10 * math.log10(mw) if mw > 0 else -80.0))
+    return pairs
+
+def power_at(plr,slope=0.05,threshold=20):
+    mw = slope * (plr - threshold)
+    return 10 * math.log10(mw) if mw > 0 else -80.0
+
+def laser(wvl=1550.0):
+    return LaserConfig("L1",wvl,50.0,100.0,2.0,10 * math.log10(2.0),1,1)
+
+def test_fit_line_skips_dark_readings():
+    slope,offset,n = fit_line(ramp_pairs(0.05,20))
+    assert slope == pytest.approx(0.05)
+    assert offset == pytest.approx(-1.0)
+    assert n == 14 #PLR 24..76, the readings at and below threshold are dark
+
+def test_fit_line_needs_two_points():
+    assert fit_line([(10,0.0)]) is None
+    assert fit_line([(10,0.0),(10,1.0)]) is None
+    assert fit_line([(10,-80.0),(20,-70.0)]) is None
+
+def test_predict_plr_is_lowest_plr_reaching_target():
+    model = PLRModel()
+    model.add_unit(ramp_pairs(0.05,20))
+    plr = model.predict_plr(3.5)
+    assert power_at(plr) >= 3.5 > power_at(plr - 1)
+
+def test_prediction_is_median_of_units():
+    model = PLRModel()
+    for threshold in (18,20,22):
+        model.add_unit(ramp_pairs(0.05,threshold))
+    #an outlier unit does not move the prediction
+    model.add_unit(ramp_pairs(0.01,60,range(60,250,10)))
+    single = PLRModel()
+    single.add_unit(ramp_pairs(0.05,22))
+    assert model.predict_plr(3.5) == single.predict_plr(3.5)
+
+def test_prediction_out_of_range():
+    model = PLRModel()
+    assert model.predict_plr(0.0) is None
+    model.add_unit(ramp_pairs(0.05,20))
+    assert model.predict_plr(30.0,max_plr=255) is None
+
+def test_unit_limit_and_dict_round_trip():
+    model = PLRModel()
+    for i in range(MAX_UNITS + 5):
+        model.add_unit(ramp_pairs(0.05 + i * 0.001,20))
+    assert len(model.units) == MAX_UNITS
+    assert model.units[0][0] == pytest.approx(0.055)
+    copy = PLRModel.from_dict(model.to_dict())
+    assert copy.units == model.units
+
+def test_falling_line_is_not_added():
+    model = PLRModel()
+    assert model.add_unit([(10,0.0),(20,-3.0)]) == 0
+    assert model.units == []
+
+def test_store_waits_for_min_units_and_saves(tmp_path):
+    path = str(tmp_path / "models" / "PLR Models.json")
+    store = PLRModelStore(path,min_units=2)
+    assert store.update(laser(),ramp_pairs(0.05,20)) == 14
+    assert store.predict_plr(laser(),3.5) is None
+    store.update(laser(),ramp_pairs(0.05,20))
+    plr = store.predict_plr(laser(),3.5)
+    assert plr is not None
+    #another station sees the saved models, a different part has no model
+    other = PLRModelStore(path,min_units=2)
+    assert other.predict_plr(laser(),3.5) == plr
+    assert other.predict_plr(laser(1310.0),3.5) is None
+    assert model_key(laser()) != model_key(laser(1310.0))
+
+def test_store_ignores_damaged_file(tmp_path):
+    path = tmp_path / "PLR Models.json"
+    path.write_text("{not json")
+    store = PLRModelStore(str(path))
+    assert store.models == {}
+    store.update(laser(),ramp_pairs(0.05,20))
+    assert len(PLRModelStore(str(path)).models[model_key(laser())].units) == 1
+
+@pytest.mark.parametrize("refine",["bisect","secant"])
+@pytest.mark.parametrize("offset",[-6,-1,0,1,2,7])
+def test_warm_start_near_prediction(refine,offset):
+    expected = 65 #lowest PLR reaching 3.5dBm on power_at
+    assert power_at(expected) >= 3.5 > power_at(expected - 1)
+    result = run_plr_search(warm_start_search(expected + offset,3.5,refine=refine),power_at)
+    assert result.status == 1 and result.plr == expected
+    if offset == 0:
+        #the predicted PLR and the one below it
+        assert result.probes == 2
+
+def test_warm_start_misses_bad_prediction():
+    result = run_plr_search(warm_start_search(200,3.5,max_steps=4),power_at)
+    assert result.status == -1
+    assert result.probes == 5
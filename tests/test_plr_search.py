@@ -0,0 +1,81 @@
+import asyncio
+import math
+import pytest
+from logic.plr_search import async_run_plr_search, build_plr_search, linear_search, run_plr_search
+
+THRESHOLD_PLR = 20
+MW_PER_PLR = 0.05
+
+def power_at(plr):
+    #same PLR -> power curve as the simulated OPM (sim_instruments/sim_opm.py LinearPLRCurve)
+    power_mw = max(plr - THRESHOLD_PLR,0) * MW_PER_PLR
+    return 10 * math.log10(power_mw) if power_mw > 0 else -80.0
+
+def expected_plr(target_power,start_plr=0):
+    #the PLR the +1 linear ramp stops at
+    plr = start_plr
+    while power_at(plr) < target_power:
+        plr += 1
+    return plr
+
+@pytest.mark.parametrize("mode",["linear","bisect","secant"])
+@pytest.mark.parametrize("target_power",[-10.0,0.0,3.5,10.0])
+def test_search_converges_to_linear_ramp_plr(mode,target_power):
+    result = run_plr_search(build_plr_search(mode,0,target_power),power_at)
+    assert result.status == 1
+    assert result.plr == expected_plr(target_power)
+    assert result.power == power_at(result.plr)
+
+@pytest.mark.parametrize("mode",["bisect","secant"])
+def test_bracket_search_uses_fewer_probes_than_linear(mode):
+    linear = run_plr_search(build_plr_search("linear",0,3.5),power_at)
+    result = run_plr_search(build_plr_search(mode,0,3.5),power_at)
+    assert result.plr == linear.plr
+    assert result.probes < linear.probes // 4
+
+@pytest.mark.parametrize("mode",["linear","bisect","secant"])
+def test_search_starts_at_the_register_plr(mode):
+    #the target is already reached at the start PLR
+    result = run_plr_search(build_plr_search(mode,120,3.5),power_at)
+    assert (result.status,result.plr,result.probes) == (1,120,1)
+
+@pytest.mark.parametrize("mode",["linear","bisect","secant"])
+def test_search_fails_at_max_plr(mode):
+    result = run_plr_search(build_plr_search(mode,0,30.0,max_plr=100),power_at)
+    assert result.status == -1
+    assert result.reason == "max PLR reached without reaching target power"
+    assert result.plr <= 100
+
+@pytest.mark.parametrize("mode",["linear","bisect","secant"])
+def test_overcurrent_aborts_search(mode):
+    #the probe returns None (overcurrent) from PLR 60 up, the search stops at the first one
+    probed = []
+    def probe(plr):
+        probed.append(plr)
+        return None if plr >= 60 else power_at(plr)
+    result = run_plr_search(build_plr_search(mode,0,10.0),probe)
+    assert result.status == -1
+    assert result.reason == f"probe aborted at PLR {probed[-1]}"
+    assert probed[-1] >= 60 and all(plr < 60 for plr in probed[:-1])
+    assert result.probes == len(probed)
+    assert result.power is None
+
+def test_linear_search_step():
+    search = linear_search(0,3.5,step=5)
+    result = run_plr_search(search,power_at)
+    assert result.status == 1
+    assert result.plr % 5 == 0 and power_at(result.plr - 5) < 3.5 <= result.power
+
+def test_unknown_search_mode():
+    with pytest.raises(ValueError):
+        build_plr_search("golden",0,3.5)
+
+@pytest.mark.parametrize("mode",["linear","bisect"])
+def test_async_search_matches_sync(mode):
+    async def probe(plr):
+        return None if plr >= 200 else power_at(plr)
+    result = asyncio.run(async_run_plr_search(build_plr_search(mode,0,3.5),probe))
+    sync = run_plr_search(build_plr_search(mode,0,3.5),power_at)
+    assert (result.status,result.plr,result.power,result.probes) == (sync.status,sync.plr,sync.power,sync.probes)
+    aborted = asyncio.run(async_run_plr_search(build_plr_search(mode,190,20.0),probe))
+    assert aborted.status == -1 and aborted.reason == f"probe aborted at PLR {aborted.plr}" and aborted.plr >= 200
@@ -0,0 +1,74 @@
+import json
+import pytest
+from laser_config.register_codec import RegisterCodec, load_board_profile
+from sim_instruments.sim_base import LatencyModel
+from sim_instruments.sim_debug_cable import SimDebugCable
+
+@pytest.fixture
+def codec():
+    return RegisterCodec(profile={})
+
+@pytest.fixture
+def cable():
+    return SimDebugCable(latency=LatencyModel(base=0.0))
+
+def channel_pairs(codec):
+    #(channel 1 record, channel 2 record) of the writable registers holding both channels
+    records = [r for r in codec.records.values() if not r.volatile and r.name.startswith("LASER1_")]
+    return [(r,codec.records[r.name.replace("LASER1_","LASER2_")]) for r in records]
+
+def test_encode_shifts_channel_above_value(codec):
+    assert codec.encode("LASER1_PLR",100)[1] == "0x00064"
+    assert codec.encode("LASER2_PLR",100)[1] == "0x00164"
+    assert codec.encode("LASER2_TEC",0x1234)[1] == "0x11234"
+
+@pytest.mark.parametrize("val",[0,1,127,255])
+def test_round_trip_both_channels(codec,cable,val):
+    for ch1,ch2 in channel_pairs(codec):
+        other = ch2.max_value - val
+        cable.write_reg(ch1.register,codec.encode(ch1.name,val)[1])
+        cable.write_reg(ch2.register,codec.encode(ch2.name,other)[1])
+        #src.state[n] / src.power[n] are one register per channel, the others hold both channels
+        assert codec.decode(ch1,cable.read_reg(ch1.register)) == val
+        assert codec.decode(ch2,cable.read_reg(ch2.register)) == other
+
+def test_round_trip_16_bit_register(codec,cable):
+    record,hex_str = codec.encode("LASER2_TEC",40000)
+    cable.write_reg(record.register,hex_str)
+    cable.write_reg(record.register,codec.encode("LASER1_TEC",123)[1])
+    resp = cable.read_reg(record.register)
+    assert codec.decode(record,resp) == 40000
+    assert codec.decode(codec.records["LASER1_TEC"],resp) == 123
+
+def test_image_round_trip(cable):
+    codec = RegisterCodec(profile=load_board_profile("does-not-exist.json"))
+    image = codec.encode_image()
+    assert [name for name,*rest in image] == list(codec.profile)
+    for name,val,record,hex_str in image:
+        cable.write_reg(record.register,hex_str)
+    for name,val,record,hex_str in image:
+        assert codec.decode(record,cable.read_reg(record.register)) == val
+
+@pytest.mark.parametrize("name,val",[("LASER1_PLR",256),("LASER2_ILIM",-1),("LASER1_TEC",1 << 16)])
+def test_encode_out_of_range(codec,name,val):
+    with pytest.raises(ValueError):
+        codec.encode(name,val)
+
+def test_status_round_trip(codec):
+    flags = {name:0 for name in codec.status_flags}
+    flags.update(LASER1_OVC=1,INITRAM=1,LASER2_STATE=1)
+    status = sum(bit << codec.status_flags[name] for name,bit in flags.items())
+    assert codec.decode_status(status) == flags
+
+@pytest.mark.parametrize("profile",[{"LASER1_SAVE":1},{"LASER1_PLR":300},{"NOT_A_REGISTER":1}])
+def test_profile_is_checked(profile):
+    with pytest.raises(ValueError):
+        RegisterCodec(profile=profile)
+
+def test_profile_file_overlays_defaults(tmp_path):
+    path = tmp_path / "profile.json"
+    path.write_text(json.dumps({"LASER2_ILIM":"42"}))
+    defaults = load_board_profile(str(tmp_path / "missing.json"))
+    profile = load_board_profile(str(path))
+    assert profile["LASER2_ILIM"] == 42
+    assert {k:v for k,v in profile.items() if k != "LASER2_ILIM"} == {k:v for k,v in defaults.items() if k != "LASER2_ILIM"}
@@ -0,0 +1,64 @@
+import pytest
+from results_store import ResultsStore
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultsStore(str(tmp_path / "results" / "Results.db"),flush_interval=0.05)
+    yield store
+    store.close()
+
+def laser_record(passed,plr,power):
+    return {"passed":passed,"plr":plr,"power":power,"duration_s":12.5,"probes":3,"search_mode":"bisect"}
+
+def test_query_round_trip(store):
+    store.record("SN1","init",True,station="A",duration_s=3.0,data={"diff":{"LASER1_ILIM":{"read":0,"write":100}}})
+    store.record("SN1","laser",True,laser_sn="L1",station="A",plr=65,power=3.52,duration_s=12.5,data={"probes":3})
+    results = store.query(unit_sn="SN1")
+    assert [r["workflow"] for r in results] == ["laser","init"]
+    laser,init = results
+    assert (laser["laser_sn"],laser["passed"],laser["plr"],laser["power"],laser["station"]) == ("L1",True,65,3.52,"A")
+    assert laser["data"] == {"probes":3}
+    assert init["laser_sn"] is None and init["plr"] is None
+    assert init["data"] == {"diff":{"LASER1_ILIM":{"read":0,"write":100}}}
+
+def test_filters(store):
+    for i in range(6):
+        store.record(f"SN{i % 2}","laser",i % 3 != 0,laser_sn=f"L{i}",plr=i)
+    store.record("SN0","tec",True)
+    assert len(store.query()) == 7
+    assert {r["laser_sn"] for r in store.query(unit_sn="SN0",workflow="laser")} == {"L0","L2","L4"}
+    assert {r["laser_sn"] for r in store.query(passed=False)} == {"L0","L3"}
+    assert len(store.query(limit=2)) == 2
+    assert store.query(since="2000-01-01",until="2000-12-31") == []
+    today = store.query(unit_sn="SN0",workflow="tec")[0]["timestamp"][:10]
+    assert len(store.query(since=today,until=today)) == 7
+
+def test_last_laser_result(store):
+    store.record("SN1","laser",True,laser_sn="L1",plr=60)
+    store.record("SN2","laser",True,laser_sn="L1",plr=62)
+    store.record("SN3","laser",False,laser_sn="L1",plr=255)
+    assert store.last_laser_result("L1")["plr"] == 62
+    assert store.last_laser_result("L1",passed=None)["plr"] == 255
+    assert store.last_laser_result("L2") is None
+
+def test_record_workflow_from_unit_record(store):
+    unit_record = {
+        "tec":{"passed":True,"elapsed_s":21.0},
+        "lasers":{"L1":laser_record(True,65,3.52),"L2":laser_record(False,255,1.0)}
+    }
+    store.record_workflow("SN1","tec",True,unit_record,station="A",duration_s=21.0)
+    store.record_workflow("SN1","laser",False,unit_record,station="A",laser_sns=["L2"])
+    history = store.unit_history("SN1")
+    assert [(r["workflow"],r["laser_sn"],r["passed"]) for r in history] == [("laser","L2",False),("tec",None,True)]
+    assert history[0]["data"] == laser_record(False,255,1.0)
+    assert history[1]["data"] == {"passed":True,"elapsed_s":21.0}
+
+def test_batches_and_persists(tmp_path):
+    path = str(tmp_path / "Results.db")
+    store = ResultsStore(path,batch_size=7,flush_interval=0.05)
+    for i in range(100):
+        store.record(f"SN{i}","tec",True)
+    store.close()
+    #closing writes everything that was queued, records after close are dropped
+    store.record("SN100","tec",True)
+    assert len(ResultsStore(path).query(limit=None)) == 100
@@ -0,0 +1,50 @@
+import pytest
+from logic.settle import wait_for_settle, wait_for_settle_all
+
+def reader(values):
+    #returns the values in order, then keeps returning the last one
+    values = list(values)
+    calls = []
+    def read():
+        calls.append(len(calls))
+        return values[min(len(calls) - 1,len(values) - 1)]
+    read.calls = calls
+    return read
+
+def test_settles_on_mean_of_window():
+    read = reader([-20.0,-5.0,1.0,1.02,0.98,1.0])
+    result = wait_for_settle(read,poll_interval=0,tolerance=0.05,window=3,min_wait=0)
+    assert result.settled
+    assert result.samples == 5
+    assert result.value == pytest.approx(1.0)
+
+def test_dark_reading_settles():
+    #-inf - -inf is nan, identical readings must still count as settled
+    result = wait_for_settle(reader([float("-inf")]),poll_interval=0,window=3,min_wait=0)
+    assert result.settled and result.value == float("-inf") and result.samples == 3
+
+def test_timeout_returns_last_reading():
+    values = [float(i) for i in range(1000)]
+    read = reader(values)
+    result = wait_for_settle(read,poll_interval=0.001,tolerance=0.05,window=3,timeout=0.05,min_wait=0)
+    assert not result.settled
+    assert result.value == values[result.samples - 1]
+    assert result.elapsed >= 0.05
+
+def test_window_must_fill():
+    result = wait_for_settle(reader([2.0]),poll_interval=0,window=5,min_wait=0)
+    assert result.settled and result.samples == 5
+
+def test_settle_all_settles_readings_in_turn():
+    #"fast" settles first and is not read again, then "slow" is polled until it settles
+    fast = reader([1.0])
+    slow = reader([5.0,3.0,2.0,2.0,2.0])
+    results = wait_for_settle_all({"fast":fast,"slow":slow},poll_interval=0,window=3,min_wait=0)
+    assert results["fast"].settled and results["fast"].samples == 3 and len(fast.calls) == 3
+    assert results["slow"].settled and results["slow"].samples == 5 and results["slow"].value == 2.0
+
+def test_settle_all_timeout_only_marks_unsettled():
+    values = [float(i) for i in range(1000)]
+    results = wait_for_settle_all({1:reader([0.5]),2:reader(values)},poll_interval=0.001,window=3,timeout=0.05,min_wait=0)
+    assert results[1].settled and results[1].value == 0.5
+    assert not results[2].settled and results[2].value == values[results[2].samples - 1]
@@ -0,0 +1,68 @@
+import math
+import pytest
+from tec_config.daq_ring_buffer import DAQRingBuffer
+from tec_config.tec_data import TecData
+from tec_config.thermistor import BEquation, SteinhartHart, ThermistorConverter, b_equation_temp, T0_KELVIN, KELVIN
+
+R_SENSE = 10000
+I_THERM = 1.0
+
+def reading_at(temp_c,model=BEquation()):
+    #(i_therm, v_therm) the DAQ reads for a thermistor at temp_c, the inverse of the TecData B equation
+    r_therm = model.therm_res_25c * math.exp(model.b_value * (1 / T0_KELVIN - 1 / (temp_c + KELVIN)))
+    return I_THERM,r_therm * I_THERM / R_SENSE
+
+def interleave(temps_by_channel):
+    readings = []
+    for frame in zip(*temps_by_channel):
+        for temp in frame:
+            readings.extend(reading_at(temp))
+    return readings
+
+TEMPS = [[15.0,24.6,25.0,40.0,69.9],[25.0,25.1,-5.0,100.0,0.0]]
+
+def test_batch_matches_single_sample():
+    converter = ThermistorConverter([BEquation(),BEquation()],r_sense=R_SENSE)
+    result = converter.convert(interleave(TEMPS))
+    for ch in range(2):
+        assert list(result[ch]) == pytest.approx(TEMPS[ch],abs=1e-9)
+        singles = [b_equation_temp(v,i,R_SENSE,3900,10000) for i,v in map(reading_at,TEMPS[ch])]
+        assert list(result[ch]) == pytest.approx(singles,abs=1e-9)
+
+def test_table_matches_equation():
+    exact = ThermistorConverter([BEquation(),BEquation()],r_sense=R_SENSE)
+    table = ThermistorConverter([BEquation(),BEquation()],r_sense=R_SENSE,use_table=True)
+    readings = interleave(TEMPS)
+    for a,b in zip(exact.convert(readings),table.convert(readings)):
+        assert list(b) == pytest.approx(list(a),abs=0.01)
+
+def test_table_out_of_range_is_nan():
+    table = ThermistorConverter([BEquation()],r_sense=R_SENSE,use_table=True,table_range=(0.0,50.0))
+    result = table.convert(interleave([[25.0,80.0]]))
+    assert result[0][0] == pytest.approx(25.0,abs=0.01)
+    assert math.isnan(result[0][1])
+
+def test_no_current_is_nan():
+    converter = ThermistorConverter([BEquation()],r_sense=R_SENSE)
+    result = converter.convert([0.0,0.5,1.0,0.0])
+    assert all(math.isnan(temp) for temp in result[0])
+    assert b_equation_temp(0.5,0.0,R_SENSE,3900,10000) is None
+
+def test_steinhart_hart_per_channel():
+    #a Steinhart-Hart model with c=0 is the B equation
+    b = BEquation(3435,10000)
+    sh = SteinhartHart(1 / T0_KELVIN + math.log(b.therm_res_25c) / b.b_value,-1 / b.b_value,0.0)
+    converter = ThermistorConverter([BEquation(),sh],r_sense=R_SENSE)
+    i_2,v_2 = reading_at(40.0,b)
+    result = converter.convert([*reading_at(30.0),i_2,v_2])
+    assert result[0][0] == pytest.approx(30.0)
+    assert result[1][0] == pytest.approx(40.0)
+
+def test_converts_ring_buffer_views():
+    buffer = DAQRingBuffer(num_channels=4,capacity=3)
+    for frame in zip(*TEMPS):
+        buffer.append([value for temp in frame for value in reading_at(temp)])
+    converter = TecData().converter(num_ch=2)
+    result = converter.convert(buffer.latest(3))
+    assert list(result[0]) == pytest.approx(TEMPS[0][-3:])
+    assert list(result[1]) == pytest.approx(TEMPS[1][-3:])
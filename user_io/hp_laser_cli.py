@@ -165,8 +165,10 @@ def setup_tec_test():
     input(f"Please power on the board, confirm the TEC light is green (press ENTER when the light has turned green): ")
     return num_ch
 
-def setup_configure_laser():
+def setup_configure_laser(wait_for_board=None):
     #prompts for the user to get ready to set the power on the laser
+    #wait_for_board - optional callable(message) which returns True once the driver board has reconnected
+    #                 (see RebootWatcher.board_ready), the operator confirms the reconnect if it returns False
     logger.info(f"Readying to configure laser:")
     print(f"Please perform the following:")
     if ask_yes_no("Is the laser board currently connected to the driver board?"):
@@ -174,8 +176,11 @@ def setup_configure_laser():
     else:
         input(f"1. Ensure the board is powered off (press ENTER when done)")
         input(f"2. Connect the Laser carrier board (press ENTER when done)")
-        input(f"3. Power on the unit (press ENTER when done)")
-        input(f"4. Verify the board has reconnected (usb beep) AND that the TEC LED is green (IF TEC LED REMAINS RED POWER OFF UNIT AND CONTACT ENGINEERING) (press ENTER when done)")
+        if wait_for_board is not None and wait_for_board(f"3. Power on the unit, waiting for the board to reconnect..."):
+            input(f"4. Verify that the TEC LED is green (IF TEC LED REMAINS RED POWER OFF UNIT AND CONTACT ENGINEERING) (press ENTER when done)")
+        else:
+            input(f"3. Power on the unit (press ENTER when done)")
+            input(f"4. Verify the board has reconnected (usb beep) AND that the TEC LED is green (IF TEC LED REMAINS RED POWER OFF UNIT AND CONTACT ENGINEERING) (press ENTER when done)")
 
     #get laser info
     config_info = get_config_info()